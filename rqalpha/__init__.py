@@ -60,6 +60,11 @@ def run(config, source_code=None):
     return main.run(config, source_code=source_code)
 
 
+def run_sweep(config, param_grid, workers=None, source_code=None, verbose=True):
+    from rqalpha.sweep import run_sweep as _run_sweep
+    return _run_sweep(config, param_grid, workers=workers, source_code=source_code, verbose=verbose)
+
+
 def run_ipython_cell(line, cell=None):
     from rqalpha.__main__ import run
     from rqalpha.utils.py2 import clear_all_cached_functions
@@ -82,11 +82,33 @@ def update_bundle(data_bundle_path, locale):
     main.update_bundle(data_bundle_path, locale)
 
 
+@cli.command()
+@click.option('-d', '--data-bundle-path', default=os.path.expanduser('~/.rqalpha'), type=click.Path(file_okay=False))
+def convert_bundle(data_bundle_path):
+    """
+    Convert day bars and instruments of Data Bundle to npy format
+    """
+    from rqalpha.data.bundle_converter import convert_bundle
+    convert_bundle(os.path.join(data_bundle_path, 'bundle'))
+
+
+@cli.command()
+@click.option('-d', '--data-bundle-path', default=os.path.expanduser('~/.rqalpha'), type=click.Path(file_okay=False))
+@click.argument('csv_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+def convert_minute_bars(data_bundle_path, csv_files):
+    """
+    Convert minute bars in csv files to memory-mapped npy format of Data Bundle
+    """
+    from rqalpha.data.minute_bar_store import convert_minute_bars
+    convert_minute_bars(list(csv_files), os.path.join(data_bundle_path, 'bundle', 'minute_bars.npy'))
+
+
 @cli.command()
 @click.help_option('-h', '--help')
 # -- Base Configuration
 @click.option('-d', '--data-bundle-path', 'base__data_bundle_path', type=click.Path(exists=True))
 @click.option('-f', '--strategy-file', 'base__strategy_file', type=click.Path(exists=True))
+@click.option('--data-cache-mb', 'base__data_cache_mb', type=click.INT, help="memory budget (MB) of the bar cache")
 @click.option('-s', '--start-date', 'base__start_date', type=Date())
 @click.option('-e', '--end-date', 'base__end_date', type=Date())
 @click.option('-bm', '--benchmark', 'base__benchmark', type=click.STRING, default=None)
@@ -106,6 +128,8 @@ def update_bundle(data_bundle_path, locale):
 @click.option('--locale', 'extra__locale', type=click.Choice(['cn', 'en']), default="cn")
 @click.option('--extra-vars', 'extra__context_vars', type=click.STRING, help="override context vars")
 @click.option("--enable-profiler", "extra__enable_profiler", is_flag=True, help="add line profiler to profile your strategy")
+@click.option("--enable-event-bus-profiler", "extra__enable_event_bus_profiler", is_flag=True,
+              help="count calls and time spent per event and listener")
 @click.option('--config', 'config_path', type=click.STRING, help="config file path")
 # -- Mod Configuration
 @click.option('-mc', '--mod-config', 'mod_configs', nargs=2, multiple=True, type=click.STRING, help="mod extra config")
@@ -140,6 +164,54 @@ def run(**kwargs):
         sys.exit(1)
 
 
+@cli.command()
+@click.help_option('-h', '--help')
+@click.option('-d', '--data-bundle-path', 'base__data_bundle_path', type=click.Path(exists=True))
+@click.option('-f', '--strategy-file', 'base__strategy_file', type=click.Path(exists=True), required=True)
+@click.option('-s', '--start-date', 'base__start_date', type=Date())
+@click.option('-e', '--end-date', 'base__end_date', type=Date())
+@click.option('-bm', '--benchmark', 'base__benchmark', type=click.STRING, default=None)
+@click.option('-a', '--account', 'base__accounts', nargs=2, multiple=True, help="set account type with starting cash")
+@click.option('-fq', '--frequency', 'base__frequency', type=click.Choice(['1d', '1m', 'tick']))
+@click.option('-l', '--log-level', 'extra__log_level', type=click.Choice(['verbose', 'debug', 'info', 'error', 'none']),
+              default='error')
+@click.option('--config', 'config_path', type=click.STRING, help="config file path")
+@click.option('-p', '--param', 'params', nargs=2, multiple=True,
+              help="parameter name and comma separated values, e.g. -p fast 5,10,20")
+@click.option('-w', '--workers', type=click.INT, default=None, help="number of worker processes")
+@click.option('-o', '--output-file', type=click.Path(writable=True), help="write sweep results to csv")
+def sweep(**kwargs):
+    """
+    Run a strategy over a parameter grid in parallel
+    """
+    from rqalpha.sweep import run_sweep
+    from rqalpha.mod.utils import mod_config_value_parse
+    from rqalpha.utils.config import load_yaml
+    from rqalpha.utils.dict_func import deep_update
+
+    config_path = kwargs.pop('config_path')
+    param_grid = {name: [mod_config_value_parse(v) for v in values.split(',')]
+                  for name, values in kwargs.pop('params')}
+    workers = kwargs.pop('workers')
+    output_file = kwargs.pop('output_file')
+    if not kwargs['base__accounts']:
+        kwargs.pop('base__accounts')
+
+    config = load_yaml(os.path.abspath(config_path)) if config_path else {}
+    for k, v in six.iteritems(kwargs):
+        if v is None:
+            continue
+        section, key = k.split('__')
+        if key == 'accounts':
+            v = {account_type: starting_cash for account_type, starting_cash in v}
+        deep_update({section: {key: v}}, config)
+
+    df = run_sweep(config, param_grid, workers=workers)
+    if output_file:
+        df.to_csv(output_file, index=False)
+    six.print_(df.to_string())
+
+
 @cli.command()
 @click.option('-d', '--directory', default="./", type=click.Path(), required=True)
 def examples(directory):
@@ -34,6 +34,7 @@ from rqalpha.execution_context import ExecutionContext
 from rqalpha.utils import to_industry_code, to_sector_name, unwrapper, is_valid_price
 from rqalpha.utils.exception import patch_user_exc, patch_system_exc, EXC_EXT_NAME, RQInvalidArgument
 from rqalpha.utils.i18n import gettext as _
+from rqalpha.utils.py2 import lru_cache
 # noinspection PyUnresolvedReferences
 from rqalpha.utils.logger import user_log as logger
 from rqalpha.utils.logger import user_system_log
@@ -469,6 +470,18 @@ def history_bars(order_book_id, bar_count, frequency, fields=None, skip_suspende
         [ 8.69  8.7   8.71  8.81  8.81]
     """
     order_book_id = assure_order_book_id(order_book_id)
+    env = Environment.get_instance()
+    dt, include_now = _history_dt(frequency, include_now, adjust_type)
+
+    if fields is None:
+        fields = ["datetime", "open", "high", "low", "close", "volume"]
+
+    return env.data_proxy.history_bars(order_book_id, bar_count, frequency, fields, dt,
+                                       skip_suspended=skip_suspended, include_now=include_now,
+                                       adjust_type=adjust_type, adjust_orig=env.trading_dt)
+
+
+def _history_dt(frequency, include_now, adjust_type):
     env = Environment.get_instance()
     dt = env.calendar_dt
 
@@ -494,12 +507,62 @@ def history_bars(order_book_id, bar_count, frequency, fields=None, skip_suspende
             # 日回测不支持 include_now
             include_now = False
 
+    return dt, include_now
+
+
+@export_as_api
+@ExecutionContext.enforce_phase(EXECUTION_PHASE.BEFORE_TRADING,
+                                EXECUTION_PHASE.ON_BAR,
+                                EXECUTION_PHASE.ON_TICK,
+                                EXECUTION_PHASE.AFTER_TRADING,
+                                EXECUTION_PHASE.SCHEDULED)
+@apply_rules(verify_that('order_book_ids').are_valid_instruments(),
+             verify_that('bar_count').is_instance_of(int).is_greater_than(0),
+             verify_that('frequency').is_valid_frequency(),
+             verify_that('fields').are_valid_fields(names.VALID_HISTORY_FIELDS, ignore_none=True),
+             verify_that('include_now').is_instance_of(bool),
+             verify_that('adjust_type').is_in({'pre', 'none', 'post'}))
+def history_bars_panel(order_book_ids, bar_count, frequency, fields=None, include_now=False, adjust_type='pre'):
+    """
+    批量获取多个合约的历史行情，结果按交易日历对齐，合约在某个时间点没有数据（未上市、已退市等）时以 NaN 填充。
+    停牌日与 history_bars(skip_suspended=False) 相同，价格沿用停牌前的价格、成交量为 0，可以通过 volume == 0 识别。
+    在需要对大量合约进行横截面计算时，比循环调用 history_bars 更高效。调用时间与返回数据的对应关系与 history_bars 相同。
+
+    :param order_book_ids: 合约代码列表
+    :type order_book_ids: `list[str]`
+
+    :param int bar_count: 获取的历史数据数量，必填项
+    :param str frequency: 获取数据什么样的频率进行。'1d'或'1m'分别表示每日和每分钟，必填项
+    :param fields: 返回数据字段，可选字段与 history_bars 相同，默认为 open, high, low, close, volume
+    :type fields: `str` | `list[str]`
+
+    :param bool include_now: 是否包含当前数据
+    :param str adjust_type: 复权类型，默认为前复权 pre；可选 pre, none, post
+
+    :return: `ndarray`, fields 为 str 时 shape 为 (合约, 时间)，fields 为 list 时 shape 为 (合约, 时间, 字段)
+
+    :example:
+
+    获取沪深300成分股最近20天的收盘价并计算动量:
+
+    ..  code-block:: python3
+        :linenos:
+
+        closes = history_bars_panel(context.stocks, 20, '1d', 'close')
+        momentum = closes[:, -1] / closes[:, 0] - 1
+    """
+    if isinstance(order_book_ids, (six.string_types, Instrument)):
+        order_book_ids = [order_book_ids]
+    order_book_ids = [assure_order_book_id(o) for o in order_book_ids]
+    env = Environment.get_instance()
+    dt, include_now = _history_dt(frequency, include_now, adjust_type)
+
     if fields is None:
-        fields = ["datetime", "open", "high", "low", "close", "volume"]
+        fields = ["open", "high", "low", "close", "volume"]
 
-    return env.data_proxy.history_bars(order_book_id, bar_count, frequency, fields, dt,
-                                       skip_suspended=skip_suspended, include_now=include_now,
-                                       adjust_type=adjust_type, adjust_orig=env.trading_dt)
+    return env.data_proxy.history_bars_panel(order_book_ids, bar_count, frequency, fields, dt,
+                                             include_now=include_now, adjust_type=adjust_type,
+                                             adjust_orig=env.trading_dt)
 
 
 @export_as_api
@@ -575,10 +638,18 @@ def all_instruments(type=None, date=None):
                 types.update(['ETF', 'LOF', 'SF', 'FenjiA', 'FenjiB', 'FenjiMu'])
             else:
                 types.add(t)
+        types = frozenset(types)
     else:
         types = None
 
-    result = env.data_proxy.all_instruments(types, dt)
+    # 返回副本，避免策略修改缓存中的 DataFrame
+    return _all_instruments_frame(types, dt.date()).copy()
+
+
+@lru_cache(128)
+def _all_instruments_frame(types, date):
+    # 合约在同一天内的上市状态不变，按 (types, date) 缓存结果
+    result = Environment.get_instance().data_proxy.all_instruments(types, date)
     if types is not None and len(types) == 1:
         return pd.DataFrame([i.__dict__ for i in result])
 
@@ -40,26 +40,36 @@ def adjust_bars(bars, ex_factors, fields, adjust_type, adjust_orig):
     if ex_factors is None or len(bars) == 0:
         return bars if fields is None else bars[fields]
 
-    dates = ex_factors['start_date']
-    ex_cum_factors = ex_factors['ex_cum_factor']
+    factors = cum_factors_of(bars['datetime'], ex_factors)
+    return adjust_bars_by_factors(bars, factors, fields, base_adjust_factor(ex_factors, adjust_type, adjust_orig))
 
-    if adjust_type == 'pre':
-        adjust_orig_dt = np.uint64(convert_date_to_int(adjust_orig))
-        base_adjust_rate = _factor_for_date(dates, ex_cum_factors, adjust_orig_dt)
-    else:
-        base_adjust_rate = 1.0
 
-    start_date = bars['datetime'][0]
-    end_date = bars['datetime'][-1]
+def cum_factors_of(datetimes, ex_factors):
+    """
+    计算与日线逐行对齐的累计复权因子，可以在加载时或生成数据包时预先算好。
+    """
+    if ex_factors is None or len(ex_factors) == 0:
+        return None
 
-    if (_factor_for_date(dates, ex_cum_factors, start_date) == base_adjust_rate and
-            _factor_for_date(dates, ex_cum_factors, end_date) == base_adjust_rate):
-        return bars if fields is None else bars[fields]
+    pos = ex_factors['start_date'].searchsorted(datetimes, side='right') - 1
+    factors = ex_factors['ex_cum_factor'].take(np.maximum(pos, 0))
+    factors[pos < 0] = 1
+    return factors
+
+
+def base_adjust_factor(ex_factors, adjust_type, adjust_orig):
+    if adjust_type != 'pre' or ex_factors is None or len(ex_factors) == 0:
+        return 1.0
+    adjust_orig_dt = np.uint64(convert_date_to_int(adjust_orig))
+    return _factor_for_date(ex_factors['start_date'], ex_factors['ex_cum_factor'], adjust_orig_dt)
 
-    factors = ex_cum_factors.take(dates.searchsorted(bars['datetime'], side='right') - 1)
 
-    # 复权
-    factors /= base_adjust_rate
+def adjust_bars_by_factors(bars, factors, fields, base_adjust_rate):
+    if factors is None or len(bars) == 0 or (factors[0] == base_adjust_rate and factors[-1] == base_adjust_rate):
+        # 累计复权因子单调，首尾相同即无需复权，直接返回视图
+        return bars if fields is None else bars[fields]
+
+    factors = factors / base_adjust_rate
     if isinstance(fields, str):
         if fields in PRICE_FIELDS:
             return bars[fields] * factors
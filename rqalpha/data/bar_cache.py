@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import OrderedDict, namedtuple
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'nbytes', 'max_bytes'])
+
+
+def _nbytes(value):
+    return getattr(value, 'nbytes', 0)
+
+
+class BarCache(object):
+    """
+    按 ndarray.nbytes 计算占用的 LRU 缓存，超过 max_bytes 时淘汰最久未使用的条目；max_bytes 为 None 时不限制大小。
+    """
+    def __init__(self, max_bytes=None):
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key, loader):
+        try:
+            value, size = self._entries.pop(key)
+        except KeyError:
+            self._misses += 1
+            value = loader()
+            size = _nbytes(value)
+            self._nbytes += size
+        else:
+            self._hits += 1
+
+        self._entries[key] = (value, size)
+        self._evict()
+        return value
+
+    def _evict(self):
+        if self._max_bytes is None:
+            return
+        # 至少保留最近使用的一项，避免单个合约超出预算时反复加载
+        while self._nbytes > self._max_bytes and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._nbytes -= size
+            self._evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._nbytes = 0
+
+    def cache_info(self):
+        return CacheInfo(self._hits, self._misses, self._evictions, self._nbytes, self._max_bytes)
@@ -20,42 +20,63 @@ import numpy as np
 
 from rqalpha.interface import AbstractDataSource
 from rqalpha.const import MARGIN_TYPE
-from rqalpha.utils.py2 import lru_cache
-from rqalpha.utils.datetime_func import convert_date_to_int, convert_int_to_date
+from rqalpha.utils.datetime_func import convert_date_to_int, convert_dt_to_int, convert_int_to_date
 from rqalpha.utils.i18n import gettext as _
 
 from rqalpha.data.future_info_cn import CN_FUTURE_INFO
 from rqalpha.data.converter import StockBarConverter, IndexBarConverter
 from rqalpha.data.converter import FutureDayBarConverter, FundDayBarConverter, PublicFundDayBarConverter
-from rqalpha.data.daybar_store import DayBarStore
+from rqalpha.data.daybar_store import DayBarStore, MemmapDayBarStore
+from rqalpha.data.minute_bar_store import MinuteBarStore
+from rqalpha.data.tick_store import TickStore, TickMerger
 from rqalpha.data.date_set import DateSet
 from rqalpha.data.dividend_store import DividendStore
-from rqalpha.data.instrument_store import InstrumentStore
+from rqalpha.data.corporate_action_calendar import CorporateActionCalendar
+from rqalpha.data.instrument_store import InstrumentStore, ColumnarInstrumentStore
 from rqalpha.data.trading_dates_store import TradingDatesStore
 from rqalpha.data.yield_curve_store import YieldCurveStore
 from rqalpha.data.simple_factor_store import SimpleFactorStore
-from rqalpha.data.adjust import adjust_bars, FIELDS_REQUIRE_ADJUSTMENT
+from rqalpha.data.adjust import FIELDS_REQUIRE_ADJUSTMENT, PRICE_FIELDS
+from rqalpha.data.adjust import cum_factors_of, base_adjust_factor, adjust_bars, adjust_bars_by_factors
+from rqalpha.data.bar_cache import BarCache
 from rqalpha.data.public_fund_commission import PUBLIC_FUND_COMMISSION
 
 
 class BaseDataSource(AbstractDataSource):
-    def __init__(self, path):
+    def __init__(self, path, cache_mb=None):
         if not os.path.exists(path):
             raise RuntimeError('bundle path {} not exist'.format(os.path.abspath(path)))
 
         def _p(name):
             return os.path.join(path, name)
 
+        def _day_bar_store(name, converter):
+            # 优先使用 convert_bundle 生成的 memmap 格式
+            if os.path.exists(_p(name + '.npy')):
+                return MemmapDayBarStore(_p(name + '.npy'))
+            return DayBarStore(_p(name + '.bcolz'), converter)
+
         self._day_bars = [
-            DayBarStore(_p('stocks.bcolz'), StockBarConverter),
-            DayBarStore(_p('indexes.bcolz'), IndexBarConverter),
-            DayBarStore(_p('futures.bcolz'), FutureDayBarConverter),
-            DayBarStore(_p('funds.bcolz'), FundDayBarConverter),
+            _day_bar_store('stocks', StockBarConverter),
+            _day_bar_store('indexes', IndexBarConverter),
+            _day_bar_store('futures', FutureDayBarConverter),
+            _day_bar_store('funds', FundDayBarConverter),
         ]
 
-        self._instruments = InstrumentStore(_p('instruments.pk'))
+        # 由 convert_minute_bars 生成的分钟线，可选
+        self._minute_bars = MinuteBarStore(_p('minute_bars.npy')) if os.path.exists(_p('minute_bars.npy')) else None
+        # 由 convert_ticks 生成的 tick 数据，可选
+        self._ticks = TickStore(_p('ticks')) if os.path.isdir(_p('ticks')) else None
+
+        self._bar_cache = BarCache(None if cache_mb is None else int(cache_mb * 1024 * 1024))
+
+        if os.path.exists(_p('instruments.npy')):
+            self._instruments = ColumnarInstrumentStore(_p('instruments.npy'))
+        else:
+            self._instruments = InstrumentStore(_p('instruments.pk'))
         self._dividends = DividendStore(_p('original_dividends.bcolz'))
         self._trading_dates = TradingDatesStore(_p('trading_dates.bcolz'))
+        self._trading_calendar_dt = self._trading_dates.get_trading_calendar_int().astype(np.uint64) * 1000000
         self._yield_curve = YieldCurveStore(_p('yield_curve.bcolz'))
         self._split_factor = SimpleFactorStore(_p('split_factor.bcolz'))
         self._ex_cum_factor = SimpleFactorStore(_p('ex_cum_factor.bcolz'))
@@ -66,18 +87,43 @@ class BaseDataSource(AbstractDataSource):
         self.get_yield_curve = self._yield_curve.get_yield_curve
         self.get_risk_free_rate = self._yield_curve.get_risk_free_rate
         if os.path.exists(_p('public_funds.bcolz')):
-            self._day_bars.append(DayBarStore(_p('public_funds.bcolz'), PublicFundDayBarConverter))
+            self._day_bars.append(_day_bar_store('public_funds', PublicFundDayBarConverter))
             self._public_fund_dividends = DividendStore(_p('public_fund_dividends.bcolz'))
             self._non_subscribable_days = DateSet(_p('non_subscribable_days.bcolz'))
             self._non_redeemable_days = DateSet(_p('non_redeemable_days.bcolz'))
 
+        dividend_stores = [self._dividends]
+        if hasattr(self, '_public_fund_dividends'):
+            dividend_stores.append(self._public_fund_dividends)
+        self._corporate_actions = CorporateActionCalendar(dividend_stores, self._split_factor)
+
     def get_dividend(self, order_book_id, public_fund=False):
         if public_fund:
             return self._public_fund_dividends.get_dividend(order_book_id)
         return self._dividends.get_dividend(order_book_id)
 
-    def get_trading_minutes_for(self, order_book_id, trading_dt):
-        raise NotImplementedError
+    def _overrides(self, name):
+        return six.get_unbound_function(getattr(type(self), name)) is not \
+            six.get_unbound_function(getattr(BaseDataSource, name))
+
+    # 公司行为日历直接由数据包建立；子类覆盖了 get_dividend/get_split 时日历与其数据不一致，
+    # 此时返回 None，由账户逐个持仓通过 get_dividend/get_split 查询
+    def get_dividends_by_book_date(self, date):
+        if self._overrides('get_dividend'):
+            return None
+        return self._corporate_actions.get_dividends_by_book_date(date)
+
+    def get_splits_by_ex_date(self, date):
+        if self._overrides('get_split'):
+            return None
+        return self._corporate_actions.get_splits_by_ex_date(date)
+
+    def get_trading_minutes_for(self, instrument, trading_dt):
+        if self._minute_bars is None:
+            raise NotImplementedError
+        trading_date = trading_dt.year * 10000 + trading_dt.month * 100 + trading_dt.day
+        minutes = self._minute_bars.get_trading_minutes(instrument.order_book_id, trading_date)
+        return None if minutes is None else minutes.tolist()
 
     def get_trading_calendar(self):
         return self._trading_dates.get_trading_calendar()
@@ -91,6 +137,12 @@ class BaseDataSource(AbstractDataSource):
     def is_st_stock(self, order_book_id, dates):
         return self._st_stock_days.contains(order_book_id, dates)
 
+    def is_suspended_many(self, order_book_ids, dt):
+        return self._suspend_days.contains_many(order_book_ids, dt)
+
+    def is_st_stock_many(self, order_book_ids, dt):
+        return self._st_stock_days.contains_many(order_book_ids, dt)
+
     INSTRUMENT_TYPE_MAP = {
         'CS': 0,
         'INDX': 1,
@@ -106,21 +158,48 @@ class BaseDataSource(AbstractDataSource):
     def _index_of(self, instrument):
         return self.INSTRUMENT_TYPE_MAP[instrument.type]
 
-    @lru_cache(None)
     def _all_day_bars_of(self, instrument):
         i = self._index_of(instrument)
-        return self._day_bars[i].get_bars(instrument.order_book_id, fields=None)
+        return self._bar_cache.get(
+            (instrument.order_book_id, 'all'),
+            lambda: self._day_bars[i].get_bars(instrument.order_book_id, fields=None)
+        )
+
+    def _filtered_day_bar_index(self, instrument):
+        # 只缓存非停牌日的行号，不再保存一份过滤后的日线拷贝
+        def _load():
+            bars = self._all_day_bars_of(instrument)
+            if bars is None:
+                return None
+            return np.flatnonzero(bars['volume'] > 0)
+
+        return self._bar_cache.get((instrument.order_book_id, 'filtered'), _load)
+
+    def _ex_cum_factors_of(self, instrument):
+        # 与日线逐行对齐的累计复权因子，优先使用数据包中预先计算好的列
+        def _load():
+            factors = self._day_bars[self._index_of(instrument)].get_ex_cum_factors(instrument.order_book_id)
+            if factors is not None:
+                return factors
+            bars = self._all_day_bars_of(instrument)
+            if bars is None:
+                return None
+            return cum_factors_of(bars['datetime'], self.get_ex_cum_factor(instrument.order_book_id))
 
-    @lru_cache(None)
-    def _filtered_day_bars(self, instrument):
-        bars = self._all_day_bars_of(instrument)
-        if bars is None:
-            return None
-        return bars[bars['volume'] > 0]
+        return self._bar_cache.get((instrument.order_book_id, 'ex_cum_factor'), _load)
+
+    def bar_cache_info(self):
+        return self._bar_cache.cache_info()
+
+    def _check_frequency(self, frequency):
+        if frequency == '1d' or (frequency == '1m' and self._minute_bars is not None):
+            return
+        raise NotImplementedError
 
     def get_bar(self, instrument, dt, frequency):
-        if frequency != '1d':
-            raise NotImplementedError
+        self._check_frequency(frequency)
+        if frequency == '1m':
+            return self._minute_bars.get_bar(instrument.order_book_id, convert_dt_to_int(dt))
 
         bars = self._all_day_bars_of(instrument)
         if bars is None:
@@ -132,12 +211,46 @@ class BaseDataSource(AbstractDataSource):
 
         return bars[pos]
 
+    def get_bars(self, instruments, dt, frequency):
+        self._check_frequency(frequency)
+        if frequency == '1m':
+            return self._minute_bars.get_bars_at([i.order_book_id for i in instruments], convert_dt_to_int(dt))
+
+        groups = {}
+        for n, instrument in enumerate(instruments):
+            groups.setdefault(self._index_of(instrument), []).append(n)
+        result = [None] * len(instruments)
+        for i, rows in six.iteritems(groups):
+            try:
+                get_bars_at = self._day_bars[i].get_bars_at
+            except AttributeError:
+                # bcolz 格式不支持高效的随机读取，使用缓存的整段日线
+                bars = [self.get_bar(instruments[n], dt, frequency) for n in rows]
+            else:
+                bars = get_bars_at([instruments[n].order_book_id for n in rows], convert_date_to_int(dt))
+            for n, bar in zip(rows, bars):
+                result[n] = bar
+        return result
+
     def get_settle_price(self, instrument, date):
         bar = self.get_bar(instrument, date, '1d')
         if bar is None:
             return np.nan
         return bar['settlement']
 
+    def get_settle_prices(self, instruments, date):
+        dt = np.uint64(convert_date_to_int(date))
+        prices = np.full(len(instruments), np.nan)
+        for i, instrument in enumerate(instruments):
+            bars = self._all_day_bars_of(instrument)
+            if bars is None:
+                continue
+            dates = bars['datetime']
+            pos = dates.searchsorted(dt)
+            if pos < len(dates) and dates[pos] == dt:
+                prices[i] = bars['settlement'][pos]
+        return prices
+
     @staticmethod
     def _are_fields_valid(fields, valid_fields):
         if fields is None:
@@ -155,21 +268,24 @@ class BaseDataSource(AbstractDataSource):
     def history_bars(self, instrument, bar_count, frequency, fields, dt,
                      skip_suspended=True, include_now=False,
                      adjust_type='pre', adjust_orig=None):
-        if frequency != '1d':
-            raise NotImplementedError
+        self._check_frequency(frequency)
+        if frequency == '1m':
+            return self._history_minute_bars(instrument, bar_count, fields, dt, include_now, adjust_type, adjust_orig)
 
-        if skip_suspended and instrument.type == 'CS':
-            bars = self._filtered_day_bars(instrument)
-        else:
-            bars = self._all_day_bars_of(instrument)
+        bars = self._all_day_bars_of(instrument)
 
         if bars is None or not self._are_fields_valid(fields, bars.dtype.names):
             return None
 
         dt = np.uint64(convert_date_to_int(dt))
         i = bars['datetime'].searchsorted(dt, side='right')
-        left = i - bar_count if i >= bar_count else 0
-        bars = bars[left:i]
+        if skip_suspended and instrument.type == 'CS':
+            index = self._filtered_day_bar_index(instrument)
+            k = index.searchsorted(i)
+            rows = index[max(k - bar_count, 0):k]
+        else:
+            rows = slice(i - bar_count if i >= bar_count else 0, i)
+        bars = bars[rows]
         if adjust_type == 'none' or instrument.type in {'Future', 'INDX'}:
             # 期货及指数无需复权
             return bars if fields is None else bars[fields]
@@ -177,8 +293,90 @@ class BaseDataSource(AbstractDataSource):
         if isinstance(fields, str) and fields not in FIELDS_REQUIRE_ADJUSTMENT:
             return bars if fields is None else bars[fields]
 
-        return adjust_bars(bars, self.get_ex_cum_factor(instrument.order_book_id),
-                           fields, adjust_type, adjust_orig)
+        factors = self._ex_cum_factors_of(instrument)
+        if factors is None:
+            return bars if fields is None else bars[fields]
+
+        base_adjust_rate = base_adjust_factor(self.get_ex_cum_factor(instrument.order_book_id),
+                                              adjust_type, adjust_orig)
+        return adjust_bars_by_factors(bars, factors[rows], fields, base_adjust_rate)
+
+    def _history_minute_bars(self, instrument, bar_count, fields, dt, include_now, adjust_type, adjust_orig):
+        # 合约的分钟线连续存放，跨交易日的窗口也只是一次切片。
+        # 停牌日本身没有分钟线，因此 skip_suspended 为 True 或 False 的结果相同。
+        # 分钟线只保存已经完成的 bar：dt 正好是某根 bar 的时间时该 bar 总是包含在结果中；
+        # dt 落在一分钟内部（tick 回测）时无法提供尚未完成的当前 bar，不支持 include_now
+        bars = self._minute_bars.get_bars(instrument.order_book_id)
+        if bars is None or not self._are_fields_valid(fields, bars.dtype.names):
+            return None
+
+        dt = np.uint64(convert_dt_to_int(dt))
+        i = bars['datetime'].searchsorted(dt, side='right')
+        if include_now and (i == 0 or bars['datetime'][i - 1] != dt):
+            raise NotImplementedError(_(u"include_now is not supported for minute bars at {}").format(dt))
+        bars = bars[max(i - bar_count, 0):i]
+        if adjust_type == 'none' or instrument.type in {'Future', 'INDX'}:
+            return bars if fields is None else bars[fields]
+
+        if isinstance(fields, six.string_types) and fields not in FIELDS_REQUIRE_ADJUSTMENT:
+            return bars if fields is None else bars[fields]
+
+        return adjust_bars(bars, self.get_ex_cum_factor(instrument.order_book_id), fields, adjust_type, adjust_orig)
+
+    def history_bars_panel(self, instruments, bar_count, frequency, fields, dt, include_now=False,
+                           adjust_type='pre', adjust_orig=None):
+        if frequency != '1d':
+            return super(BaseDataSource, self).history_bars_panel(
+                instruments, bar_count, frequency, fields, dt, include_now, adjust_type, adjust_orig)
+
+        field_list = [fields] if isinstance(fields, six.string_types) else list(fields)
+        calendar = self._trading_calendar_dt
+        end = calendar.searchsorted(np.uint64(convert_date_to_int(dt)), side='right')
+        dates = calendar[max(end - bar_count, 0):end]
+
+        result = np.full((len(instruments), len(dates), len(field_list)), np.nan)
+        # 逐个合约只定位窗口的起止行，之后将所有窗口拼接起来，每个字段只做一次复权计算及写入
+        windows, rows, factors = [], [], []
+        for n, instrument in enumerate(instruments if len(dates) else []):
+            bars = self._all_day_bars_of(instrument)
+            if bars is None:
+                continue
+            s = bars['datetime'].searchsorted(dates[0])
+            e = bars['datetime'].searchsorted(dates[-1], side='right')
+            if s == e:
+                continue
+            windows.append(bars[s:e])
+            rows.append(n)
+
+            factor = None
+            if adjust_type != 'none' and instrument.type not in {'Future', 'INDX'}:
+                factor = self._ex_cum_factors_of(instrument)
+                if factor is not None:
+                    factor = factor[s:e] / base_adjust_factor(
+                        self.get_ex_cum_factor(instrument.order_book_id), adjust_type, adjust_orig)
+            factors.append(np.ones(e - s) if factor is None else factor)
+
+        if not windows:
+            return result[:, :, 0] if isinstance(fields, six.string_types) else result
+
+        row_index = np.repeat(rows, [len(w) for w in windows])
+        pos = dates.searchsorted(np.concatenate([w['datetime'] for w in windows]))
+        factors = np.concatenate(factors)
+        for j, f in enumerate(field_list):
+            present = [f in w.dtype.names for w in windows]
+            if not any(present):
+                continue
+            values = np.concatenate([
+                np.asarray(w[f], dtype=np.float64) if p else np.full(len(w), np.nan)
+                for w, p in zip(windows, present)
+            ])
+            if f in PRICE_FIELDS:
+                values = values * factors
+            elif f == 'volume':
+                values = values * (1 / factors)
+            result[row_index, pos, j] = values
+
+        return result[:, :, 0] if isinstance(fields, six.string_types) else result
 
     def get_yield_curve(self, start_date, end_date, tenor=None):
         return self._yield_curve.get_yield_curve(start_date, end_date, tenor)
@@ -186,6 +384,18 @@ class BaseDataSource(AbstractDataSource):
     def get_risk_free_rate(self, start_date, end_date):
         return self._yield_curve.get_risk_free_rate(start_date, end_date)
 
+    def history_ticks(self, instrument, count, dt):
+        if self._ticks is None:
+            raise NotImplementedError
+        return self._ticks.history_ticks(instrument.order_book_id, count, dt)
+
+    def get_merge_ticks(self, order_book_id_list, trading_date, last_dt=None):
+        if self._ticks is None:
+            raise NotImplementedError
+        date = trading_date.year * 10000 + trading_date.month * 100 + trading_date.day
+        return TickMerger(lambda order_book_id: self._ticks.get_ticks(order_book_id, date), order_book_id_list,
+                          last_dt)
+
     def current_snapshot(self, instrument, frequency, dt):
         raise NotImplementedError
 
@@ -197,6 +407,10 @@ class BaseDataSource(AbstractDataSource):
             s, e = self._day_bars[self.INSTRUMENT_TYPE_MAP['INDX']].get_date_range('000001.XSHG')
             return convert_int_to_date(s).date(), convert_int_to_date(e).date()
 
+        if frequency == '1m' and self._minute_bars is not None:
+            s, e = self._minute_bars.get_date_range()
+            return convert_int_to_date(s).date(), convert_int_to_date(e).date()
+
         raise NotImplementedError
 
     def get_margin_info(self, instrument):
@@ -224,6 +438,12 @@ class BaseDataSource(AbstractDataSource):
     def non_redeemable(self, order_book_id, dates):
         return self._non_redeemable_days.contains(order_book_id, dates)
 
+    def non_subscribable_many(self, order_book_ids, dt):
+        return self._non_subscribable_days.contains_many(order_book_ids, dt)
+
+    def non_redeemable_many(self, order_book_ids, dt):
+        return self._non_redeemable_days.contains_many(order_book_ids, dt)
+
     def get_tick_size(self, instrument):
         if instrument.type in ['CS', 'INDX']:
             return 0.01
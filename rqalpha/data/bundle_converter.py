@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import bcolz
+import numpy as np
+import six
+
+from rqalpha.utils.i18n import gettext as _
+from rqalpha.data.converter import StockBarConverter, IndexBarConverter
+from rqalpha.data.converter import FutureDayBarConverter, FundDayBarConverter, PublicFundDayBarConverter
+from rqalpha.data.daybar_store import line_map_file, load_line_map, save_line_map, ex_cum_factor_file
+from rqalpha.data.instrument_store import convert_instruments
+from rqalpha.data.simple_factor_store import SimpleFactorStore
+from rqalpha.data.adjust import cum_factors_of
+
+
+DAY_BAR_TABLES = [
+    ('stocks', StockBarConverter),
+    ('indexes', IndexBarConverter),
+    ('futures', FutureDayBarConverter),
+    ('funds', FundDayBarConverter),
+    ('public_funds', PublicFundDayBarConverter),
+]
+
+# 需要复权的日线表
+ADJUSTED_DAY_BAR_TABLES = {'stocks', 'funds', 'public_funds'}
+
+CHUNK_SIZE = 1 << 20
+
+
+def convert_day_bars(source, target, converter):
+    """
+    将 bcolz 日线表转换为可被 :class:`~MemmapDayBarStore` 直接 memmap 的 .npy 文件，价格字段在转换时完成缩放。
+    """
+    table = bcolz.open(source, 'r')
+    fields = [f for f in table.names if f != 'date']
+    dtype = np.dtype([('datetime', np.uint64)] +
+                     [(f, converter.field_type(f, table.cols[f].dtype)) for f in fields])
+
+    result = np.lib.format.open_memmap(target, mode='w+', dtype=dtype, shape=(len(table), ))
+    for s in six.moves.range(0, len(table), CHUNK_SIZE):
+        e = min(s + CHUNK_SIZE, len(table))
+        for f in fields:
+            result[f][s:e] = converter.convert(f, table.cols[f][s:e])
+        result['datetime'][s:e] = table.cols['date'][s:e]
+        result['datetime'][s:e] *= 1000000
+    result.flush()
+    del result
+
+    save_line_map(line_map_file(target), table.attrs['line_map'])
+
+
+def convert_ex_cum_factors(day_bars, ex_cum_factor_store):
+    """
+    为 .npy 日线生成逐行对齐的累计复权因子列，history_bars 复权时只需一次向量化运算。
+    """
+    bars = np.load(day_bars, mmap_mode='r')
+    result = np.lib.format.open_memmap(ex_cum_factor_file(day_bars), mode='w+', dtype=np.float64,
+                                       shape=(len(bars), ))
+    result[:] = 1
+    for order_book_id, (s, e) in six.iteritems(load_line_map(line_map_file(day_bars))):
+        factors = cum_factors_of(bars['datetime'][s:e], ex_cum_factor_store.get_factors(order_book_id))
+        if factors is not None:
+            result[s:e] = factors
+    result.flush()
+
+
+def convert_bundle(path):
+    source = os.path.join(path, 'instruments.pk')
+    if os.path.exists(source):
+        six.print_(_(u"converting {} ...").format(source))
+        convert_instruments(source, os.path.join(path, 'instruments.npy'))
+
+    ex_cum_factor_store = SimpleFactorStore(os.path.join(path, 'ex_cum_factor.bcolz'))
+    for name, converter in DAY_BAR_TABLES:
+        source = os.path.join(path, name + '.bcolz')
+        if not os.path.exists(source):
+            continue
+        six.print_(_(u"converting {} ...").format(source))
+        convert_day_bars(source, os.path.join(path, name + '.npy'), converter)
+        if name in ADJUSTED_DAY_BAR_TABLES:
+            convert_ex_cum_factors(os.path.join(path, name + '.npy'), ex_cum_factor_store)
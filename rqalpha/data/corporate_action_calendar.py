@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import defaultdict
+
+import six
+
+from rqalpha.utils.datetime_func import convert_date_to_int
+
+
+def _index_by_date(store, date_field):
+    result = defaultdict(dict)
+    for order_book_id, rows in store.items():
+        dates = rows[date_field].tolist()
+        # 倒序写入，同一天有多条记录时保留第一条，与 searchsorted 的结果一致
+        for pos in six.moves.range(len(dates) - 1, -1, -1):
+            result[dates[pos]][order_book_id] = rows[pos]
+    return dict(result)
+
+
+class CorporateActionCalendar(object):
+    """
+    以日期为键的公司行为日历：股权登记日 -> {order_book_id: 分红记录}，除权日 -> {order_book_id: 拆分比例}。
+    在数据加载时一次建立，账户每天只需处理当天有事件的合约。
+    """
+    def __init__(self, dividend_stores, split_factor_store):
+        self._book_closures = {}
+        for store in dividend_stores:
+            for date, dividends in six.iteritems(_index_by_date(store, 'book_closure_date')):
+                self._book_closures.setdefault(date, {}).update(dividends)
+
+        self._splits = {
+            date: {order_book_id: row['split_factor'] for order_book_id, row in six.iteritems(splits)}
+            for date, splits in six.iteritems(_index_by_date(split_factor_store, 'ex_date'))
+        }
+
+    def get_dividends_by_book_date(self, date):
+        return self._book_closures.get(date.year * 10000 + date.month * 100 + date.day, {})
+
+    def get_splits_by_ex_date(self, date):
+        return self._splits.get(convert_date_to_int(date), {})
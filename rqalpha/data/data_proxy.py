@@ -21,6 +21,7 @@ import pandas as pd
 from rqalpha.data import risk_free_helper
 from rqalpha.data.instrument_mixin import InstrumentMixin
 from rqalpha.data.trading_dates_mixin import TradingDatesMixin
+from rqalpha.environment import Environment
 from rqalpha.model.bar import BarObject
 from rqalpha.model.snapshot import SnapshotObject
 from rqalpha.utils.py2 import lru_cache
@@ -30,6 +31,9 @@ from rqalpha.utils.datetime_func import convert_int_to_datetime, convert_date_to
 class DataProxy(InstrumentMixin, TradingDatesMixin):
     def __init__(self, data_source):
         self._data_source = data_source
+        # 最近一次查询停牌的日期及当日各合约是否停牌
+        self._suspended_date = None
+        self._suspended = {}
         try:
             self.get_risk_free_rate = data_source.get_risk_free_rate
         except AttributeError:
@@ -94,6 +98,26 @@ class DataProxy(InstrumentMixin, TradingDatesMixin):
 
         return df['split_factor'][pos]
 
+    def get_dividends_by_book_date(self, date):
+        """
+        :return: dict {order_book_id: 分红记录}，股权登记日为 date 的全部分红；数据源不提供公司行为日历时返回 None
+        """
+        try:
+            func = self._data_source.get_dividends_by_book_date
+        except AttributeError:
+            return None
+        return func(date)
+
+    def get_splits_by_ex_date(self, date):
+        """
+        :return: dict {order_book_id: 拆分比例}，除权日为 date 的全部拆分；数据源不提供公司行为日历时返回 None
+        """
+        try:
+            func = self._data_source.get_splits_by_ex_date
+        except AttributeError:
+            return None
+        return func(date)
+
     @lru_cache(10240)
     def _get_prev_close(self, order_book_id, dt):
         instrument = self.instruments(order_book_id)
@@ -128,12 +152,35 @@ class DataProxy(InstrumentMixin, TradingDatesMixin):
             return np.nan
         return self._data_source.get_settle_price(instrument, date)
 
+    def get_settle_prices(self, order_book_ids, date):
+        """
+        :return: numpy.ndarray，与 order_book_ids 一一对应的结算价，非期货合约或没有数据时为 NaN
+        """
+        instruments = [self.instruments(o) for o in order_book_ids]
+        is_future = np.array([i.type == 'Future' for i in instruments], dtype=bool)
+        prices = np.full(len(instruments), np.nan)
+        if not is_future.any():
+            return prices
+        futures = [i for i in instruments if i.type == 'Future']
+        try:
+            func = self._data_source.get_settle_prices
+        except AttributeError:
+            prices[is_future] = [self._data_source.get_settle_price(i, date) for i in futures]
+        else:
+            prices[is_future] = func(futures, date)
+        return prices
+
     def get_bar(self, order_book_id, dt, frequency='1d'):
         instrument = self.instruments(order_book_id)
         bar = self._data_source.get_bar(instrument, dt, frequency)
         if bar:
             return BarObject(instrument, bar)
 
+    def get_raw_bars(self, instruments, dt, frequency='1d'):
+        # 批量获取数据源返回的原始 bar，没有数据的合约为 None
+        bars = self._data_source.get_bars(instruments, dt, frequency)
+        return [bar if bar else None for bar in bars]
+
     def history(self, order_book_id, bar_count, frequency, field, dt):
         data = self.history_bars(order_book_id, bar_count, frequency,
                                  ['datetime', field], dt, skip_suspended=False, adjust_orig=dt)
@@ -155,6 +202,15 @@ class DataProxy(InstrumentMixin, TradingDatesMixin):
                                               skip_suspended=skip_suspended, include_now=include_now,
                                               adjust_type=adjust_type, adjust_orig=adjust_orig)
 
+    def history_bars_panel(self, order_book_ids, bar_count, frequency, fields, dt,
+                           include_now=False, adjust_type='pre', adjust_orig=None):
+        instruments = self.instruments(order_book_ids)
+        if adjust_orig is None:
+            adjust_orig = dt
+        return self._data_source.history_bars_panel(instruments, bar_count, frequency, fields, dt,
+                                                    include_now=include_now, adjust_type=adjust_type,
+                                                    adjust_orig=adjust_orig)
+
     def history_ticks(self, order_book_id, count, dt):
         instrument = self.instruments(order_book_id)
         return self._data_source.history_ticks(instrument, count, dt)
@@ -218,6 +274,46 @@ class DataProxy(InstrumentMixin, TradingDatesMixin):
         trading_dates = self.get_n_trading_dates_until(dt, count)
         return self._data_source.non_redeemable(order_book_id, trading_dates)
 
+    def _many(self, name, order_book_ids, dt):
+        # 数据源没有提供批量接口时逐个查询
+        try:
+            func = getattr(self._data_source, name + '_many')
+        except AttributeError:
+            single = getattr(self._data_source, name)
+            return np.array([single(o, [dt])[0] for o in order_book_ids], dtype=bool)
+        return func(order_book_ids, dt)
+
+    def is_suspended_many(self, order_book_ids, dt):
+        """
+        :return: numpy.ndarray[bool] 各合约在 dt 当日是否停牌，与 order_book_ids 一一对应
+        """
+        return self._many('is_suspended', order_book_ids, dt)
+
+    def is_suspended_at(self, order_book_id, dt):
+        """
+        单个合约在 dt 当日是否停牌。每个日期第一次查询时通过 is_suspended_many 一次查询整个 universe，
+        之后直接使用缓存；不在 universe 中的合约单独查询后加入缓存。
+        """
+        date = dt if isinstance(dt, six.integer_types) else dt.year * 10000 + dt.month * 100 + dt.day
+        if date != self._suspended_date:
+            universe = sorted(Environment.get_instance().get_universe())
+            self._suspended = dict(zip(universe, (bool(s) for s in self.is_suspended_many(universe, dt))))
+            self._suspended_date = date
+        try:
+            return self._suspended[order_book_id]
+        except KeyError:
+            suspended = self._suspended[order_book_id] = bool(self.is_suspended_many([order_book_id], dt)[0])
+            return suspended
+
+    def is_st_stock_many(self, order_book_ids, dt):
+        return self._many('is_st_stock', order_book_ids, dt)
+
+    def non_subscribable_many(self, order_book_ids, dt):
+        return self._many('non_subscribable', order_book_ids, dt)
+
+    def non_redeemable_many(self, order_book_ids, dt):
+        return self._many('non_redeemable', order_book_ids, dt)
+
     def public_fund_commission(self, order_book_id, buy):
         instrument = self.instruments(order_book_id)
         return self._data_source.public_fund_commission(instrument, buy)
@@ -16,40 +16,89 @@
 
 import bcolz
 import numpy as np
+import six
 
-from rqalpha.utils.py2 import lru_cache
+
+def _to_dt_int(d):
+    if isinstance(d, (six.integer_types, np.integer)):
+        return int(d // 1000000) if d > 100000000 else int(d)
+    else:
+        return d.year*10000 + d.month*100 + d.day
+
+
+def to_date_ints(dates):
+    """
+    将 date/datetime/Timestamp/yyyymmdd/yyyymmddhhmmss 组成的序列转换为 yyyymmdd 整数数组
+    """
+    if hasattr(dates, 'year') and hasattr(dates, '__len__'):
+        # DatetimeIndex
+        return np.asarray(dates.year * 10000 + dates.month * 100 + dates.day, dtype=np.int64)
+    return np.array([_to_dt_int(d) for d in dates], dtype=np.int64)
 
 
 class DateSet(object):
+    """
+    以 (日期序号, 合约序号) 为下标的位图。日期为数据中出现过的所有日期，每个合约占一位，
+    单个合约多个日期或多个合约单个日期的查询都只需一次 NumPy 运算。
+    """
     def __init__(self, f):
         dates = bcolz.open(f, 'r')
-        self._index = dates.attrs['line_map']
-        self._dates = dates[:]
+        line_map = dates.attrs['line_map']
+        all_dates = dates[:].astype(np.int64)
+
+        self._order_book_ids = list(line_map.keys())
+        self._column = {order_book_id: i for i, order_book_id in enumerate(self._order_book_ids)}
 
-    @lru_cache(None)
-    def _get_set(self, s, e):
-        return set(self._dates[s:e].tolist())
+        columns = np.full(len(all_dates), -1, dtype=np.int64)
+        for order_book_id, (s, e) in six.iteritems(line_map):
+            columns[s:e] = self._column[order_book_id]
+        mask = columns >= 0
+        all_dates, columns = all_dates[mask], columns[mask]
+
+        self._dates = np.unique(all_dates)
+        rows = self._dates.searchsorted(all_dates)
+        self._bitmap = np.zeros((len(self._dates), (len(self._order_book_ids) + 7) // 8), dtype=np.uint8)
+        np.bitwise_or.at(self._bitmap, (rows, columns >> 3), (0x80 >> (columns & 7)).astype(np.uint8))
+
+    def _rows_of(self, date_ints):
+        rows = self._dates.searchsorted(date_ints)
+        rows[rows == len(self._dates)] = 0
+        found = self._dates[rows] == date_ints if len(self._dates) else np.zeros(len(date_ints), dtype=bool)
+        return rows, found
+
+    def _test(self, rows, columns):
+        return ((self._bitmap[rows, columns >> 3] >> (7 - (columns & 7))) & 1).astype(bool)
 
     def get_days(self, order_book_id):
         try:
-            s, e = self._index[order_book_id]
+            column = self._column[order_book_id]
         except KeyError:
             return []
 
-        return self._get_set(s, e)
+        rows = np.arange(len(self._dates))
+        return set(self._dates[self._test(rows, np.full(len(rows), column, dtype=np.int64))].tolist())
 
     def contains(self, order_book_id, dates):
         try:
-            s, e = self._index[order_book_id]
+            column = self._column[order_book_id]
         except KeyError:
             return [False] * len(dates)
 
-        def _to_dt_int(d):
-            if isinstance(d, (int, np.int64, np.uint64)):
-                return int(d // 1000000) if d > 100000000 else int(d)
-            else:
-                return d.year*10000 + d.month*100 + d.day
-
-        date_set = self._get_set(s, e)
+        rows, found = self._rows_of(to_date_ints(dates))
+        result = self._test(rows, np.full(len(rows), column, dtype=np.int64)) & found
+        return result.tolist()
 
-        return [(_to_dt_int(d) in date_set) for d in dates]
+    def contains_many(self, order_book_ids, date):
+        """
+        :param order_book_ids: list[str]
+        :param date: 单个日期
+        :return: numpy.ndarray[bool] 与 order_book_ids 一一对应
+        """
+        result = np.zeros(len(order_book_ids), dtype=bool)
+        rows, found = self._rows_of(to_date_ints([date]))
+        if not found[0]:
+            return result
+        columns = np.array([self._column.get(o, -1) for o in order_book_ids], dtype=np.int64)
+        known = columns >= 0
+        result[known] = self._test(np.full(known.sum(), rows[0], dtype=np.int64), columns[known])
+        return result
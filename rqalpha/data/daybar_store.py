@@ -14,6 +14,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+
 import bcolz
 import numpy as np
 import six
@@ -65,3 +67,119 @@ class DayBarStore(object):
     def get_date_range(self, order_book_id):
         s, e = self._index[order_book_id]
         return self._table.cols['date'][s], self._table.cols['date'][e - 1]
+
+    def get_ex_cum_factors(self, order_book_id):
+        # bcolz 格式没有预先计算的复权因子
+        return None
+
+
+def search_rows(table, index, order_book_ids, dt):
+    """
+    在按 (order_book_id, datetime) 连续存放的表中批量查找各合约 datetime == dt 的行号。
+    所有合约的区间同时做二分查找，返回 numpy.ndarray，没有数据的合约为 -1
+    """
+    ranges = np.array([index.get(o, (0, 0)) for o in order_book_ids], dtype=np.int64).reshape(-1, 2)
+    lo, end = ranges[:, 0].copy(), ranges[:, 1]
+    hi = end.copy()
+    dates = table['datetime']
+    active = lo < hi
+    while active.any():
+        mid = np.where(active, (lo + hi) // 2, 0)
+        right = active & (dates[mid] < dt)
+        lo = np.where(right, mid + 1, lo)
+        hi = np.where(active & ~right, mid, hi)
+        active = lo < hi
+    found = np.flatnonzero(lo < end)
+    found = found[dates[lo[found]] == dt]
+    rows = np.full(len(ranges), -1, dtype=np.int64)
+    rows[found] = lo[found]
+    return rows
+
+
+def take_rows(table, rows):
+    """
+    按 search_rows 的结果一次读出各行，返回 list，没有数据的位置为 None
+    """
+    found = np.flatnonzero(rows >= 0)
+    result = [None] * len(rows)
+    for i, bar in zip(found.tolist(), table[rows[found]]):
+        result[i] = bar
+    return result
+
+
+def line_map_file(f):
+    return f[:-len('.npy')] + '_line_map.npy'
+
+
+def ex_cum_factor_file(f):
+    return f[:-len('.npy')] + '_ex_cum_factor.npy'
+
+
+def load_line_map(f):
+    line_map = np.load(f)
+    return {o: (s, e) for o, s, e in zip(line_map['order_book_id'].tolist(),
+                                           line_map['start'].tolist(),
+                                           line_map['end'].tolist())}
+
+
+def save_line_map(f, line_map):
+    order_book_ids = sorted(line_map)
+    id_len = max([len(o) for o in order_book_ids] + [1])
+    index = np.empty((len(order_book_ids), ), dtype=np.dtype([
+        ('order_book_id', 'U{}'.format(id_len)), ('start', np.int64), ('end', np.int64)
+    ]))
+    index['order_book_id'] = order_book_ids
+    index['start'] = [line_map[o][0] for o in order_book_ids]
+    index['end'] = [line_map[o][1] for o in order_book_ids]
+    np.save(f, index)
+
+
+class MemmapDayBarStore(object):
+    """
+    读取由 :func:`rqalpha.data.bundle_converter.convert_day_bars` 生成的 .npy 日线数据。
+
+    数据在转换时已经完成了 Converter 的缩放，所有合约的日线连续存放在同一个结构化数组中，并通过 np.memmap 打开，
+    get_bars 返回的是对该数组的切片，不会发生拷贝；多个回测进程可以共享同一份 page cache。
+    """
+    def __init__(self, main):
+        self._table = np.load(main, mmap_mode='r')
+        self._index = load_line_map(line_map_file(main))
+        if os.path.exists(ex_cum_factor_file(main)):
+            self._ex_cum_factors = np.load(ex_cum_factor_file(main), mmap_mode='r')
+        else:
+            self._ex_cum_factors = None
+
+    def get_bars(self, order_book_id, fields=None):
+        try:
+            s, e = self._index[order_book_id]
+        except KeyError:
+            six.print_(_(u"No data for {}").format(order_book_id))
+            return
+
+        if fields is None:
+            return self._table[s:e]
+
+        if len(fields) == 1:
+            return self._table[fields[0]][s:e]
+
+        fields = ['datetime'] + [f for f in fields if f != 'datetime']
+        return self._table[fields][s:e]
+
+    def get_date_range(self, order_book_id):
+        s, e = self._index[order_book_id]
+        return self._table['datetime'][s] // 1000000, self._table['datetime'][e - 1] // 1000000
+
+    def get_bars_at(self, order_book_ids, dt):
+        """
+        批量获取一组合约在 dt（YYYYMMDD000000）的 bar，返回 list，没有数据的合约为 None
+        """
+        return take_rows(self._table, search_rows(self._table, self._index, order_book_ids, np.uint64(dt)))
+
+    def get_ex_cum_factors(self, order_book_id):
+        if self._ex_cum_factors is None:
+            return None
+        try:
+            s, e = self._index[order_book_id]
+        except KeyError:
+            return None
+        return self._ex_cum_factors[s:e]
@@ -16,6 +16,7 @@
 
 import bcolz
 import numpy as np
+import six
 
 
 class DividendStore(object):
@@ -34,6 +35,10 @@ class DividendStore(object):
         self._table['dividend_cash_before_tax'] = ct['cash_before_tax'][:] / 10000.0
         self._table['round_lot'][:] = ct['round_lot']
 
+    def items(self):
+        for order_book_id, (s, e) in six.iteritems(self._index):
+            yield order_book_id, self._table[s:e]
+
     def get_dividend(self, order_book_id):
         try:
             s, e = self._index[order_book_id]
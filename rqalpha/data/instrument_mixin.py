@@ -14,47 +14,122 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import numpy as np
 import six
 
+from rqalpha.data.instrument_store import instrument_columns
+
 
 class InstrumentMixin(object):
     def __init__(self, instruments):
-        self._instruments = {i.order_book_id: i for i in instruments}
-        self._sym_id_map = {i.symbol: k for k, i in six.iteritems(self._instruments)
-                            # 过滤掉 CSI300, SSE50, CSI500, SSE180
-                            if not i.order_book_id.endswith('INDX')}
+        # instruments 可以是 Instrument 列表，也可以是带有 columns 的按需构造序列（见 ColumnarInstrumentStore），
+        # 后者在建立索引时不会构造 Instrument
+        columns = getattr(instruments, 'columns', None)
+        if columns is None:
+            instruments = list(instruments)
+            columns = instrument_columns(instruments)
+        self._instrument_list = instruments
+        self._order_book_ids = columns['order_book_id'].tolist()
+        self._instrument_index = dict(zip(self._order_book_ids, six.moves.range(len(self._order_book_ids))))
+        self._build_catalogue(columns)
+
+        # 过滤掉 CSI300, SSE50, CSI500, SSE180
+        mask = ~np.char.endswith(columns['order_book_id'], 'INDX')
+        self._sym_id_map = dict(zip(columns['symbol'][mask].tolist(), columns['order_book_id'][mask].tolist()))
+        symbols = columns['symbol']
         try:
             # FIXME
             # 沪深300 中证500 固定使用上证的
             for o in ['000300.XSHG', '000905.XSHG']:
-                self._sym_id_map[self._instruments[o].symbol] = o
+                self._sym_id_map[symbols[self._instrument_index[o]]] = o
             # 上证180 及 上证180指数 两个symbol都指向 000010.XSHG
-            self._sym_id_map[self._instruments['SSE180.INDX'].symbol] = '000010.XSHG'
+            self._sym_id_map[symbols[self._instrument_index['SSE180.INDX']]] = '000010.XSHG'
         except KeyError:
             pass
 
+    @staticmethod
+    def _group_by(keys, positions):
+        # 按 keys 分组，组内保持 positions 的顺序
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        order = np.argsort(inverse, kind='mergesort')
+        bounds = np.searchsorted(inverse[order], np.arange(len(unique_keys) + 1))
+        return {k: positions[order[bounds[n]:bounds[n + 1]]] for n, k in enumerate(unique_keys.tolist())}
+
+    def _build_catalogue(self, columns):
+        # 合约目录：按类型、板块、行业、期货品种预先建立索引，
+        # 上市/退市日期以 ordinal 整数数组保存，按日期筛选时只需一次向量化比较
+        self._listed_ordinals = np.asarray(columns['listed_date'], dtype=np.int64)
+        self._de_listed_ordinals = np.asarray(columns['de_listed_date'], dtype=np.int64)
+
+        order_book_ids = columns['order_book_id']
+        types = columns['type']
+        self._positions_by_type = self._group_by(types, np.arange(len(types)))
+
+        stocks = self._positions_by_type.get('CS', np.empty(0, dtype=np.int64))
+        self._ids_by_sector = {k: order_book_ids[v].tolist()
+                               for k, v in six.iteritems(self._group_by(columns['sector_code'][stocks], stocks))}
+        self._ids_by_industry = {k: order_book_ids[v].tolist()
+                                 for k, v in six.iteritems(self._group_by(columns['industry_code'][stocks], stocks))}
+
+        futures = self._positions_by_type.get('Future', np.empty(0, dtype=np.int64))
+        futures = futures[~(np.char.endswith(order_book_ids[futures], '88') |
+                            np.char.endswith(order_book_ids[futures], '99'))]
+        # 按 order_book_id 排序，get_future_contracts 无需再次排序
+        futures = futures[np.argsort(order_book_ids[futures], kind='mergesort')]
+        self._futures_by_underlying = self._group_by(columns['underlying_symbol'][futures], futures)
+        self._type_positions_cache = {}
+
+    def _positions_of_types(self, types):
+        if types is None:
+            return None
+        if isinstance(types, six.string_types):
+            types = (types, )
+        key = frozenset(types)
+        try:
+            return self._type_positions_cache[key]
+        except KeyError:
+            pass
+        positions = [self._positions_by_type[t] for t in key if t in self._positions_by_type]
+        if positions:
+            # 保持与合约原始顺序一致
+            positions = np.sort(np.concatenate(positions))
+        else:
+            positions = np.empty(0, dtype=np.int64)
+        self._type_positions_cache[key] = positions
+        return positions
+
+    def _alive_mask(self, positions, dt):
+        d = dt.toordinal()
+        if positions is None:
+            return (self._listed_ordinals <= d) & (d <= self._de_listed_ordinals)
+        return (self._listed_ordinals[positions] <= d) & (d <= self._de_listed_ordinals[positions])
+
     def sector(self, code):
-        return [v.order_book_id for v in self._instruments.values()
-                if v.type == 'CS' and v.sector_code == code]
+        return list(self._ids_by_sector.get(code, []))
 
     def industry(self, code):
-        return [v.order_book_id for v in self._instruments.values()
-                if v.type == 'CS' and v.industry_code == code]
+        return list(self._ids_by_industry.get(code, []))
 
     def all_instruments(self, types, dt=None):
-        return [i for i in self._instruments.values()
-                if ((dt is None or i.listed_date.date() <= dt.date() <= i.de_listed_date.date()) and
-                    (types is None or i.type in types))]
+        positions = self._positions_of_types(types)
+        if dt is not None:
+            mask = self._alive_mask(positions, dt)
+            positions = np.flatnonzero(mask) if positions is None else positions[mask]
+        if positions is None:
+            return list(self._instrument_list)
+
+        instrument_list = self._instrument_list
+        return [instrument_list[p] for p in positions]
 
     def _instrument(self, sym_or_id):
         try:
-            return self._instruments[sym_or_id]
+            pos = self._instrument_index[sym_or_id]
         except KeyError:
             try:
-                sym_or_id = self._sym_id_map[sym_or_id]
-                return self._instruments[sym_or_id]
+                pos = self._instrument_index[self._sym_id_map[sym_or_id]]
             except KeyError:
                 return None
+        return self._instrument_list[pos]
 
     def instruments(self, sym_or_ids):
         if isinstance(sym_or_ids, six.string_types):
@@ -63,11 +138,11 @@ class InstrumentMixin(object):
         return [i for i in [self._instrument(sid) for sid in sym_or_ids] if i is not None]
 
     def get_future_contracts(self, underlying, date):
-        date = date.replace(hour=0, minute=0, second=0)
-        futures = [v for o, v in six.iteritems(self._instruments)
-                   if v.type == 'Future' and v.underlying_symbol == underlying and
-                   not o.endswith('88') and not o.endswith('99')]
-        if not futures:
+        try:
+            positions = self._futures_by_underlying[underlying]
+        except KeyError:
             return []
 
-        return sorted(i.order_book_id for i in futures if i.listed_date <= date <= i.de_listed_date)
+        # positions 已按 order_book_id 排序
+        positions = positions[self._alive_mask(positions, date)]
+        return [self._order_book_ids[p] for p in positions]
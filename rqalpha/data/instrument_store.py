@@ -14,11 +14,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import datetime
 import pickle
 
+import numpy as np
+import six
+
 from rqalpha.model.instrument import Instrument
 
 
+# 以 ordinal 整数保存的日期字段
+DATE_FIELDS = ('listed_date', 'de_listed_date', 'maturity_date')
+
+# 合约目录需要的列，字符串缺失时以空串保存
+STRING_COLUMNS = ('order_book_id', 'symbol', 'type', 'sector_code', 'industry_code', 'underlying_symbol')
+
+
 class InstrumentStore(object):
     def __init__(self, f):
         with open(f, 'rb') as store:
@@ -27,3 +38,93 @@ class InstrumentStore(object):
 
     def get_all_instruments(self):
         return self._instruments
+
+
+def _string_column(instruments, name):
+    values = []
+    for i in instruments:
+        v = getattr(i, name, None)
+        values.append(u'' if v is None else six.text_type(v))
+    return np.array(values, dtype='U')
+
+
+def instrument_columns(instruments):
+    """
+    从 Instrument 对象列表中抽取合约目录需要的列。
+    """
+    columns = {name: _string_column(instruments, name) for name in STRING_COLUMNS}
+    columns['listed_date'] = np.array([
+        getattr(i, 'listed_date', Instrument.DEFAULT_LISTED_DATE).toordinal() for i in instruments
+    ], dtype=np.int32)
+    columns['de_listed_date'] = np.array([
+        getattr(i, 'de_listed_date', Instrument.DEFAULT_DE_LISTED_DATE).toordinal() for i in instruments
+    ], dtype=np.int32)
+    return columns
+
+
+def convert_instruments(source, target):
+    """
+    将 instruments.pk 转换为结构化数组 instruments.npy：合约目录需要的列单独成列，日期以 ordinal 整数保存，
+    其余字段逐个合约 pickle 后存入 payload 列，加载时只需一次读取。
+    """
+    with open(source, 'rb') as store:
+        d = pickle.load(store)
+    instruments = [Instrument(dict(i)) for i in d]
+    columns = instrument_columns(instruments)
+
+    payloads = []
+    for i in instruments:
+        dic = dict(i.__dict__)
+        for name in DATE_FIELDS:
+            if name in dic:
+                dic[name] = dic[name].toordinal()
+        payloads.append(pickle.dumps(dic, protocol=2))
+
+    dtype = [(name, columns[name].dtype) for name in STRING_COLUMNS]
+    dtype += [('listed_date', np.int32), ('de_listed_date', np.int32),
+              ('payload', 'S{}'.format(max([len(p) for p in payloads] + [1])))]
+    table = np.empty((len(instruments), ), dtype=np.dtype(dtype))
+    for name in STRING_COLUMNS:
+        table[name] = columns[name]
+    table['listed_date'] = columns['listed_date']
+    table['de_listed_date'] = columns['de_listed_date']
+    table['payload'] = payloads
+    np.save(target, table)
+
+
+class LazyInstrumentList(object):
+    """
+    按需构造 Instrument 的只读序列，合约目录直接读取 :attr:`columns`，不会触发 Instrument 的构造。
+    """
+    def __init__(self, table):
+        self._table = table
+        self._instruments = [None] * len(table)
+        self.columns = {name: table[name] for name in STRING_COLUMNS + ('listed_date', 'de_listed_date')}
+
+    def _materialize(self, pos):
+        dic = pickle.loads(self._table['payload'][pos])
+        for name in DATE_FIELDS:
+            if name in dic:
+                dic[name] = datetime.datetime.fromordinal(dic[name])
+        return Instrument(dic)
+
+    def __len__(self):
+        return len(self._instruments)
+
+    def __getitem__(self, pos):
+        instrument = self._instruments[pos]
+        if instrument is None:
+            instrument = self._instruments[pos] = self._materialize(pos)
+        return instrument
+
+    def __iter__(self):
+        for pos in six.moves.range(len(self._instruments)):
+            yield self[pos]
+
+
+class ColumnarInstrumentStore(object):
+    def __init__(self, f):
+        self._instruments = LazyInstrumentList(np.load(f))
+
+    def get_all_instruments(self):
+        return self._instruments
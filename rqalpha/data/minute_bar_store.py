@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pandas as pd
+import six
+
+from rqalpha.utils.i18n import gettext as _
+from rqalpha.data.daybar_store import line_map_file, load_line_map, save_line_map, search_rows, take_rows
+
+
+# 分钟线表中不属于行情字段的列
+INDEX_COLUMNS = ('order_book_id', 'datetime', 'trading_date')
+
+
+class MinuteBarStore(object):
+    """
+    读取由 :func:`convert_minute_bars` 生成的分钟线数据。
+
+    所有合约的分钟线按 (order_book_id, datetime) 排序后连续存放在同一个结构化数组中，通过 np.memmap 打开；
+    每个合约占据一段连续的行（line map 记录起止行号），段内按交易日分块，交易日的边界通过
+    trading_date 列上的 searchsorted 得到。跨交易日的 history_bars 只是对该段的一次切片。
+    """
+    def __init__(self, main):
+        self._path = main
+        self._table = np.load(main, mmap_mode='r')
+        self._index = load_line_map(line_map_file(main))
+
+    def get_bars(self, order_book_id):
+        try:
+            s, e = self._index[order_book_id]
+        except KeyError:
+            return None
+        return self._table[s:e]
+
+    def get_bar(self, order_book_id, dt):
+        bars = self.get_bars(order_book_id)
+        if bars is None:
+            return None
+        dt = np.uint64(dt)
+        pos = bars['datetime'].searchsorted(dt)
+        if pos >= len(bars) or bars['datetime'][pos] != dt:
+            return None
+        return bars[pos]
+
+    def get_bars_at(self, order_book_ids, dt):
+        """
+        批量获取一组合约在 dt（YYYYMMDDHHMMSS）的分钟线，返回 list，没有数据的合约为 None
+        """
+        return take_rows(self._table, search_rows(self._table, self._index, order_book_ids, np.uint64(dt)))
+
+    def get_trading_minutes(self, order_book_id, trading_date):
+        bars = self.get_bars(order_book_id)
+        if bars is None:
+            return None
+        trading_dates = bars['trading_date']
+        s = trading_dates.searchsorted(trading_date)
+        e = trading_dates.searchsorted(trading_date, side='right')
+        return bars['datetime'][s:e]
+
+    def get_date_range(self):
+        if not self._index:
+            raise RuntimeError(_(u"minute bar store {} is empty, please convert minute bars again").format(
+                self._path))
+        starts = np.array([s for s, e in six.itervalues(self._index)])
+        ends = np.array([e for s, e in six.itervalues(self._index)])
+        return self._table['trading_date'][starts].min(), self._table['trading_date'][ends - 1].max()
+
+
+def _to_datetime_int(values):
+    if pd.api.types.is_integer_dtype(values):
+        return np.asarray(values, dtype=np.uint64)
+    dt = pd.DatetimeIndex(pd.to_datetime(values))
+    return (dt.year.values.astype(np.uint64) * 10000000000 + dt.month.values.astype(np.uint64) * 100000000 +
+            dt.day.values.astype(np.uint64) * 1000000 + dt.hour.values.astype(np.uint64) * 10000 +
+            dt.minute.values.astype(np.uint64) * 100 + dt.second.values.astype(np.uint64))
+
+
+def _to_date_int(values):
+    if pd.api.types.is_integer_dtype(values):
+        return np.asarray(values, dtype=np.uint32)
+    dt = pd.DatetimeIndex(pd.to_datetime(values))
+    return (dt.year.values * 10000 + dt.month.values * 100 + dt.day.values).astype(np.uint32)
+
+
+def convert_minute_bars(data, target):
+    """
+    将分钟线转换为 :class:`MinuteBarStore` 可以直接 memmap 的 .npy 文件。
+
+    :param data: `pandas.DataFrame` 或 csv 文件路径（及其列表），需包含 order_book_id、datetime 列，
+        其余数值列均作为行情字段以 float64 保存。datetime 可以是时间类型、字符串或 YYYYMMDDHHMMSS 整数。
+        期货夜盘的分钟线需要提供 trading_date 列，否则以 datetime 的日期作为交易日。
+    :param target: 输出文件，如 bundle/minute_bars.npy，line map 保存在同目录下
+    """
+    if isinstance(data, six.string_types):
+        data = [data]
+    if not isinstance(data, pd.DataFrame):
+        data = pd.concat([pd.read_csv(f) for f in data], ignore_index=True)
+
+    order_book_ids = np.asarray(data['order_book_id'], dtype=str)
+    datetimes = _to_datetime_int(data['datetime'])
+    if 'trading_date' in data.columns:
+        trading_dates = _to_date_int(data['trading_date'])
+    else:
+        trading_dates = (datetimes // 1000000).astype(np.uint32)
+
+    fields = [c for c in data.columns if c not in INDEX_COLUMNS and pd.api.types.is_numeric_dtype(data[c])]
+    order = np.lexsort((datetimes, order_book_ids))
+
+    dtype = np.dtype([('datetime', np.uint64), ('trading_date', np.uint32)] + [(f, np.float64) for f in fields])
+    result = np.lib.format.open_memmap(target, mode='w+', dtype=dtype, shape=(len(data), ))
+    result['datetime'] = datetimes[order]
+    result['trading_date'] = trading_dates[order]
+    for f in fields:
+        result[f] = np.asarray(data[f], dtype=np.float64)[order]
+    result.flush()
+    del result
+
+    order_book_ids = order_book_ids[order]
+    unique_ids, starts = np.unique(order_book_ids, return_index=True)
+    ends = np.append(starts[1:], len(order_book_ids))
+    save_line_map(line_map_file(target), {o: (s, e) for o, s, e in zip(unique_ids.tolist(), starts.tolist(),
+                                                                        ends.tolist())})
@@ -15,6 +15,7 @@
 # limitations under the License.
 
 import bcolz
+import six
 
 
 class SimpleFactorStore(object):
@@ -23,6 +24,10 @@ class SimpleFactorStore(object):
         self._index = table.attrs['line_map']
         self._table = table[:]
 
+    def items(self):
+        for order_book_id, (s, e) in six.iteritems(self._index):
+            yield order_book_id, self._table[s:e]
+
     def get_factors(self, order_book_id):
         try:
             s, e = self._index[order_book_id]
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import bisect
+import heapq
+import os
+
+import numpy as np
+import pandas as pd
+import six
+
+from rqalpha.model.tick import Tick
+from rqalpha.utils.datetime_func import convert_dt_to_int
+
+
+TICK_LEVELS = 5
+
+TICK_FIELDS = ('open', 'last', 'high', 'low', 'prev_close', 'volume', 'total_turnover', 'open_interest',
+               'prev_settlement', 'limit_up', 'limit_down')
+
+TICK_DTYPE = np.dtype([('datetime', np.uint64)] + [(f, np.float64) for f in TICK_FIELDS] + [
+    (f, np.float64, (TICK_LEVELS, )) for f in ('ask', 'ask_vol', 'bid', 'bid_vol')
+])
+
+
+def convert_dt_to_ms_int(dt):
+    return convert_dt_to_int(dt) * 1000 + dt.microsecond // 1000
+
+
+class TickStore(object):
+    """
+    按 合约/交易日 存放的 tick 数据：<path>/<order_book_id>/<YYYYMMDD>.npy，每个文件是一个 TICK_DTYPE 的结构化数组，
+    datetime 为 YYYYMMDDHHMMSSmmm 整数。文件通过 np.memmap 打开，Tick 对象直接引用其中的行。
+    """
+    def __init__(self, path):
+        self._path = path
+        self._days = {}
+
+    def _file_of(self, order_book_id, trading_date):
+        return os.path.join(self._path, order_book_id, '{}.npy'.format(trading_date))
+
+    def days_of(self, order_book_id):
+        try:
+            return self._days[order_book_id]
+        except KeyError:
+            pass
+        try:
+            days = sorted(int(f[:-len('.npy')]) for f in os.listdir(os.path.join(self._path, order_book_id))
+                          if f.endswith('.npy'))
+        except OSError:
+            days = []
+        self._days[order_book_id] = days
+        return days
+
+    def get_ticks(self, order_book_id, trading_date):
+        """
+        :param int trading_date: YYYYMMDD
+        :return: 当日全部 tick 的结构化数组，没有数据时返回 None
+        """
+        f = self._file_of(order_book_id, trading_date)
+        if not os.path.exists(f):
+            return None
+        return np.load(f, mmap_mode='r')
+
+    def history_ticks(self, order_book_id, count, dt):
+        dt = np.uint64(convert_dt_to_ms_int(dt))
+        days = self.days_of(order_book_id)
+        # 夜盘的 tick 属于下一个交易日，因此从 dt 所在自然日之后的第一个有数据的交易日开始往前找
+        i = min(bisect.bisect_right(days, int(dt // 1000000000)) + 1, len(days))
+        result = []
+        remain = count
+        while i > 0 and remain > 0:
+            i -= 1
+            ticks = self.get_ticks(order_book_id, days[i])
+            ticks = ticks[:ticks['datetime'].searchsorted(dt, side='right')]
+            ticks = ticks[max(len(ticks) - remain, 0):]
+            remain -= len(ticks)
+            result.append(ticks)
+        return [Tick(order_book_id, t) for ticks in reversed(result) for t in ticks]
+
+
+class TickMerger(object):
+    """
+    多个合约当日 tick 的 k 路归并：以 (datetime, 加入顺序) 为键的小顶堆，每次产出一个 tick。
+
+    迭代过程中可以通过 :meth:`set_universe` 增减合约，已经产出的 tick 不会重新读取；
+    新加入的合约从最近一次产出的时间之后开始。
+    """
+    def __init__(self, loader, order_book_ids, last_dt=None):
+        self._loader = loader
+        self._heap = []
+        self._streams = {}
+        self._seq = 0
+        self._last_dt = np.uint64(0) if last_dt is None else np.uint64(convert_dt_to_ms_int(last_dt))
+        for order_book_id in order_book_ids:
+            self._add(order_book_id)
+
+    def _add(self, order_book_id):
+        ticks = self._loader(order_book_id)
+        if ticks is None or len(ticks) == 0:
+            return
+        pos = int(ticks['datetime'].searchsorted(self._last_dt, side='right'))
+        if pos >= len(ticks):
+            return
+        # 同一时间的 tick 按合约加入顺序产出
+        stream = (order_book_id, ticks, ticks['datetime'], self._seq)
+        self._seq += 1
+        self._streams[order_book_id] = stream
+        heapq.heappush(self._heap, (stream[2][pos], stream[3], pos, stream))
+
+    def set_universe(self, order_book_ids):
+        order_book_ids = set(order_book_ids)
+        for order_book_id in list(self._streams):
+            if order_book_id not in order_book_ids:
+                # 堆中的元素在弹出时丢弃
+                del self._streams[order_book_id]
+        for order_book_id in order_book_ids:
+            if order_book_id not in self._streams:
+                self._add(order_book_id)
+
+    def __iter__(self):
+        heap = self._heap
+        streams = self._streams
+        while heap:
+            dt, seq, pos, stream = heap[0]
+            order_book_id, ticks, datetimes = stream[:3]
+            if streams.get(order_book_id) is not stream:
+                heapq.heappop(heap)
+                continue
+            pos += 1
+            if pos < len(datetimes):
+                heapq.heapreplace(heap, (datetimes[pos], seq, pos, stream))
+            else:
+                heapq.heappop(heap)
+                del streams[order_book_id]
+            self._last_dt = dt
+            yield Tick(order_book_id, ticks[pos - 1])
+
+
+def convert_ticks(data, path):
+    """
+    将 tick 数据写入 :class:`TickStore`。
+
+    :param data: `pandas.DataFrame` 或 csv 文件路径（及其列表），需包含 order_book_id、datetime 列，
+        可选 trading_date 列（期货夜盘需要）、TICK_FIELDS 中的字段以及 ask1~ask5、ask_vol1~ask_vol5、bid1~bid5、
+        bid_vol1~bid_vol5 等盘口列，缺失的字段保存为 nan。
+    :param path: 输出目录，如 bundle/ticks
+    """
+    if isinstance(data, six.string_types):
+        data = [data]
+    if not isinstance(data, pd.DataFrame):
+        data = pd.concat([pd.read_csv(f) for f in data], ignore_index=True)
+
+    dt = pd.DatetimeIndex(pd.to_datetime(data['datetime']))
+    datetimes = (dt.year.values.astype(np.uint64) * 10000000000000 + dt.month.values.astype(np.uint64) * 100000000000 +
+                 dt.day.values.astype(np.uint64) * 1000000000 + dt.hour.values.astype(np.uint64) * 10000000 +
+                 dt.minute.values.astype(np.uint64) * 100000 + dt.second.values.astype(np.uint64) * 1000 +
+                 (dt.microsecond.values // 1000).astype(np.uint64))
+    if 'trading_date' in data.columns:
+        td = pd.DatetimeIndex(pd.to_datetime(data['trading_date'].astype(str)))
+        trading_dates = td.year.values * 10000 + td.month.values * 100 + td.day.values
+    else:
+        trading_dates = (datetimes // 1000000000).astype(np.int64)
+
+    order_book_ids = np.asarray(data['order_book_id'], dtype=str)
+    order = np.lexsort((datetimes, trading_dates, order_book_ids))
+    keys = np.rec.fromarrays([order_book_ids[order], trading_dates[order]])
+    bounds = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    bounds = np.concatenate([[0], bounds, [len(order)]]).astype(np.int64)
+
+    table = np.zeros(len(order), dtype=TICK_DTYPE)
+    table['datetime'] = datetimes[order]
+    for f in TICK_FIELDS:
+        table[f] = np.asarray(data[f], dtype=np.float64)[order] if f in data.columns else np.nan
+    for f in ('ask', 'ask_vol', 'bid', 'bid_vol'):
+        for level in six.moves.range(TICK_LEVELS):
+            column = '{}{}'.format(f, level + 1)
+            table[f][:, level] = np.asarray(data[column], dtype=np.float64)[order] if column in data.columns else np.nan
+
+    for s, e in zip(bounds[:-1], bounds[1:]):
+        order_book_id, trading_date = keys[s]
+        directory = os.path.join(path, str(order_book_id))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        np.save(os.path.join(directory, '{}.npy'.format(trading_date)), table[s:e])
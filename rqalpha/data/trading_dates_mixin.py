@@ -15,6 +15,7 @@
 # limitations under the License.
 
 import datetime
+import numpy as np
 import pandas as pd
 
 from rqalpha.utils.py2 import lru_cache
@@ -24,50 +25,96 @@ def _to_timestamp(d):
     return pd.Timestamp(d).replace(hour=0, minute=0, second=0, microsecond=0)
 
 
+def _to_ordinal(d):
+    # date/datetime/Timestamp 直接取 proleptic ordinal，其余（字符串等）交给 pandas 解析
+    if isinstance(d, datetime.date):
+        return d.toordinal()
+    return pd.Timestamp(d).toordinal()
+
+
 class TradingDatesMixin(object):
     def __init__(self, dates):
         self._dates = dates
+        # 按序号取单个交易日时使用 list，避免 pandas Index 取值的开销
+        self._date_list = list(dates)
+        # yyyymmdd 格式的整数日历及 日期 -> 序号 的映射
+        self._dates_int = np.asarray(dates.year * 10000 + dates.month * 100 + dates.day, dtype=np.int32)
+        self._date_index = {d: i for i, d in enumerate(self._dates_int.tolist())}
+
+        # 以自然日为下标的表：第 k 天（相对日历第一天）对应第一个不早于它的交易日序号，查询前后交易日均为 O(1)
+        ordinals = np.array([d.toordinal() for d in dates], dtype=np.int64)
+        if len(ordinals):
+            self._first_ordinal = int(ordinals[0])
+            days = np.arange(self._first_ordinal, ordinals[-1] + 1)
+            self._left_table = ordinals.searchsorted(days).astype(np.int32)
+            self._is_trading_table = np.zeros(len(days), dtype=bool)
+            self._is_trading_table[ordinals - self._first_ordinal] = True
+        else:
+            self._first_ordinal = 0
+            self._left_table = np.zeros(0, dtype=np.int32)
+            self._is_trading_table = np.zeros(0, dtype=bool)
+
+    def _locate(self, date):
+        """
+        :return: (第一个不早于 date 的交易日序号, date 是否为交易日)，等价于 searchsorted(side='left') 及成员判断
+        """
+        k = _to_ordinal(date) - self._first_ordinal
+        if k < 0:
+            return 0, False
+        if k >= len(self._left_table):
+            return len(self._date_list), False
+        return int(self._left_table[k]), bool(self._is_trading_table[k])
+
+    def _left(self, date):
+        return self._locate(date)[0]
+
+    def _right(self, date):
+        pos, is_trading = self._locate(date)
+        return pos + 1 if is_trading else pos
+
+    def get_trading_calendar_int(self):
+        return self._dates_int
+
+    def get_trading_date_index(self, date):
+        """
+        :param date: yyyymmdd 整数
+        :return: 交易日在日历中的序号，不是交易日时返回 None
+        """
+        return self._date_index.get(date)
 
     def get_trading_dates(self, start_date, end_date):
         # 只需要date部分
-        start_date = _to_timestamp(start_date)
-        end_date = _to_timestamp(end_date)
-        left = self._dates.searchsorted(start_date)
-        right = self._dates.searchsorted(end_date, side='right')
+        left = self._left(start_date)
+        right = self._right(end_date)
         return self._dates[left:right]
 
     def get_previous_trading_date(self, date, n=1):
-        date = _to_timestamp(date)
-        pos = self._dates.searchsorted(date)
+        pos = self._left(date)
         if pos >= n:
-            return self._dates[pos - n]
+            return self._date_list[pos - n]
         else:
-            return self._dates[0]
+            return self._date_list[0]
 
     def get_next_trading_date(self, date, n=1):
-        date = _to_timestamp(date)
-        pos = self._dates.searchsorted(date, side='right')
-        if pos + n > len(self._dates):
-            return self._dates[-1]
+        pos = self._right(date)
+        if pos + n > len(self._date_list):
+            return self._date_list[-1]
         else:
-            return self._dates[pos + n - 1]
+            return self._date_list[pos + n - 1]
 
     def is_trading_date(self, date):
-        date = _to_timestamp(date)
-        pos = self._dates.searchsorted(date)
-        return pos < len(self._dates) and self._dates[pos] == date
+        return self._locate(date)[1]
 
     @lru_cache(512)
     def _get_future_trading_date(self, dt):
         dt1 = dt - datetime.timedelta(hours=4)
-        td = pd.Timestamp(dt1.date())
-        pos = self._dates.searchsorted(td)
-        if self._dates[pos] != td:
+        pos, is_trading = self._locate(dt1.date())
+        if not is_trading:
             raise RuntimeError('invalid future calendar datetime: {}'.format(dt))
         if dt1.hour >= 16:
-            return self._dates[pos + 1]
+            return self._date_list[pos + 1]
 
-        return td
+        return self._date_list[pos]
 
     def get_trading_dt(self, calendar_dt):
         trading_date = self.get_future_trading_date(calendar_dt)
@@ -79,8 +126,7 @@ class TradingDatesMixin(object):
     get_nth_previous_trading_date = get_previous_trading_date
 
     def get_n_trading_dates_until(self, dt, n):
-        date = _to_timestamp(dt)
-        pos = self._dates.searchsorted(date, side='right')
+        pos = self._right(dt)
         if pos >= n:
             return self._dates[pos - n:pos]
 
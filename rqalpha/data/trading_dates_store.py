@@ -20,8 +20,13 @@ import pandas as pd
 
 class TradingDatesStore(object):
     def __init__(self, f):
-        self._dates = pd.Index(pd.Timestamp(str(d)) for d in bcolz.open(f, 'r'))
+        self._dates_int = bcolz.open(f, 'r')[:]
+        self._dates = pd.Index(pd.Timestamp(str(d)) for d in self._dates_int)
 
     def get_trading_calendar(self):
         return self._dates
 
+    def get_trading_calendar_int(self):
+        # yyyymmdd 格式的整数日历
+        return self._dates_int
+
@@ -21,10 +21,42 @@ import numpy as np
 from rqalpha.data import risk_free_helper
 
 
+# datetime.date(1970, 1, 1).toordinal()
+EPOCH_ORDINAL = 719163
+
+
 class YieldCurveStore(object):
     def __init__(self, f):
-        self._table = bcolz.open(f, 'r')
-        self._dates = self._table.cols['date'][:]
+        table = bcolz.open(f, 'r')
+        self._dates = table.cols['date'][:]
+        tenors = [n for n in table.names if n != 'date']
+        values = np.column_stack([table.cols[n][:] for n in tenors]).astype(np.float64)
+
+        index = pd.to_datetime(self._dates.astype(str), format='%Y%m%d')
+        # 列名形如 M1、Y10，转换为 1M、10Y
+        self._curve = pd.DataFrame(values, index=index, columns=[n[1:] + n[0] for n in tenors], copy=False)
+        self._tenor_index = {t: i for i, t in enumerate(self._curve.columns)}
+
+        # 按列向前填充的收益率矩阵，缺失数据取此前最近一个有效值
+        self._filled = self._curve.ffill().values
+
+        # ordinal -> 不晚于该日的最后一行，使单点查询为 O(1)
+        ordinals = index.values.astype('datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+        if len(ordinals):
+            self._first_ordinal = ordinals[0]
+            self._row_table = np.searchsorted(
+                ordinals, np.arange(ordinals[0], ordinals[-1] + 1), side='right') - 1
+        else:
+            self._first_ordinal = 0
+            self._row_table = np.empty(0, dtype=np.int64)
+
+    def _row_of(self, date):
+        offset = date.toordinal() - self._first_ordinal
+        if offset < 0:
+            return 0
+        if offset >= len(self._row_table):
+            return len(self._dates) - 1
+        return self._row_table[offset]
 
     def get_yield_curve(self, start_date, end_date, tenor):
         d1 = start_date.year * 10000 + start_date.month * 100 + start_date.day
@@ -42,26 +74,18 @@ class YieldCurveStore(object):
         if e < s:
             return None
 
-        df = pd.DataFrame(self._table[s:e])
-        df.index = pd.Index(pd.Timestamp(str(d)) for d in df['date'])
-        del df['date']
-
-        df.rename(columns=lambda n: n[1:]+n[0], inplace=True)
+        # 行切片不复制数据
+        df = self._curve.iloc[s:e]
         if tenor is not None:
             return df[tenor]
         return df
 
+    def get_rate(self, date, tenor):
+        """
+        获取 date 当日（或此前最近一个有数据的交易日）指定期限的收益率
+        """
+        return self._filled[self._row_of(date), self._tenor_index[tenor]]
+
     def get_risk_free_rate(self, start_date, end_date):
         tenor = risk_free_helper.get_tenor_for(start_date, end_date)
-        tenor = tenor[-1] + tenor[:-1]
-        d = start_date.year * 10000 + start_date.month * 100 + start_date.day
-        pos = self._dates.searchsorted(d)
-        if pos > 0 and (pos == len(self._dates) or self._dates[pos] != d):
-            pos -= 1
-
-        col = self._table.cols[tenor]
-        while pos >= 0 and np.isnan(col[pos]):
-            # data is missing ...
-            pos -= 1
-
-        return self._table.cols[tenor][pos]
+        return self.get_rate(start_date, tenor)
@@ -16,6 +16,9 @@
 
 from enum import Enum
 from collections import defaultdict
+from timeit import default_timer
+
+import six
 
 
 class Event(object):
@@ -27,22 +30,80 @@ class Event(object):
         return ' '.join('{}:{}'.format(k, v) for k, v in self.__dict__.items())
 
 
+def _listener_name(listener):
+    name = getattr(listener, '__qualname__', None) or getattr(listener, '__name__', None) or repr(listener)
+    module = getattr(listener, '__module__', None)
+    return '{}.{}'.format(module, name) if module else name
+
+
 class EventBus(object):
     def __init__(self):
         self._listeners = defaultdict(list)
+        # 由 _listeners 编译得到的分发表，监听者变化时失效，在下一次 publish_event 时重新编译
+        self._single_listeners = None
+        self._multi_listeners = None
+        self._profile = None
 
     def add_listener(self, event_type, listener):
         self._listeners[event_type].append(listener)
+        self._single_listeners = None
 
     def prepend_listener(self, event_type, listener):
         self._listeners[event_type].insert(0, listener)
+        self._single_listeners = None
+
+    def _compile(self):
+        self._multi_listeners = {t: tuple(l) for t, l in six.iteritems(self._listeners) if len(l) > 1}
+        self._single_listeners = {t: l[0] for t, l in six.iteritems(self._listeners) if len(l) == 1}
 
     def publish_event(self, event):
-        for listener in self._listeners[event.event_type]:
+        if self._profile is not None:
+            return self._publish_event_with_profile(event)
+
+        if self._single_listeners is None:
+            self._compile()
+
+        listener = self._single_listeners.get(event.event_type)
+        if listener is not None:
+            listener(event)
+            return
+
+        for listener in self._multi_listeners.get(event.event_type, ()):
             # 如果返回 True ，那么消息不再传递下去
             if listener(event):
                 break
 
+    def enable_profile(self):
+        """
+        开启后记录每种事件及每个监听者的调用次数和累计耗时，可以通过 get_profile_stats 获取
+        """
+        self._profile = defaultdict(lambda: [0, 0.])
+
+    def _publish_event_with_profile(self, event):
+        event_start = default_timer()
+        for listener in list(self._listeners[event.event_type]):
+            start = default_timer()
+            stop = listener(event)
+            stats = self._profile[(event.event_type, listener)]
+            stats[0] += 1
+            stats[1] += default_timer() - start
+            if stop:
+                break
+        stats = self._profile[(event.event_type, None)]
+        stats[0] += 1
+        stats[1] += default_timer() - event_start
+
+    def get_profile_stats(self):
+        """
+        :return: list of (event_type, listener_name, calls, cumulative_time)，listener_name 为 None 的行为该事件的汇总，
+            按累计耗时降序排列
+        """
+        if self._profile is None:
+            return []
+        stats = [(event_type, None if listener is None else _listener_name(listener), calls, cost)
+                 for (event_type, listener), (calls, cost) in six.iteritems(self._profile)]
+        return sorted(stats, key=lambda s: s[3], reverse=True)
+
 
 class EVENT(Enum):
     # 系统初始化后触发
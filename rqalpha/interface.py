@@ -16,6 +16,8 @@
 
 import abc
 
+import numpy as np
+import six
 from six import with_metaclass
 
 
@@ -344,6 +346,23 @@ class AbstractDataSource(object):
         """
         raise NotImplementedError
 
+    def get_bars(self, instruments, dt, frequency):
+        """
+        批量获取一组合约在 dt 的 Bar 数据。
+
+        默认实现逐个调用 get_bar，数据源可以覆盖此函数提供更高效的实现。
+
+        :param instruments: 合约对象列表
+        :type instruments: list[:class:`~Instrument`]
+
+        :param datetime.datetime dt: calendar_datetime
+
+        :param str frequency: 周期频率，`1d` 表示日周期, `1m` 表示分钟周期
+
+        :return: list，与 instruments 一一对应，没有数据的合约为 None
+        """
+        return [self.get_bar(instrument, dt, frequency) for instrument in instruments]
+
     def get_settle_price(self, instrument, date):
         """
         获取期货品种在 date 的结算价
@@ -397,6 +416,47 @@ class AbstractDataSource(object):
         """
         raise NotImplementedError
 
+    def history_bars_panel(self, instruments, bar_count, frequency, fields, dt, include_now=False,
+                           adjust_type='pre', adjust_orig=None):
+        """
+        批量获取多个合约的历史数据，按时间对齐，合约在某个时间点没有数据时以 NaN 填充；
+        停牌日的数据与 history_bars(skip_suspended=False) 相同，不以 NaN 填充。
+
+        默认实现逐个调用 history_bars 并以各合约 bar 时间的并集作为时间轴，数据源可以覆盖此函数提供更高效的实现。
+
+        :param instruments: 合约对象列表
+        :type instruments: list[:class:`~Instrument`]
+
+        :param int bar_count: 获取的历史数据数量
+        :param str frequency: 周期频率，`1d` 表示日周期, `1m` 表示分钟周期
+        :param fields: 返回数据字段，与 history_bars 相同
+        :type fields: str | list[str]
+
+        :param datetime.datetime dt: 时间
+        :param bool include_now: 是否包含当天最新数据
+        :param str adjust_type: 复权类型，'pre', 'none', 'post'
+        :param datetime.datetime adjust_orig: 复权起点；
+
+        :return: `numpy.ndarray`，fields 为 str 时 shape 为 (合约, 时间)，为 list 时为 (合约, 时间, 字段)
+        """
+        field_list = [fields] if isinstance(fields, six.string_types) else list(fields)
+        history = [self.history_bars(i, bar_count, frequency, ['datetime'] + [f for f in field_list if f != 'datetime'],
+                                     dt, skip_suspended=False, include_now=include_now,
+                                     adjust_type=adjust_type, adjust_orig=adjust_orig) for i in instruments]
+        timeline = [bars['datetime'] for bars in history if bars is not None]
+        timeline = np.unique(np.concatenate(timeline))[-bar_count:] if timeline else np.empty(0)
+
+        result = np.full((len(instruments), len(timeline), len(field_list)), np.nan)
+        for n, bars in enumerate(history):
+            if bars is None or len(timeline) == 0:
+                continue
+            bars = bars[bars['datetime'] >= timeline[0]]
+            pos = timeline.searchsorted(bars['datetime'])
+            for j, f in enumerate(field_list):
+                result[n, pos, j] = bars[f]
+
+        return result[:, :, 0] if isinstance(fields, six.string_types) else result
+
     def history_ticks(self, instrument, count, dt):
         """
         获取历史tick数据
@@ -599,6 +659,28 @@ class AbstractPersistProvider(with_metaclass(abc.ABCMeta)):
         raise NotImplementedError
 
 
+class AbstractJournalPersistProvider(AbstractPersistProvider):
+    """
+    支持追加写入日志的持久化服务提供者。:meth:`store` 写入完整状态并清空该 key 的日志，
+    :meth:`append` 在日志末尾追加一条增量数据。
+    """
+    @abc.abstractmethod
+    def append(self, key, value):
+        """
+        :param str key:
+        :param bytes value: 增量数据
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def load_journal(self, key):
+        """
+        :param str key:
+        :return: list[bytes] 自上次 :meth:`store` 以来按顺序追加的增量数据
+        """
+        raise NotImplementedError
+
+
 class Persistable(with_metaclass(abc.ABCMeta)):
     @abc.abstractmethod
     def get_state(self):
@@ -624,6 +706,47 @@ class Persistable(with_metaclass(abc.ABCMeta)):
         return NotImplemented
 
 
+class IncrementalPersistable(Persistable):
+    """
+    支持增量持久化的对象。除完整状态外，还可以只导出自上次持久化以来发生变化的部分，
+    增量数据会被追加到 :class:`AbstractJournalPersistProvider` 的日志中，恢复时与完整状态合并。
+    """
+    @abc.abstractmethod
+    def get_delta_state(self):
+        """
+        导出自上一次调用 :meth:`reset_delta_state` 以来的变化，不重置变化记录
+
+        :return: bytes 没有变化时返回 None
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def reset_delta_state(self):
+        """
+        完整状态或增量数据已被成功持久化，重置变化记录
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def merge_delta_states(self, state, delta_states):
+        """
+        将按顺序记录的增量数据合并到完整状态中
+
+        :param bytes state: 完整状态
+        :param list[bytes] delta_states: 增量数据
+        :return: bytes 合并后的完整状态，可直接传给 :meth:`set_state`
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def __subclasshook__(cls, C):
+        if cls is IncrementalPersistable:
+            if all(any(name in B.__dict__ for B in C.__mro__) for name in (
+                    "get_state", "set_state", "get_delta_state", "reset_delta_state", "merge_delta_states")):
+                return True
+        return NotImplemented
+
+
 class AbstractFrontendValidator(with_metaclass(abc.ABCMeta)):
     @abc.abstractmethod
     def can_submit_order(self, account, order):
@@ -176,7 +176,7 @@ Are you sure to continue?""").format(data_bundle_path=data_bundle_path), abort=T
     six.print_(_(u"Data bundle download successfully in {bundle_path}").format(bundle_path=data_bundle_path))
 
 
-def run(config, source_code=None, user_funcs=None):
+def run(config, source_code=None, user_funcs=None, data_source=None):
     env = Environment(config)
     persist_helper = None
     init_succeed = False
@@ -188,6 +188,9 @@ def run(config, source_code=None, user_funcs=None):
         set_loggers(config)
         basic_system_log.debug("\n" + pformat(config.convert_to_dict()))
 
+        if config.extra.enable_event_bus_profiler:
+            env.event_bus.enable_profile()
+
         if source_code is not None:
             env.set_strategy_loader(SourceCodeStrategyLoader(source_code))
         elif user_funcs is not None:
@@ -199,7 +202,9 @@ def run(config, source_code=None, user_funcs=None):
         mod_handler.start_up()
 
         if not env.data_source:
-            env.set_data_source(BaseDataSource(config.base.data_bundle_path))
+            if data_source is None:
+                data_source = BaseDataSource(config.base.data_bundle_path, config.base.data_cache_mb)
+            env.set_data_source(data_source)
         env.set_data_proxy(DataProxy(env.data_source))
 
         Scheduler.set_trading_dates_(env.data_source.get_trading_calendar())
@@ -324,6 +329,9 @@ def run(config, source_code=None, user_funcs=None):
         result = mod_handler.tear_down(const.EXIT_CODE.EXIT_SUCCESS)
         system_log.debug(_(u"strategy run successfully, normal exit"))
         return result
+    finally:
+        if config.extra.enable_event_bus_profiler:
+            output_event_bus_profile_result(env)
 
 
 def _exception_handler(e):
@@ -369,6 +377,13 @@ def output_profile_result(env):
     env.event_bus.publish_event(Event(EVENT.ON_LINE_PROFILER_RESULT, result=profile_output))
 
 
+def output_event_bus_profile_result(env):
+    from tabulate import tabulate
+    table = [[event_type.name, listener if listener is not None else "*", calls, "{:.6f}".format(cost)]
+             for event_type, listener, calls, cost in env.event_bus.get_profile_stats()]
+    six.print_(tabulate(table, headers=["event", "listener", "calls", "cumulative time(s)"], tablefmt="psql"))
+
+
 def set_loggers(config):
     from rqalpha.utils.logger import user_log, user_system_log, user_detail_log, system_log, basic_system_log, std_log
     from rqalpha.utils.logger import user_std_handler, init_logger
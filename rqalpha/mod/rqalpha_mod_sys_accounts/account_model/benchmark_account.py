@@ -39,6 +39,7 @@ class BenchmarkAccount(StockAccount):
             price = event.bar_dict[self.benchmark].close
             if not is_valid_price(price):
                 return
+            self._mark_dirty(self.benchmark)
             position = self._positions.get_or_create(self.benchmark)
             quantity = int(self._total_cash / price)
             position._quantity = quantity
@@ -52,6 +53,7 @@ class BenchmarkAccount(StockAccount):
             if tick.order_book_id != self.benchmark:
                 return
             price = tick.last
+            self._mark_dirty(self.benchmark)
             position = self._positions.get_or_create(self.benchmark)
             quantity = int(self._total_cash / price)
             position._quantity = quantity
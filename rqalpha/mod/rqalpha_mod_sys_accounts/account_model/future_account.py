@@ -15,6 +15,7 @@
 # limitations under the License.
 
 import six
+import numpy as np
 
 from rqalpha.model.base_account import BaseAccount
 from rqalpha.environment import Environment
@@ -44,6 +45,12 @@ class FutureAccount(BaseAccount):
 
     forced_liquidation = True
 
+    DIRTY_TRACKING = True
+    VALUATION_CACHE = True
+
+    VALUATION_COLUMNS = ('net_quantity', 'buy_margin', 'sell_margin', 'buy_holding_cost', 'sell_holding_cost',
+                         'realized_pnl')
+
     def register_event(self):
         event_bus = Environment.get_instance().event_bus
         event_bus.add_listener(EVENT.TRADE, self._on_trade)
@@ -57,6 +64,7 @@ class FutureAccount(BaseAccount):
             event_bus.add_listener(EVENT.TICK, self._update_last_price)
 
     def fast_forward(self, orders, trades=list()):
+        self._mark_all_dirty()
         # 计算 Positions
         for trade in trades:
             if trade.exec_id in self._backward_trade_set:
@@ -132,12 +140,8 @@ class FutureAccount(BaseAccount):
             orders.append(order(order_book_id, quantity, SIDE.SELL, POSITION_EFFECT.OPEN, style))
             return orders
 
-    def get_state(self):
+    def _get_account_state(self):
         return {
-            'positions': {
-                order_book_id: position.get_state()
-                for order_book_id, position in six.iteritems(self._positions)
-            },
             'frozen_cash': self._frozen_cash,
             'total_cash': self._total_cash,
             'backward_trade_set': list(self._backward_trade_set),
@@ -158,6 +162,7 @@ class FutureAccount(BaseAccount):
                 margin_changed += position.margin * (v['margin_rate'] - position.margin_rate) / position.margin_rate
 
         self._total_cash = state['total_cash'] + margin_changed
+        self._mark_all_dirty()
 
     @property
     def type(self):
@@ -181,27 +186,51 @@ class FutureAccount(BaseAccount):
     def total_value(self):
         return self._total_cash + self.margin + self.holding_pnl
 
+    def _valuation_columns(self, position):
+        return (
+            (position.buy_quantity - position.sell_quantity) * position.contract_multiplier,
+            position.buy_margin,
+            position.sell_margin,
+            position._buy_holding_cost,
+            position._sell_holding_cost,
+            position.realized_pnl,
+        )
+
+    def _aggregate_valuation(self, columns, prices):
+        net_quantity, buy_margin, sell_margin, buy_holding_cost, sell_holding_cost, realized_pnl = columns.T
+        market_value = float(np.dot(net_quantity, prices))
+        buy_margin, sell_margin = float(buy_margin.sum()), float(sell_margin.sum())
+        return {
+            'market_value': market_value,
+            'buy_margin': buy_margin,
+            'sell_margin': sell_margin,
+            'margin': buy_margin + sell_margin,
+            # 买方向 (last_price - 持仓均价) * 持仓量 与卖方向 (持仓均价 - last_price) * 持仓量 之和
+            'holding_pnl': market_value - float(buy_holding_cost.sum()) + float(sell_holding_cost.sum()),
+            'realized_pnl': float(realized_pnl.sum()),
+        }
+
     # -- Margin 相关
     @property
     def margin(self):
         """
         [float] 总保证金
         """
-        return sum(position.margin for position in six.itervalues(self._positions))
+        return self._get_valuation()['margin']
 
     @property
     def buy_margin(self):
         """
         [float] 买方向保证金
         """
-        return sum(position.buy_margin for position in six.itervalues(self._positions))
+        return self._get_valuation()['buy_margin']
 
     @property
     def sell_margin(self):
         """
         [float] 卖方向保证金
         """
-        return sum(position.sell_margin for position in six.itervalues(self._positions))
+        return self._get_valuation()['sell_margin']
 
     # -- PNL 相关
     @property
@@ -216,18 +245,20 @@ class FutureAccount(BaseAccount):
         """
         [float] 浮动盈亏
         """
-        return sum(position.holding_pnl for position in six.itervalues(self._positions))
+        return self._get_valuation()['holding_pnl']
 
     @property
     def realized_pnl(self):
         """
         [float] 平仓盈亏
         """
-        return sum(position.realized_pnl for position in six.itervalues(self._positions))
+        return self._get_valuation()['realized_pnl']
 
     def _settlement(self, event):
+        self._mark_all_dirty()
         total_value = self.total_value
 
+        positions = []
         for position in list(self._positions.values()):
             order_book_id = position.order_book_id
             if position.is_de_listed() and position.buy_quantity + position.sell_quantity != 0:
@@ -237,30 +268,63 @@ class FutureAccount(BaseAccount):
             elif position.buy_quantity == 0 and position.sell_quantity == 0:
                 del self._positions[order_book_id]
             else:
-                position.apply_settlement()
-        self._total_cash = total_value - self.margin - self.holding_pnl
+                positions.append(position)
+        self._total_cash = total_value - self._settle_positions(positions)
+        self._reset_valuation()
 
         # 如果 total_value <= 0 则认为已爆仓，清空仓位，资金归0
         if total_value <= 0 and self.forced_liquidation:
             if self._positions:
                 user_system_log.warn(_("Trigger Forced Liquidation, current total_value is {}"), total_value)
             self._positions.clear()
+            self._reset_valuation()
             self._total_cash = 0
 
         self._backward_trade_set.clear()
 
-    def _update_last_price(self, event):
-        for position in self._positions.values():
-            position.update_last_price()
+    def _settle_positions(self, positions):
+        """
+        以当日结算价将持仓全部转为昨仓，返回结算后的保证金与浮动盈亏之和。
+        结算价一次性批量获取，保证金及浮动盈亏按列计算
+        """
+        if not positions:
+            return 0
+        env = Environment.get_instance()
+        settle_prices = env.data_proxy.get_settle_prices(
+            [position.order_book_id for position in positions], env.trading_dt.date())
+        buy_quantity = np.array([position.buy_quantity for position in positions], dtype=np.float64)
+        sell_quantity = np.array([position.sell_quantity for position in positions], dtype=np.float64)
+        contract_multiplier = np.array([position.contract_multiplier for position in positions], dtype=np.float64)
+        margin_rate = np.array([position.margin_rate for position in positions], dtype=np.float64)
+        last_price = np.array([position.last_price for position in positions], dtype=np.float64)
+
+        for position, settle_price in zip(positions, settle_prices.tolist()):
+            position.settle_(settle_price)
+
+        # 结算后持仓均价即为结算价
+        settle_value = settle_prices * contract_multiplier
+        margin = (buy_quantity + sell_quantity) * settle_value * margin_rate
+        holding_pnl = (last_price * contract_multiplier - settle_value) * (buy_quantity - sell_quantity)
+        return float(margin.sum() + holding_pnl.sum())
+
+    def _settle_positions_scalar(self, positions):
+        """
+        逐个持仓结算，与 :meth:`_settle_positions` 结果一致，仅作为对照实现
+        """
+        for position in positions:
+            position.apply_settlement()
+        return sum(position.margin + position.holding_pnl for position in positions)
 
     def _on_order_pending_new(self, event):
         if self != event.account:
             return
+        self._mark_dirty()
         self._frozen_cash += self._frozen_cash_of_order(event.order)
 
     def _on_order_unsolicited_update(self, event):
         if self != event.account:
             return
+        self._mark_dirty()
         self._frozen_cash -= self._frozen_cash_of_order(event.order)
 
     def _on_trade(self, event):
@@ -272,6 +336,7 @@ class FutureAccount(BaseAccount):
         if trade.exec_id in self._backward_trade_set:
             return
         order_book_id = trade.order_book_id
+        self._mark_dirty(order_book_id)
         position = self._positions.get_or_create(order_book_id)
         delta_cash = position.apply_trade(trade)
 
@@ -16,6 +16,7 @@
 
 import six
 import datetime
+import numpy as np
 from collections import defaultdict
 
 from rqalpha.model.base_account import BaseAccount
@@ -31,6 +32,11 @@ from ..api.api_stock import order_shares
 class StockAccount(BaseAccount):
     dividend_reinvestment = False
 
+    DIRTY_TRACKING = True
+    VALUATION_CACHE = True
+
+    VALUATION_COLUMNS = ('quantity', )
+
     __abandon_properties__ = []
 
     def __init__(self, total_cash, positions, backward_trade_set=None, dividend_receivable=None, register_event=True):
@@ -57,12 +63,8 @@ class StockAccount(BaseAccount):
             quantity = quantity - position.quantity
         return order_shares(order_book_id, quantity, style=style)
 
-    def get_state(self):
+    def _get_account_state(self):
         return {
-            'positions': {
-                order_book_id: position.get_state()
-                for order_book_id, position in six.iteritems(self._positions)
-            },
             'frozen_cash': self._frozen_cash,
             'total_cash': self._total_cash,
             'backward_trade_set': list(self._backward_trade_set),
@@ -80,8 +82,10 @@ class StockAccount(BaseAccount):
         for order_book_id, v in six.iteritems(state['positions']):
             position = self._positions.get_or_create(order_book_id)
             position.set_state(v)
+        self._mark_all_dirty()
 
     def fast_forward(self, orders, trades=list()):
+        self._mark_all_dirty()
         # 计算 Positions
         for trade in trades:
             if trade.exec_id in self._backward_trade_set:
@@ -108,6 +112,7 @@ class StockAccount(BaseAccount):
     def _apply_trade(self, trade):
         if trade.exec_id in self._backward_trade_set:
             return
+        self._mark_dirty(trade.order_book_id)
 
         position = self._positions.get_or_create(trade.order_book_id)
         position.apply_trade(trade)
@@ -124,6 +129,7 @@ class StockAccount(BaseAccount):
         if event.account != self:
             return
         order = event.order
+        self._mark_dirty(order.order_book_id)
         position = self._positions.get(order.order_book_id, None)
         if position is not None:
             position.on_order_pending_new_(order)
@@ -136,6 +142,7 @@ class StockAccount(BaseAccount):
             return
 
         order = event.order
+        self._mark_dirty(order.order_book_id)
         position = self._positions.get_or_create(order.order_book_id)
         position.on_order_cancel_(order)
         if order.side == SIDE.BUY:
@@ -143,6 +150,8 @@ class StockAccount(BaseAccount):
             self._frozen_cash -= unfilled_value
 
     def _before_trading(self, event):
+        # 只有当天有分红、拆分的持仓会发生变化，由各处理函数单独标记
+        self._mark_dirty()
         trading_date = Environment.get_instance().trading_dt.date()
         last_date = Environment.get_instance().data_proxy.get_previous_trading_date(trading_date)
         self._handle_dividend_book_closure(last_date)
@@ -150,6 +159,7 @@ class StockAccount(BaseAccount):
         self._handle_split(trading_date)
 
     def _on_settlement(self, event):
+        self._mark_all_dirty()
         env = Environment.get_instance()
         for position in list(self._positions.values()):
             order_book_id = position.order_book_id
@@ -168,9 +178,13 @@ class StockAccount(BaseAccount):
         self._transaction_cost = 0
         self._backward_trade_set.clear()
 
-    def _update_last_price(self, event):
-        for position in self._positions.values():
-            position.update_last_price()
+    def _valuation_columns(self, position):
+        return (position.quantity, )
+
+    def _aggregate_valuation(self, columns, prices):
+        return {
+            'market_value': float(np.dot(columns[:, 0], prices)),
+        }
 
     @property
     def type(self):
@@ -191,21 +205,33 @@ class StockAccount(BaseAccount):
         y, m = divmod(r, 100)
         return datetime.date(year=y, month=m, day=d)
 
+    def _events_of_positions(self, events, get_single):
+        # 当天事件与持仓取交集，遍历两者中较小的一个；数据源不提供公司行为日历时逐个持仓查询
+        if events is None:
+            events = ((order_book_id, get_single(order_book_id)) for order_book_id in list(self._positions))
+            return [(order_book_id, e) for order_book_id, e in events if e is not None]
+        if len(events) > len(self._positions):
+            return [(order_book_id, events[order_book_id]) for order_book_id in self._positions
+                    if order_book_id in events]
+        return [(order_book_id, e) for order_book_id, e in six.iteritems(events) if order_book_id in self._positions]
+
     def _handle_dividend_book_closure(self, trading_date):
-        for order_book_id, position in six.iteritems(self._positions):
+        data_proxy = Environment.get_instance().data_proxy
+        dividends = self._events_of_positions(
+            data_proxy.get_dividends_by_book_date(trading_date),
+            lambda order_book_id: data_proxy.get_dividend_by_book_date(order_book_id, trading_date)
+        )
+        for order_book_id, dividend in dividends:
+            position = self._positions[order_book_id]
             if position.quantity == 0:
                 continue
-
-            dividend = Environment.get_instance().data_proxy.get_dividend_by_book_date(order_book_id, trading_date)
-            if dividend is None:
-                continue
+            self._mark_dirty(order_book_id)
 
             dividend_per_share = dividend['dividend_cash_before_tax'] / dividend['round_lot']
             position.dividend_(dividend_per_share)
 
-            config = Environment.get_instance().config
             if StockAccount.dividend_reinvestment:
-                last_price = Environment.get_instance().data_proxy.get_bar(order_book_id, trading_date).close
+                last_price = data_proxy.get_bar(order_book_id, trading_date).close
                 shares = position.quantity * dividend_per_share / last_price
                 position._quantity += shares
             else:
@@ -217,11 +243,13 @@ class StockAccount(BaseAccount):
 
     def _handle_split(self, trading_date):
         data_proxy = Environment.get_instance().data_proxy
-        for order_book_id, position in six.iteritems(self._positions):
-            ratio = data_proxy.get_split_by_ex_date(order_book_id, trading_date)
-            if ratio is None:
-                continue
-            position.split_(ratio)
+        splits = self._events_of_positions(
+            data_proxy.get_splits_by_ex_date(trading_date),
+            lambda order_book_id: data_proxy.get_split_by_ex_date(order_book_id, trading_date)
+        )
+        for order_book_id, ratio in splits:
+            self._mark_dirty(order_book_id)
+            self._positions[order_book_id].split_(ratio)
 
     @property
     def total_value(self):
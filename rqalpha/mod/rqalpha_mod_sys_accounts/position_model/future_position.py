@@ -14,21 +14,70 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from collections import deque
+
 from rqalpha.model.base_position import BasePosition
 from rqalpha.environment import Environment
 from rqalpha.const import SIDE, POSITION_EFFECT, DEFAULT_ACCOUNT_TYPE
 
 
+class HoldingList(object):
+    """
+    持仓明细 [(price, amount), ...]，左端为最新开仓，右端为最早开仓。同时维护持仓量及 price * amount 之和，
+    开平仓及求和都是 O(1) 的
+    """
+    __slots__ = ('_lots', 'quantity', 'value')
+
+    def __init__(self, lots=()):
+        self._lots = deque()
+        self.quantity = 0
+        self.value = 0.
+        for price, amount in lots:
+            self.append(price, amount)
+
+    def appendleft(self, price, amount):
+        self._lots.appendleft((price, amount))
+        self.quantity += amount
+        self.value += price * amount
+
+    def append(self, price, amount):
+        self._lots.append((price, amount))
+        self.quantity += amount
+        self.value += price * amount
+
+    def pop(self):
+        price, amount = self._lots.pop()
+        self.quantity -= amount
+        if self._lots:
+            self.value -= price * amount
+        else:
+            # 清空时直接归零，避免累积的浮点误差
+            self.value = 0.
+        return price, amount
+
+    def __repr__(self):
+        return 'HoldingList({})'.format(list(self._lots))
+
+    def to_list(self):
+        return list(self._lots)
+
+    def __iter__(self):
+        return iter(self._lots)
+
+    def __len__(self):
+        return len(self._lots)
+
+
 class FuturePosition(BasePosition):
 
     __abandon_properties__ = []
 
     def __init__(self, order_book_id):
         super(FuturePosition, self).__init__(order_book_id)
-        self._buy_old_holding_list = []
-        self._sell_old_holding_list = []
-        self._buy_today_holding_list = []
-        self._sell_today_holding_list = []
+        self._buy_old_holding_list = HoldingList()
+        self._sell_old_holding_list = HoldingList()
+        self._buy_today_holding_list = HoldingList()
+        self._sell_today_holding_list = HoldingList()
         self._buy_transaction_cost = 0.
         self._sell_transaction_cost = 0.
         self._buy_realized_pnl = 0.
@@ -43,10 +92,10 @@ class FuturePosition(BasePosition):
     def get_state(self):
         return {
             'order_book_id': self._order_book_id,
-            'buy_old_holding_list': self._buy_old_holding_list,
-            'sell_old_holding_list': self._sell_old_holding_list,
-            'buy_today_holding_list': self._buy_today_holding_list,
-            'sell_today_holding_list': self._sell_today_holding_list,
+            'buy_old_holding_list': self._buy_old_holding_list.to_list(),
+            'sell_old_holding_list': self._sell_old_holding_list.to_list(),
+            'buy_today_holding_list': self._buy_today_holding_list.to_list(),
+            'sell_today_holding_list': self._sell_today_holding_list.to_list(),
             'buy_transaction_cost': self._buy_transaction_cost,
             'sell_transaction_cost': self._sell_transaction_cost,
             'buy_realized_pnl': self._buy_realized_pnl,
@@ -59,10 +108,10 @@ class FuturePosition(BasePosition):
 
     def set_state(self, state):
         assert self._order_book_id == state['order_book_id']
-        self._buy_old_holding_list = state['buy_old_holding_list']
-        self._sell_old_holding_list = state['sell_old_holding_list']
-        self._buy_today_holding_list = state['buy_today_holding_list']
-        self._sell_today_holding_list = state['sell_today_holding_list']
+        self._buy_old_holding_list = HoldingList(state['buy_old_holding_list'])
+        self._sell_old_holding_list = HoldingList(state['sell_old_holding_list'])
+        self._buy_today_holding_list = HoldingList(state['buy_today_holding_list'])
+        self._sell_today_holding_list = HoldingList(state['sell_today_holding_list'])
         self._buy_transaction_cost = state['buy_transaction_cost']
         self._sell_transaction_cost = state['sell_transaction_cost']
         self._buy_avg_open_price = state['buy_avg_open_price']
@@ -241,28 +290,28 @@ class FuturePosition(BasePosition):
         """
         [int] 买方向昨仓
         """
-        return sum(amount for price, amount in self._buy_old_holding_list)
+        return self._buy_old_holding_list.quantity
 
     @property
     def sell_old_quantity(self):
         """
         [int] 卖方向昨仓
         """
-        return sum(amount for price, amount in self._sell_old_holding_list)
+        return self._sell_old_holding_list.quantity
 
     @property
     def buy_today_quantity(self):
         """
         [int] 买方向今仓
         """
-        return sum(amount for price, amount in self._buy_today_holding_list)
+        return self._buy_today_holding_list.quantity
 
     @property
     def sell_today_quantity(self):
         """
         [int] 卖方向今仓
         """
-        return sum(amount for price, amount in self._sell_today_holding_list)
+        return self._sell_today_holding_list.quantity
 
     @property
     def buy_quantity(self):
@@ -331,19 +380,19 @@ class FuturePosition(BasePosition):
 
     @property
     def _buy_holding_cost(self):
-        return sum(p * a * self.contract_multiplier for p, a in self.buy_holding_list)
+        return (self._buy_old_holding_list.value + self._buy_today_holding_list.value) * self.contract_multiplier
 
     @property
     def _sell_holding_cost(self):
-        return sum(p * a * self.contract_multiplier for p, a in self.sell_holding_list)
+        return (self._sell_old_holding_list.value + self._sell_today_holding_list.value) * self.contract_multiplier
 
     @property
     def buy_holding_list(self):
-        return self._buy_old_holding_list + self._buy_today_holding_list
+        return self._buy_old_holding_list.to_list() + self._buy_today_holding_list.to_list()
 
     @property
     def sell_holding_list(self):
-        return self._sell_old_holding_list + self._sell_today_holding_list
+        return self._sell_old_holding_list.to_list() + self._sell_today_holding_list.to_list()
 
     @property
     def buy_avg_open_price(self):
@@ -379,10 +428,14 @@ class FuturePosition(BasePosition):
         data_proxy = env.data_proxy
         trading_date = env.trading_dt.date()
         settle_price = data_proxy.get_settle_price(self.order_book_id, trading_date)
-        self._buy_old_holding_list = [(settle_price, self.buy_quantity)]
-        self._sell_old_holding_list = [(settle_price, self.sell_quantity)]
-        self._buy_today_holding_list = []
-        self._sell_today_holding_list = []
+        self.settle_(settle_price)
+
+    def settle_(self, settle_price):
+        # 今仓与昨仓合并为一笔以结算价开仓的昨仓
+        self._buy_old_holding_list = HoldingList([(settle_price, self.buy_quantity)])
+        self._sell_old_holding_list = HoldingList([(settle_price, self.sell_quantity)])
+        self._buy_today_holding_list = HoldingList()
+        self._sell_today_holding_list = HoldingList()
 
         self._buy_transaction_cost = 0.
         self._sell_transaction_cost = 0.
@@ -401,7 +454,7 @@ class FuturePosition(BasePosition):
                 self._buy_avg_open_price = (self._buy_avg_open_price * self.buy_quantity +
                                             trade_quantity * trade.last_price) / (self.buy_quantity + trade_quantity)
                 self._buy_transaction_cost += trade.transaction_cost
-                self._buy_today_holding_list.insert(0, (trade.last_price, trade_quantity))
+                self._buy_today_holding_list.appendleft(trade.last_price, trade_quantity)
                 return -1 * self._margin_of(trade_quantity, trade.last_price)
             else:
                 old_margin = self.margin
@@ -414,7 +467,7 @@ class FuturePosition(BasePosition):
                 self._sell_avg_open_price = (self._sell_avg_open_price * self.sell_quantity +
                                              trade_quantity * trade.last_price) / (self.sell_quantity + trade_quantity)
                 self._sell_transaction_cost += trade.transaction_cost
-                self._sell_today_holding_list.insert(0, (trade.last_price, trade_quantity))
+                self._sell_today_holding_list.appendleft(trade.last_price, trade_quantity)
                 return -1 * self._margin_of(trade_quantity, trade.last_price)
             else:
                 old_margin = self.margin
@@ -433,7 +486,7 @@ class FuturePosition(BasePosition):
 
                 if old_quantity > left_quantity:
                     consumed_quantity = left_quantity
-                    self._sell_old_holding_list = [(old_price, old_quantity - left_quantity)]
+                    self._sell_old_holding_list = HoldingList([(old_price, old_quantity - left_quantity)])
                 else:
                     consumed_quantity = old_quantity
                 left_quantity -= consumed_quantity
@@ -445,7 +498,7 @@ class FuturePosition(BasePosition):
                 oldest_price, oldest_quantity = self._sell_today_holding_list.pop()
                 if oldest_quantity > left_quantity:
                     consumed_quantity = left_quantity
-                    self._sell_today_holding_list.append((oldest_price, oldest_quantity - left_quantity))
+                    self._sell_today_holding_list.append(oldest_price, oldest_quantity - left_quantity)
                 else:
                     consumed_quantity = oldest_quantity
                 left_quantity -= consumed_quantity
@@ -456,7 +509,7 @@ class FuturePosition(BasePosition):
                 old_price, old_quantity = self._buy_old_holding_list.pop()
                 if old_quantity > left_quantity:
                     consumed_quantity = left_quantity
-                    self._buy_old_holding_list = [(old_price, old_quantity - left_quantity)]
+                    self._buy_old_holding_list = HoldingList([(old_price, old_quantity - left_quantity)])
                 else:
                     consumed_quantity = old_quantity
                 left_quantity -= consumed_quantity
@@ -468,7 +521,7 @@ class FuturePosition(BasePosition):
                 oldest_price, oldest_quantity = self._buy_today_holding_list.pop()
                 if oldest_quantity > left_quantity:
                     consumed_quantity = left_quantity
-                    self._buy_today_holding_list.append((oldest_price, oldest_quantity - left_quantity))
+                    self._buy_today_holding_list.append(oldest_price, oldest_quantity - left_quantity)
                     left_quantity = 0
                 else:
                     consumed_quantity = oldest_quantity
@@ -23,6 +23,8 @@ __config__ = {
     "signal": False,
     # 启用的回测引擎，目前支持 `current_bar` (当前Bar收盘价撮合) 和 `next_bar` (下一个Bar开盘价撮合)
     "matching_type": "current_bar",
+    # 撮合引擎，`scalar` (逐笔撮合) 或 `vectorized` (批量撮合，仅支持 1d/1m 回测，结果与 `scalar` 一致)
+    "matching_engine": "scalar",
     # 股票最小手续费
     "stock_min_commission": 5,
     # 设置手续费乘数，默认为1
@@ -52,6 +54,7 @@ def load_mod():
 注入 --slippage option: 实现设置滑点
 注入 --commission-multiplier options: 实现设置手续费乘数
 注入 --matching-type: 实现选择回测引擎
+注入 --matching-engine: 实现选择撮合引擎
 """
 cli_prefix = "mod__sys_simulation__"
 
@@ -104,6 +107,14 @@ cli.commands['run'].params.append(
     )
 )
 
+cli.commands['run'].params.append(
+    click.Option(
+        ('--matching-engine', cli_prefix + "matching_engine"),
+        type=click.Choice(['scalar', 'vectorized']),
+        help="[sys_simulation] set matching engine"
+    )
+)
+
 cli.commands['run'].params.append(
     click.Option(
         ('-smc', '--stock-min-commission', cli_prefix + 'stock_min_commission'),
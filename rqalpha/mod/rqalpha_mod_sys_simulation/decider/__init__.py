@@ -16,7 +16,11 @@
 
 import importlib
 
+import six
+
 from rqalpha.const import DEFAULT_ACCOUNT_TYPE
+from rqalpha.environment import Environment
+from rqalpha.events import EVENT
 
 from rqalpha.utils.i18n import gettext as _
 from rqalpha.mod.rqalpha_mod_sys_simulation.decider.commission import StockCommission, FutureCommission
@@ -30,9 +34,30 @@ class CommissionDecider(object):
         self.deciders[DEFAULT_ACCOUNT_TYPE.STOCK.name] = StockCommission(multiplier, stock_min_commission)
         self.deciders[DEFAULT_ACCOUNT_TYPE.FUTURE.name] = FutureCommission(multiplier)
 
+        # 订单进入终态后释放其最小手续费等状态
+        event_bus = Environment.get_instance().event_bus
+        event_bus.add_listener(EVENT.TRADE, self._on_order_update)
+        event_bus.add_listener(EVENT.ORDER_UNSOLICITED_UPDATE, self._on_order_update)
+        event_bus.add_listener(EVENT.ORDER_CANCELLATION_PASS, self._on_order_update)
+
     def get_commission(self, account_type, trade):
         return self.deciders[account_type].get_commission(trade)
 
+    def get_commissions(self, account_type, order_ids, order_book_ids, sides, position_effects, prices, quantities,
+                        close_today_amounts):
+        """
+        批量计算同一账户类型下一组成交的手续费，供批量撮合使用。各参数为与成交一一对应的序列，返回 numpy.ndarray
+        """
+        return self.deciders[account_type].get_commissions(
+            order_ids, order_book_ids, sides, position_effects, prices, quantities, close_today_amounts)
+
+    def _on_order_update(self, event):
+        order = getattr(event, 'order', None)
+        if order is None or not order.is_final():
+            return
+        for decider in six.itervalues(self.deciders):
+            decider.release(order.order_id)
+
 
 class SlippageDecider(object):
     def __init__(self, module_name, rate):
@@ -18,22 +18,79 @@ import abc
 from six import with_metaclass
 from collections import defaultdict
 
+import numpy as np
+
 from rqalpha.const import HEDGE_TYPE, COMMISSION_TYPE, POSITION_EFFECT, SIDE
 from rqalpha.environment import Environment
 
 
+class FeeTable(object):
+    """
+    按合约缓存的手续费参数，每个合约只向 data_proxy 解析一次。
+    单笔计算时通过 info 取得缓存的 tuple，批量计算时通过 take 按行取得结构化数组。
+    """
+    def __init__(self, dtype, resolve):
+        self._dtype = np.dtype(dtype)
+        self._resolve = resolve
+        self._rows = {}
+        self._infos = []
+        self._table = None
+
+    def _add(self, order_book_id):
+        row = self._rows[order_book_id] = len(self._infos)
+        self._infos.append(tuple(self._resolve(order_book_id)))
+        self._table = None
+        return row
+
+    def info(self, order_book_id):
+        try:
+            row = self._rows[order_book_id]
+        except KeyError:
+            row = self._add(order_book_id)
+        return self._infos[row]
+
+    def take(self, order_book_ids):
+        rows = [self._rows[o] if o in self._rows else self._add(o) for o in order_book_ids]
+        if self._table is None:
+            self._table = np.array(self._infos, dtype=self._dtype)
+        return self._table[np.array(rows, dtype=np.int64)]
+
+
 class BaseCommission(with_metaclass(abc.ABCMeta)):
     @abc.abstractmethod
     def get_commission(self, trade):
         raise NotImplementedError
 
+    def get_commissions(self, order_ids, order_book_ids, sides, position_effects, prices, quantities,
+                        close_today_amounts):
+        """
+        批量计算一组成交的手续费，各参数为与成交一一对应的序列，返回 numpy.ndarray
+        """
+        raise NotImplementedError
+
+    def release(self, order_id):
+        """
+        订单进入终态后调用，释放与该订单相关的状态
+        """
+        pass
+
 
 class StockCommission(BaseCommission):
+    FEE_DTYPE = [('buy_rate', np.float64), ('sell_rate', np.float64), ('min_commission', bool)]
+
     def __init__(self, multiplier, min_commission):
         self.rate = 0.0008
         self.multiplier = multiplier
         self.commission_map = defaultdict(lambda: min_commission)
         self.min_commission = min_commission
+        self._fee_table = FeeTable(self.FEE_DTYPE, self._resolve)
+
+    def _resolve(self, order_book_id):
+        data_proxy = Environment.get_instance().data_proxy
+        if data_proxy.instruments(order_book_id).type == 'PublicFund':
+            rate = data_proxy.public_fund_commission(order_book_id, True)
+            return rate / (1 + rate), data_proxy.public_fund_commission(order_book_id, False), False
+        return self.rate, self.rate, True
 
     def get_commission(self, trade):
         """
@@ -46,20 +103,17 @@ class StockCommission(BaseCommission):
         4.  如果cost_money <= commission
             4.1 如果commission 等于 min_commission, 说明是第一笔trade, 此时，返回min_commission(提前把最小手续费收了)
             4.2 如果commission 不等于 min_commission， 说明不是第一笔trade, 之前的trade中min_commission已经收过了，所以返回0.
+        公募基金不收取最小手续费。订单进入终态后 commission_map 中对应的记录会被删除。
         """
-        order_id = trade.order_id
-        order_book_id = trade.order_book_id
-        env = Environment.get_instance()
-        if env.data_proxy.instruments(order_book_id).type == 'PublicFund':
-            if trade.side == SIDE.BUY:
-                rate = env.data_proxy.public_fund_commission(order_book_id, True)
-                rate = rate / (1 + rate)
-            else:
-                rate = env.data_proxy.public_fund_commission(order_book_id, False)
-            cost_money = trade.last_price * trade.last_quantity * rate * self.multiplier
+        buy_rate, sell_rate, min_commission = self._fee_table.info(trade.order_book_id)
+        rate = buy_rate if trade.side == SIDE.BUY else sell_rate
+        cost_money = trade.last_price * trade.last_quantity * rate * self.multiplier
+        if not min_commission:
             return cost_money
+        return self._apply_min_commission(trade.order_id, cost_money)
+
+    def _apply_min_commission(self, order_id, cost_money):
         commission = self.commission_map[order_id]
-        cost_money = trade.last_price * trade.last_quantity * self.rate * self.multiplier
         if cost_money > commission:
             if commission == self.min_commission:
                 self.commission_map[order_id] = 0
@@ -75,33 +129,93 @@ class StockCommission(BaseCommission):
                 self.commission_map[order_id] -= cost_money
                 return 0
 
+    def get_commissions(self, order_ids, order_book_ids, sides, position_effects, prices, quantities,
+                        close_today_amounts):
+        fees = self._fee_table.take(order_book_ids)
+        buy = np.array([side == SIDE.BUY for side in sides], dtype=bool)
+        rate = np.where(buy, fees['buy_rate'], fees['sell_rate'])
+        commissions = np.asarray(prices, dtype=np.float64) * np.asarray(quantities, dtype=np.float64) * rate * \
+            self.multiplier
+
+        rows = np.flatnonzero(fees['min_commission'])
+        ids = [order_ids[i] for i in rows]
+        if len(set(ids)) != len(ids):
+            # 同一订单的多笔成交需要按顺序扣减剩余的最小手续费
+            for i, order_id in zip(rows, ids):
+                commissions[i] = self._apply_min_commission(order_id, commissions[i])
+            return commissions
+
+        # 与 _apply_min_commission 相同的规则，按列计算
+        cost_money = commissions[rows]
+        remaining = np.array([self.commission_map.get(o, self.min_commission) for o in ids], dtype=np.float64)
+        first = remaining == self.min_commission
+        commissions[rows] = np.where(first, np.maximum(cost_money, remaining), np.maximum(cost_money - remaining, 0))
+        self.commission_map.update(zip(ids, np.where(cost_money > remaining, 0, remaining - cost_money).tolist()))
+        return commissions
+
+    def release(self, order_id):
+        self.commission_map.pop(order_id, None)
+
 
 class FutureCommission(BaseCommission):
+    FEE_DTYPE = [
+        ('by_money', bool), ('open_ratio', np.float64), ('close_ratio', np.float64),
+        ('close_today_ratio', np.float64), ('contract_multiplier', np.float64)
+    ]
+
     def __init__(self, multiplier, hedge_type=HEDGE_TYPE.SPECULATION):
         """
         期货目前不计算最小手续费
         """
         self.multiplier = multiplier
         self.hedge_type = hedge_type
+        self._fee_table = FeeTable(self.FEE_DTYPE, self._resolve)
 
-    def get_commission(self, trade):
-        order_book_id = trade.order_book_id
+    @staticmethod
+    def _resolve(order_book_id):
         env = Environment.get_instance()
         info = env.data_proxy.get_commission_info(order_book_id)
+        return (
+            info['commission_type'] == COMMISSION_TYPE.BY_MONEY,
+            info['open_commission_ratio'],
+            info['close_commission_ratio'],
+            info['close_commission_today_ratio'],
+            env.get_instrument(order_book_id).contract_multiplier,
+        )
+
+    def get_commission(self, trade):
+        by_money, open_ratio, close_ratio, close_today_ratio, contract_multiplier = self._fee_table.info(
+            trade.order_book_id)
         commission = 0
-        if info['commission_type'] == COMMISSION_TYPE.BY_MONEY:
-            contract_multiplier = env.get_instrument(trade.order_book_id).contract_multiplier
+        if by_money:
             if trade.position_effect == POSITION_EFFECT.OPEN:
-                commission += trade.last_price * trade.last_quantity * contract_multiplier * info['open_commission_ratio']
+                commission += trade.last_price * trade.last_quantity * contract_multiplier * open_ratio
             else:
-                commission += trade.last_price * (trade.last_quantity - trade.close_today_amount) * contract_multiplier * info[
-                    'close_commission_ratio']
-                commission += trade.last_price * trade.close_today_amount * contract_multiplier * info[
-                    'close_commission_today_ratio']
+                commission += trade.last_price * (trade.last_quantity - trade.close_today_amount) * \
+                    contract_multiplier * close_ratio
+                commission += trade.last_price * trade.close_today_amount * contract_multiplier * close_today_ratio
         else:
             if trade.position_effect == POSITION_EFFECT.OPEN:
-                commission += trade.last_quantity * info['open_commission_ratio']
+                commission += trade.last_quantity * open_ratio
             else:
-                commission += (trade.last_quantity - trade.close_today_amount) * info['close_commission_ratio']
-                commission += trade.close_today_amount * info['close_commission_today_ratio']
+                commission += (trade.last_quantity - trade.close_today_amount) * close_ratio
+                commission += trade.close_today_amount * close_today_ratio
         return commission * self.multiplier
+
+    def get_commissions(self, order_ids, order_book_ids, sides, position_effects, prices, quantities,
+                        close_today_amounts):
+        fees = self._fee_table.take(order_book_ids)
+        is_open = np.array([e == POSITION_EFFECT.OPEN for e in position_effects], dtype=bool)
+        prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.float64)
+        close_today_amounts = np.asarray(close_today_amounts, dtype=np.float64)
+
+        def amount_base(amount):
+            return np.where(fees['by_money'], prices * amount * fees['contract_multiplier'], amount)
+
+        commissions = (
+            amount_base(np.where(is_open, quantities, 0)) * fees['open_ratio'] +
+            amount_base(np.where(is_open, 0, quantities - close_today_amounts)) * fees['close_ratio'] +
+            amount_base(np.where(is_open, 0, close_today_amounts)) * fees['close_today_ratio']
+        )
+        return commissions * self.multiplier
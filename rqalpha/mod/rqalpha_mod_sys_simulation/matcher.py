@@ -14,15 +14,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from collections import defaultdict
+from collections import defaultdict, Counter
+
+import six
+
+import numpy as np
 
 from rqalpha.utils import is_valid_price
 from rqalpha.const import ORDER_TYPE, SIDE, MATCHING_TYPE
 from rqalpha.events import EVENT, Event
+from rqalpha.model.bar import SNAPSHOT_DTYPE, SNAPSHOT_FIELDS
 from rqalpha.model.trade import Trade
 from rqalpha.utils.i18n import gettext as _
 
 from rqalpha.mod.rqalpha_mod_sys_simulation.decider import CommissionDecider, SlippageDecider, TaxDecider
+from rqalpha.mod.rqalpha_mod_sys_simulation.decider.slippage import PriceRatioSlippage
 
 
 class Matcher(object):
@@ -69,16 +75,7 @@ class Matcher(object):
             instrument = self._env.get_instrument(order_book_id)
 
             if not is_valid_price(price_board.get_last_price(order_book_id)):
-                listed_date = instrument.listed_date.date()
-                if listed_date == self._trading_dt.date():
-                    reason = _(u"Order Cancelled: current security [{order_book_id}] can not be traded in listed date [{listed_date}]").format(
-                        order_book_id=order.order_book_id,
-                        listed_date=listed_date,
-                    )
-                else:
-                    reason = _(u"Order Cancelled: current bar [{order_book_id}] miss market data.").format(
-                        order_book_id=order.order_book_id)
-                order.mark_rejected(reason)
+                self._reject_invalid_price(order)
                 continue
 
             deal_price = self._deal_price_decider(order_book_id, order.side)
@@ -146,33 +143,218 @@ class Matcher(object):
             else:
                 fill = order.unfilled_quantity
 
-            ct_amount = account.positions.get_or_create(order.order_book_id).cal_close_today_amount(fill, order.side)
             price = self._slippage_decider.get_trade_price(order, deal_price)
-            trade = Trade.__from_create__(
-                order_id=order.order_id,
-                price=price,
-                amount=fill,
-                side=order.side,
-                position_effect=order.position_effect,
+            self._fill(account, order, price, fill)
+
+    def _reject_invalid_price(self, order):
+        listed_date = self._env.get_instrument(order.order_book_id).listed_date.date()
+        if listed_date == self._trading_dt.date():
+            reason = _(u"Order Cancelled: current security [{order_book_id}] can not be traded in listed date [{listed_date}]").format(
+                order_book_id=order.order_book_id,
+                listed_date=listed_date,
+            )
+        else:
+            reason = _(u"Order Cancelled: current bar [{order_book_id}] miss market data.").format(
+                order_book_id=order.order_book_id)
+        order.mark_rejected(reason)
+
+    def _fill(self, account, order, price, fill):
+        ct_amount = account.positions.get_or_create(order.order_book_id).cal_close_today_amount(fill, order.side)
+        trade = self._create_trade(order, price, fill, ct_amount)
+        trade._commission = self._commission_decider.get_commission(account.type, trade)
+        self._turnover[order.order_book_id] += fill
+        self._publish_trade(account, order, trade)
+
+    @staticmethod
+    def _create_trade(order, price, fill, ct_amount):
+        return Trade.__from_create__(
+            order_id=order.order_id,
+            price=price,
+            amount=fill,
+            side=order.side,
+            position_effect=order.position_effect,
+            order_book_id=order.order_book_id,
+            frozen_price=order.frozen_price,
+            close_today_amount=ct_amount
+        )
+
+    def _publish_trade(self, account, order, trade):
+        trade._tax = self._tax_decider.get_tax(account.type, trade)
+        order.fill(trade)
+
+        self._env.event_bus.publish_event(Event(EVENT.TRADE, account=account, trade=trade, order=order))
+
+        if order.type == ORDER_TYPE.MARKET and order.unfilled_quantity != 0:
+            reason = _(
+                u"Order Cancelled: market order {order_book_id} volume {order_volume} is"
+                u" larger than {volume_percent_limit} percent of current bar volume, fill {filled_volume} actually"
+            ).format(
                 order_book_id=order.order_book_id,
-                frozen_price=order.frozen_price,
-                close_today_amount=ct_amount
+                order_volume=order.quantity,
+                filled_volume=order.filled_quantity,
+                volume_percent_limit=self._volume_percent * 100.0
             )
-            trade._commission = self._commission_decider.get_commission(account.type, trade)
-            trade._tax = self._tax_decider.get_tax(account.type, trade)
-            order.fill(trade)
-            self._turnover[order.order_book_id] += fill
+            order.mark_cancelled(reason)
+
+
+class VectorizedMatcher(Matcher):
+    """
+    bar 回测（1d/1m）下的批量撮合引擎。
+
+    一次性取出所有挂单对应合约的价格、涨跌停及成交量，用 NumPy 完成价格、涨跌停及流动性的判断与滑点计算，
+    只对可以成交的订单逐笔计算成交量限制，手续费通过 CommissionDecider.get_commissions 批量计算，
+    之后按顺序生成成交并发布 TRADE 事件，结果与 :class:`Matcher` 完全一致。
+    """
+    def __init__(self, env, mod_config):
+        super(VectorizedMatcher, self).__init__(env, mod_config)
+        if mod_config.matching_type == MATCHING_TYPE.CURRENT_BAR_CLOSE:
+            self._deal_price_field = 'close'
+        elif mod_config.matching_type == MATCHING_TYPE.NEXT_BAR_OPEN:
+            self._deal_price_field = 'open'
+        else:
+            raise RuntimeError(_("Not supported matching type {}").format(mod_config.matching_type))
+        slippage = self._slippage_decider.decider
+        self._slippage_rate = slippage.rate if type(slippage) is PriceRatioSlippage else None
 
-            self._env.event_bus.publish_event(Event(EVENT.TRADE, account=account, trade=trade, order=order))
+    def _snapshot(self, order_book_ids):
+        bar_dict = self._env.bar_dict
+        if bar_dict.dt is None:
+            snapshot = np.empty(len(order_book_ids), dtype=SNAPSHOT_DTYPE)
+            for f in SNAPSHOT_FIELDS:
+                snapshot[f] = np.nan
+            return snapshot
+        return bar_dict.get_snapshot(order_book_ids)
 
-            if order.type == ORDER_TYPE.MARKET and order.unfilled_quantity != 0:
+    def match(self, open_orders):
+        if not open_orders:
+            return
+
+        orders = [order for account, order in open_orders]
+        order_book_ids = list(set(order.order_book_id for order in orders))
+        snapshot = self._snapshot(order_book_ids)
+        row_of = {order_book_id: row for row, order_book_id in enumerate(order_book_ids)}
+        rows = np.array([row_of[order.order_book_id] for order in orders], dtype=np.int64)
+
+        last_price = snapshot['close'][rows]
+        deal_price = snapshot[self._deal_price_field][rows]
+        limit_up = snapshot['limit_up'][rows]
+        limit_down = snapshot['limit_down'][rows]
+        buy = np.array([order.side == SIDE.BUY for order in orders], dtype=bool)
+        sell = ~buy
+        limit = np.array([order.type == ORDER_TYPE.LIMIT for order in orders], dtype=bool)
+        order_price = np.array([order.price if order.type == ORDER_TYPE.LIMIT else np.nan for order in orders],
+                               dtype=np.float64)
+
+        with np.errstate(invalid='ignore'):
+            valid = last_price > 0
+            # 限价单：价格不满足、涨跌停或无对手盘时本 bar 不成交；市价单遇到涨跌停或无对手盘时直接拒单
+            skipped = limit & ((buy & (order_price < deal_price)) | (sell & (order_price > deal_price)))
+            if self._price_limit:
+                reach_limit_up = buy & (deal_price >= limit_up)
+                reach_limit_down = sell & (deal_price <= limit_down)
+            else:
+                reach_limit_up = reach_limit_down = np.zeros(len(orders), dtype=bool)
+            if self._liquidity_limit:
+                price_board = self._env.price_board
+                a1 = np.array([price_board.get_a1(o) for o in order_book_ids], dtype=np.float64)[rows]
+                b1 = np.array([price_board.get_b1(o) for o in order_book_ids], dtype=np.float64)[rows]
+                no_liquidity = (buy & (a1 == 0)) | (sell & (b1 == 0))
+            else:
+                no_liquidity = np.zeros(len(orders), dtype=bool)
+
+        rejected = valid & ~limit & (reach_limit_up | reach_limit_down | no_liquidity)
+        skipped |= limit & (reach_limit_up | reach_limit_down | no_liquidity)
+        candidates = valid & ~skipped & ~rejected
+
+        if self._slippage_rate is not None:
+            trade_price = deal_price + deal_price * self._slippage_rate * np.where(buy, 1, -1)
+        else:
+            trade_price = None
+
+        for i in np.flatnonzero(~valid):
+            self._reject_invalid_price(orders[i])
+
+        for i in np.flatnonzero(rejected):
+            order = orders[i]
+            if reach_limit_up[i]:
+                reason = _(
+                    "Order Cancelled: current bar [{order_book_id}] reach the limit_up price."
+                ).format(order_book_id=order.order_book_id)
+            elif reach_limit_down[i]:
+                reason = _(
+                    "Order Cancelled: current bar [{order_book_id}] reach the limit_down price."
+                ).format(order_book_id=order.order_book_id)
+            else:
                 reason = _(
-                    u"Order Cancelled: market order {order_book_id} volume {order_volume} is"
-                    u" larger than {volume_percent_limit} percent of current bar volume, fill {filled_volume} actually"
-                ).format(
-                    order_book_id=order.order_book_id,
-                    order_volume=order.quantity,
-                    filled_volume=order.filled_quantity,
-                    volume_percent_limit=self._volume_percent * 100.0
-                )
-                order.mark_cancelled(reason)
+                    "Order Cancelled: [{order_book_id}] has no liquidity."
+                ).format(order_book_id=order.order_book_id)
+            order.mark_rejected(reason)
+
+        volume = snapshot['volume']
+        fills = []
+        for i in np.flatnonzero(candidates):
+            account, order = open_orders[i]
+            order_book_id = order.order_book_id
+
+            if self._volume_limit:
+                volume_limit = round(volume[row_of[order_book_id]] * self._volume_percent) - self._turnover[order_book_id]
+                round_lot = self._env.get_instrument(order_book_id).round_lot
+                volume_limit = (volume_limit // round_lot) * round_lot
+                if volume_limit <= 0:
+                    if order.type == ORDER_TYPE.MARKET:
+                        reason = _(u"Order Cancelled: market order {order_book_id} volume {order_volume}"
+                                   u" due to volume limit").format(
+                            order_book_id=order.order_book_id,
+                            order_volume=order.quantity
+                        )
+                        order.mark_cancelled(reason)
+                    continue
+
+                unfilled = order.unfilled_quantity
+                fill = min(unfilled, volume_limit)
+            else:
+                fill = order.unfilled_quantity
+
+            if trade_price is None:
+                price = self._slippage_decider.get_trade_price(order, deal_price[i])
+            else:
+                price = trade_price[i]
+            self._turnover[order_book_id] += fill
+            fills.append((account, order, price, fill))
+
+        if fills:
+            self._fill_many(fills)
+
+    def _fill_many(self, fills):
+        # 同一账户同一合约在本次撮合中只有一笔成交时，平今数量与本次的其他成交无关，可以预先生成成交并批量计算手续费；
+        # 否则需要等前一笔成交生效后再计算平今数量及手续费。成交按原顺序生成，以保证 trade_id 与逐笔撮合一致
+        counts = Counter((id(account), order.order_book_id) for account, order, price, fill in fills)
+        independent = [counts[(id(account), order.order_book_id)] == 1 for account, order, price, fill in fills]
+        trades = []
+        batches = defaultdict(list)
+        for n, (account, order, price, fill) in enumerate(fills):
+            if independent[n]:
+                # 不存在的持仓通过 __missing__ 取得，不会提前加入账户
+                ct_amount = account.positions[order.order_book_id].cal_close_today_amount(fill, order.side)
+                batches[account.type].append(n)
+            else:
+                ct_amount = 0
+            trades.append(self._create_trade(order, price, fill, ct_amount))
+
+        for account_type, rows in six.iteritems(batches):
+            batch = [trades[n] for n in rows]
+            commissions = self._commission_decider.get_commissions(
+                account_type, [t.order_id for t in batch], [t.order_book_id for t in batch],
+                [t.side for t in batch], [t.position_effect for t in batch], [t.last_price for t in batch],
+                [t.last_quantity for t in batch], [t.close_today_amount for t in batch]
+            )
+            for trade, commission in zip(batch, commissions.tolist()):
+                trade._commission = commission
+
+        for n, (account, order, price, fill) in enumerate(fills):
+            trade = trades[n]
+            if not independent[n]:
+                position = account.positions.get_or_create(order.order_book_id)
+                trade._close_today_amount = position.cal_close_today_amount(fill, order.side)
+                trade._commission = self._commission_decider.get_commission(account.type, trade)
+            self._publish_trade(account, order, trade)
@@ -57,6 +57,11 @@ class SimulationMod(AbstractMod):
             ]:
                 raise RuntimeError(_("Not supported matching type {}").format(mod_config.matching_type))
 
+        if mod_config.matching_engine not in ("scalar", "vectorized"):
+            raise RuntimeError(_("Not supported matching engine {}").format(mod_config.matching_engine))
+        if mod_config.matching_engine == "vectorized" and env.config.base.frequency not in ("1d", "1m"):
+            raise RuntimeError(_("Matching engine vectorized only supports 1d and 1m frequency"))
+
         if mod_config.signal:
             env.set_broker(SignalBroker(env, mod_config))
         else:
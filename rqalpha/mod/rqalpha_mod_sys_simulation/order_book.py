@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import OrderedDict
+
+
+class OrderBook(object):
+    """
+    按 order_id 与 order_book_id 双重索引的挂单簿，插入/撤单均为 O(1)，并保持下单顺序。
+    """
+
+    def __init__(self):
+        self._orders = OrderedDict()
+        self._orders_by_instrument = {}
+
+    def __len__(self):
+        return len(self._orders)
+
+    def __iter__(self):
+        return iter(list(self._orders.values()))
+
+    def __contains__(self, order):
+        return order.order_id in self._orders
+
+    def add(self, account, order):
+        self._orders[order.order_id] = (account, order)
+        try:
+            orders = self._orders_by_instrument[order.order_book_id]
+        except KeyError:
+            orders = self._orders_by_instrument[order.order_book_id] = OrderedDict()
+        orders[order.order_id] = (account, order)
+
+    def remove(self, order):
+        try:
+            del self._orders[order.order_id]
+        except KeyError:
+            return False
+        orders = self._orders_by_instrument[order.order_book_id]
+        del orders[order.order_id]
+        if not orders:
+            del self._orders_by_instrument[order.order_book_id]
+        return True
+
+    def orders_of(self, order_book_id):
+        try:
+            return list(self._orders_by_instrument[order_book_id].values())
+        except KeyError:
+            return []
+
+    def order_book_ids(self):
+        return list(self._orders_by_instrument.keys())
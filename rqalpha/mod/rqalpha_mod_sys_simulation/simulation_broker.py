@@ -22,7 +22,8 @@ from rqalpha.events import EVENT, Event
 from rqalpha.const import MATCHING_TYPE, ORDER_STATUS
 from rqalpha.model.order import Order
 
-from .matcher import Matcher
+from .matcher import Matcher, VectorizedMatcher
+from .order_book import OrderBook
 from .utils import init_portfolio
 
 
@@ -31,11 +32,14 @@ class SimulationBroker(AbstractBroker, Persistable):
         self._env = env
         self._mod_config = mod_config
 
-        self._matcher = Matcher(env, mod_config)
+        if mod_config.matching_engine == "vectorized":
+            self._matcher = VectorizedMatcher(env, mod_config)
+        else:
+            self._matcher = Matcher(env, mod_config)
         self._match_immediately = mod_config.matching_type == MATCHING_TYPE.CURRENT_BAR_CLOSE
 
-        self._open_orders = []
-        self._delayed_orders = []
+        self._open_orders = OrderBook()
+        self._delayed_orders = OrderBook()
         self._frontend_validator = {}
 
         # 该事件会触发策略的before_trading函数
@@ -54,7 +58,7 @@ class SimulationBroker(AbstractBroker, Persistable):
         if order_book_id is None:
             return [order for account, order in self._open_orders]
         else:
-            return [order for account, order in self._open_orders if order.order_book_id == order_book_id]
+            return [order for account, order in self._open_orders.orders_of(order_book_id)]
 
     def get_state(self):
         return jsonpickle.dumps({
@@ -63,20 +67,20 @@ class SimulationBroker(AbstractBroker, Persistable):
         }).encode('utf-8')
 
     def set_state(self, state):
-        self._open_orders = []
-        self._delayed_orders = []
+        self._open_orders = OrderBook()
+        self._delayed_orders = OrderBook()
 
         value = jsonpickle.loads(state.decode('utf-8'))
         for v in value['open_orders']:
             o = Order()
             o.set_state(v)
             account = self._env.get_account(o.order_book_id)
-            self._open_orders.append((account, o))
+            self._open_orders.add(account, o)
         for v in value['delayed_orders']:
             o = Order()
             o.set_state(v)
             account = self._env.get_account(o.order_book_id)
-            self._delayed_orders.append((account, o))
+            self._delayed_orders.add(account, o)
 
     def submit_order(self, order):
         account = self._env.get_account(order.order_book_id)
@@ -84,13 +88,13 @@ class SimulationBroker(AbstractBroker, Persistable):
         if order.is_final():
             return
         if self._env.config.base.frequency == '1d' and not self._match_immediately:
-            self._delayed_orders.append((account, order))
+            self._delayed_orders.add(account, order)
             return
-        self._open_orders.append((account, order))
+        self._open_orders.add(account, order)
         order.active()
         self._env.event_bus.publish_event(Event(EVENT.ORDER_CREATION_PASS, account=account, order=order))
         if self._match_immediately:
-            self._match()
+            self._match(order.order_book_id)
 
     def cancel_order(self, order):
         account = self._env.get_account(order.order_book_id)
@@ -101,13 +105,8 @@ class SimulationBroker(AbstractBroker, Persistable):
 
         self._env.event_bus.publish_event(Event(EVENT.ORDER_CANCELLATION_PASS, account=account, order=order))
 
-        try:
-            self._open_orders.remove((account, order))
-        except ValueError:
-            try:
-                self._delayed_orders.remove((account, order))
-            except ValueError:
-                pass
+        if not self._open_orders.remove(order):
+            self._delayed_orders.remove(order)
 
     def before_trading(self, event):
         for account, order in self._open_orders:
@@ -121,9 +120,11 @@ class SimulationBroker(AbstractBroker, Persistable):
             ))
             self._env.event_bus.publish_event(Event(EVENT.ORDER_UNSOLICITED_UPDATE, account=account, order=order))
         self._open_orders = self._delayed_orders
-        self._delayed_orders = []
+        self._delayed_orders = OrderBook()
 
     def on_bar(self, event):
+        # 每个 bar 都会重置成交量限制，价格不变的合约也可能因为新 bar 的成交量而成交，
+        # 因此 bar 撮合不跳过价格未变化的合约；tick 撮合只处理产生该 tick 的合约
         self._matcher.update(self._env.calendar_dt, self._env.trading_dt)
         self._match()
 
@@ -133,13 +134,18 @@ class SimulationBroker(AbstractBroker, Persistable):
         self._match(tick.order_book_id)
 
     def _match(self, order_book_id=None):
-        open_orders = self._open_orders
-        if order_book_id is not None:
-            open_orders = [(a, o) for (a, o) in self._open_orders if o.order_book_id == order_book_id]
+        # 只撮合有挂单的合约；tick 及当前 bar 撮合下单时仅处理对应合约的挂单
+        if order_book_id is None:
+            open_orders = list(self._open_orders)
+        else:
+            open_orders = self._open_orders.orders_of(order_book_id)
+        if not open_orders:
+            return
         self._matcher.match(open_orders)
-        final_orders = [(a, o) for a, o in self._open_orders if o.is_final()]
-        self._open_orders = [(a, o) for a, o in self._open_orders if not o.is_final()]
 
-        for account, order in final_orders:
+        for account, order in open_orders:
+            if not order.is_final():
+                continue
+            self._open_orders.remove(order)
             if order.status == ORDER_STATUS.REJECTED or order.status == ORDER_STATUS.CANCELLED:
                 self._env.event_bus.publish_event(Event(EVENT.ORDER_UNSOLICITED_UPDATE, account=account, order=order))
@@ -16,11 +16,13 @@
 
 import datetime
 
+import numpy as np
+
 from rqalpha.interface import AbstractEventSource
 from rqalpha.events import Event, EVENT
-from rqalpha.utils import get_account_type
+from rqalpha.utils import get_account_type, get_upper_underlying_symbol
 from rqalpha.utils.exception import CustomException, CustomError, patch_user_exc
-from rqalpha.utils.datetime_func import convert_int_to_datetime
+from rqalpha.utils.datetime_func import convert_int_to_datetime, convert_date_to_int
 from rqalpha.const import DEFAULT_ACCOUNT_TYPE
 from rqalpha.utils.i18n import gettext as _
 
@@ -33,6 +35,10 @@ class SimulationEventSource(AbstractEventSource):
         self._env = env
         self._config = env.config
         self._universe_changed = False
+        self._stock_trading_minutes = self._build_stock_trading_minutes()
+        self._future_templates = {}
+        self._future_templates_date = None
+        self._schedules = {}
         self._env.event_bus.add_listener(EVENT.POST_UNIVERSE_CHANGED, self._on_universe_changed)
 
     def _on_universe_changed(self, event):
@@ -45,41 +51,66 @@ class SimulationEventSource(AbstractEventSource):
         return universe
 
     # [BEGIN] minute event helper
+    # 分钟时间表以相对交易日的整数表示：日盘为 HHMMSS；夜盘为 HHMMSS + 240000 * k - NIGHT_OFFSET，
+    # 其中 k 为距上一交易日的自然日数。按 (账户类型, 交易时间模板集合) 缓存为有序 int64 数组。
+    NIGHT_OFFSET = 10000000
+
     @staticmethod
-    def _get_stock_trading_minutes(trading_date):
-        trading_minutes = set()
-        current_dt = datetime.datetime.combine(trading_date, datetime.time(9, 31))
-        am_end_dt = current_dt.replace(hour=11, minute=30)
-        pm_start_dt = current_dt.replace(hour=13, minute=1)
-        pm_end_dt = current_dt.replace(hour=15, minute=0)
-        delta_minute = datetime.timedelta(minutes=1)
-        while current_dt <= am_end_dt:
-            trading_minutes.add(current_dt)
-            current_dt += delta_minute
-
-        current_dt = pm_start_dt
-        while current_dt <= pm_end_dt:
-            trading_minutes.add(current_dt)
-            current_dt += delta_minute
-        return trading_minutes
-
-    def _get_future_trading_minutes(self, trading_date):
-        trading_minutes = set()
-        universe = self._get_universe()
-        for order_book_id in universe:
-            if get_account_type(order_book_id) == DEFAULT_ACCOUNT_TYPE.STOCK.name:
-                continue
-            trading_minutes.update(self._env.data_proxy.get_trading_minutes_for(order_book_id, trading_date))
-        return set([convert_int_to_datetime(minute) for minute in trading_minutes])
+    def _build_stock_trading_minutes():
+        minutes = np.concatenate([np.arange(9 * 60 + 31, 11 * 60 + 31), np.arange(13 * 60 + 1, 15 * 60 + 1)])
+        return (minutes // 60 * 10000 + minutes % 60 * 100).astype(np.int64)
+
+    def _future_template(self, order_book_id, trading_date, prev_date):
+        # 同一品种的交易时间相同，每个交易日只查询一次；交易日切换时清空，缓存只保留当日的模板
+        if trading_date != self._future_templates_date:
+            self._future_templates.clear()
+            self._future_templates_date = trading_date
+        key = get_upper_underlying_symbol(order_book_id) or order_book_id
+        try:
+            return self._future_templates[key]
+        except KeyError:
+            pass
+        minutes = np.array(self._env.data_proxy.get_trading_minutes_for(order_book_id, trading_date), dtype=np.int64)
+        dates, hhmmss = np.divmod(minutes, 1000000)
+        night = minutes < convert_date_to_int(trading_date) + 83000
+        after_midnight = dates != convert_date_to_int(prev_date) // 1000000
+        template = np.where(night, hhmmss + 240000 * after_midnight - self.NIGHT_OFFSET, hhmmss)
+        template = tuple(np.unique(template).tolist())
+        self._future_templates[key] = template
+        return template
+
+    def _get_relative_trading_minutes(self, trading_date, prev_date):
+        templates = set()
+        if DEFAULT_ACCOUNT_TYPE.FUTURE.name in self._config.base.accounts:
+            for order_book_id in self._get_universe():
+                if get_account_type(order_book_id) == DEFAULT_ACCOUNT_TYPE.STOCK.name:
+                    continue
+                templates.add(self._future_template(order_book_id, trading_date, prev_date))
+
+        key = (tuple(self._config.base.accounts), frozenset(templates))
+        try:
+            return self._schedules[key]
+        except KeyError:
+            pass
+        parts = [np.array(t, dtype=np.int64) for t in templates]
+        if DEFAULT_ACCOUNT_TYPE.STOCK.name in self._config.base.accounts:
+            parts.append(self._stock_trading_minutes)
+        schedule = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        self._schedules[key] = schedule
+        return schedule
 
     def _get_trading_minutes(self, trading_date):
-        trading_minutes = set()
-        for account_type in self._config.base.accounts:
-            if account_type == DEFAULT_ACCOUNT_TYPE.STOCK.name:
-                trading_minutes = trading_minutes.union(self._get_stock_trading_minutes(trading_date))
-            elif account_type == DEFAULT_ACCOUNT_TYPE.FUTURE.name:
-                trading_minutes = trading_minutes.union(self._get_future_trading_minutes(trading_date))
-        return sorted(list(trading_minutes))
+        """
+        :return: numpy.ndarray[int64] 当日全部交易分钟（YYYYMMDDHHMMSS），升序
+        """
+        prev_date = self._env.data_proxy.get_previous_trading_date(trading_date)
+        schedule = self._get_relative_trading_minutes(trading_date, prev_date)
+
+        night = schedule < 0
+        days, hhmmss = np.divmod(schedule + self.NIGHT_OFFSET * night, 240000)
+        prev_dates = np.array([convert_date_to_int(prev_date),
+                               convert_date_to_int(prev_date + datetime.timedelta(days=1))], dtype=np.int64)
+        return np.where(night, prev_dates[np.minimum(days, 1)] + hhmmss, convert_date_to_int(trading_date) + schedule)
     # [END] minute event helper
 
     def events(self, start_date, end_date, frequency):
@@ -100,40 +131,33 @@ class SimulationEventSource(AbstractEventSource):
             for day in self._env.data_proxy.get_trading_dates(start_date, end_date):
                 before_trading_flag = True
                 date = day.to_pydatetime()
-                last_dt = None
-                done = False
-
                 dt_before_day_trading = date.replace(hour=8, minute=30)
 
-                while True:
-                    if done:
-                        break
-                    exit_loop = True
-                    trading_minutes = self._get_trading_minutes(date)
-                    for calendar_dt in trading_minutes:
-                        if last_dt is not None and calendar_dt < last_dt:
-                            continue
-
-                        if calendar_dt < dt_before_day_trading:
-                            trading_dt = calendar_dt.replace(year=date.year,
-                                                             month=date.month,
-                                                             day=date.day)
-                        else:
-                            trading_dt = calendar_dt
-                        if before_trading_flag:
-                            before_trading_flag = False
-                            yield Event(EVENT.BEFORE_TRADING,
-                                        calendar_dt=calendar_dt - datetime.timedelta(minutes=30),
-                                        trading_dt=trading_dt - datetime.timedelta(minutes=30))
-                        if self._universe_changed:
-                            self._universe_changed = False
-                            last_dt = calendar_dt
-                            exit_loop = False
-                            break
-                        # yield handle bar
-                        yield Event(EVENT.BAR, calendar_dt=calendar_dt, trading_dt=trading_dt)
-                    if exit_loop:
-                        done = True
+                trading_minutes = self._get_trading_minutes(date)
+                i = 0
+                while i < len(trading_minutes):
+                    minute = trading_minutes[i]
+                    calendar_dt = convert_int_to_datetime(minute)
+                    if calendar_dt < dt_before_day_trading:
+                        trading_dt = calendar_dt.replace(year=date.year,
+                                                         month=date.month,
+                                                         day=date.day)
+                    else:
+                        trading_dt = calendar_dt
+                    if before_trading_flag:
+                        before_trading_flag = False
+                        yield Event(EVENT.BEFORE_TRADING,
+                                    calendar_dt=calendar_dt - datetime.timedelta(minutes=30),
+                                    trading_dt=trading_dt - datetime.timedelta(minutes=30))
+                    if self._universe_changed:
+                        # 合约变化后重新取时间表，从当前分钟继续，不再从头扫描
+                        self._universe_changed = False
+                        trading_minutes = self._get_trading_minutes(date)
+                        i = trading_minutes.searchsorted(minute)
+                        continue
+                    # yield handle bar
+                    yield Event(EVENT.BAR, calendar_dt=calendar_dt, trading_dt=trading_dt)
+                    i += 1
 
                 dt = date.replace(hour=15, minute=30)
                 yield Event(EVENT.AFTER_TRADING, calendar_dt=dt, trading_dt=dt)
@@ -148,7 +172,8 @@ class SimulationEventSource(AbstractEventSource):
                 last_dt = None
                 dt_before_day_trading = date.replace(hour=8, minute=30)
                 while True:
-                    for tick in data_proxy.get_merge_ticks(self._get_universe(), date, last_dt):
+                    ticks = data_proxy.get_merge_ticks(self._get_universe(), date, last_dt)
+                    for tick in ticks:
                         # find before trading time
 
                         calendar_dt = tick.datetime
@@ -168,6 +193,10 @@ class SimulationEventSource(AbstractEventSource):
 
                         if self._universe_changed:
                             self._universe_changed = False
+                            if hasattr(ticks, 'set_universe'):
+                                # 支持增减合约的归并（如 TickMerger）直接在原有的归并上继续
+                                ticks.set_universe(self._get_universe())
+                                continue
                             last_dt = calendar_dt
                             break
                     else:
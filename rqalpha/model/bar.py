@@ -32,6 +32,9 @@ NAMES = ['open', 'close', 'low', 'high', 'settlement', 'limit_up', 'limit_down',
          'basis_spread', 'prev_settlement', 'datetime']
 NANDict = {i: np.nan for i in NAMES}
 
+SNAPSHOT_FIELDS = [n for n in NAMES if n != 'datetime']
+SNAPSHOT_DTYPE = np.dtype([(n, np.float64) for n in SNAPSHOT_FIELDS])
+
 
 class BarObject(object):
     def __init__(self, instrument, data, dt=None):
@@ -239,7 +242,8 @@ class BarObject(object):
         if self.isnan:
             return True
 
-        return Environment.get_instance().data_proxy.is_suspended(self._instrument.order_book_id, int(self._data['datetime'] // 1000000))
+        return Environment.get_instance().data_proxy.is_suspended_at(self._instrument.order_book_id,
+                                                                     int(self._data['datetime'] // 1000000))
 
     def mavg(self, intervals, frequency='1d'):
         if frequency == 'day':
@@ -301,15 +305,26 @@ class BarObject(object):
 
 
 class BarMap(object):
+    """
+    当前 bar 的横截面数据。按合约取值时才会创建 BarObject；通过 bar_dict.close、bar_dict.volume 等属性可以一次获取
+    整个 universe 的数据，返回的 ndarray 与 bar_dict.universe 中的合约一一对应。
+    """
     def __init__(self, data_proxy, frequency):
         self._dt = None
         self._data_proxy = data_proxy
         self._frequency = frequency
         self._cache = {}
+        self._raw_bars = {}
+        self._instruments = {}
+        self._universe = None
+        self._snapshot = None
 
     def update_dt(self, dt):
         self._dt = dt
         self._cache.clear()
+        self._raw_bars.clear()
+        self._universe = None
+        self._snapshot = None
 
     def items(self):
         return ((o, self.__getitem__(o)) for o in Environment.get_instance().get_universe())
@@ -326,29 +341,111 @@ class BarMap(object):
     def __len__(self):
         return len(Environment.get_instance().get_universe())
 
-    def __getitem__(self, key):
+    def _instrument(self, key):
+        try:
+            return self._instruments[key]
+        except KeyError:
+            instrument = self._data_proxy.instruments(key)
+            if instrument is not None:
+                self._instruments[key] = instrument
+            return instrument
+
+    def _get_raw_bars(self, instruments):
+        missing = [i for i in instruments if i.order_book_id not in self._raw_bars]
+        if missing:
+            bars = self._data_proxy.get_raw_bars(missing, self._dt, self._frequency)
+            self._raw_bars.update((i.order_book_id, bar) for i, bar in zip(missing, bars))
+        return [self._raw_bars[i.order_book_id] for i in instruments]
+
+    def _valid_instrument(self, key):
         if not isinstance(key, six.string_types):
             raise patch_user_exc(ValueError('invalid key {} (use order_book_id please)'.format(key)))
 
-        instrument = self._data_proxy.instruments(key)
+        instrument = self._instrument(key)
         if instrument is None:
             raise patch_user_exc(ValueError('invalid order book id or symbol: {}'.format(key)))
+        return instrument
+
+    def __getitem__(self, key):
+        instrument = self._valid_instrument(key)
         order_book_id = instrument.order_book_id
 
         try:
             return self._cache[order_book_id]
         except KeyError:
             try:
-                bar = self._data_proxy.get_bar(order_book_id, self._dt, self._frequency)
+                bar = self._get_raw_bars([instrument])[0]
             except Exception as e:
                 system_log.exception(e)
                 raise patch_user_exc(KeyError(_(u"id_or_symbols {} does not exist").format(key)))
             if bar is None:
                 return BarObject(instrument, NANDict, self._dt)
             else:
-                self._cache[order_book_id] = bar
+                bar = self._cache[order_book_id] = BarObject(instrument, bar)
                 return bar
 
+    @property
+    def universe(self):
+        """
+        [tuple] 按 order_book_id 排序的 universe，与横截面数据的行一一对应
+        """
+        if self._universe is None:
+            self._universe = tuple(sorted(Environment.get_instance().get_universe()))
+        return self._universe
+
+    @property
+    def snapshot(self):
+        """
+        [numpy.ndarray] 当前 bar 的横截面结构化数组，每个 update_dt 只构建一次，缺失的数据为 NaN
+        """
+        if self._snapshot is None:
+            self._snapshot = self._build_snapshot()
+        return self._snapshot
+
+    def get_snapshot(self, order_book_ids):
+        """
+        获取任意一组合约在当前 bar 的横截面结构化数组，行与 order_book_ids 一一对应，缺失的数据为 NaN
+
+        :param order_book_ids: list[str]
+        :return: numpy.ndarray
+        """
+        return self._build_snapshot([self._valid_instrument(o) for o in order_book_ids])
+
+    def _build_snapshot(self, instruments=None):
+        if instruments is None:
+            instruments = [self._instrument(o) for o in self.universe]
+        bars = self._get_raw_bars(instruments)
+
+        snapshot = np.empty(len(bars), dtype=SNAPSHOT_DTYPE)
+        for f in SNAPSHOT_FIELDS:
+            snapshot[f] = np.nan
+
+        # 来自同一张表的 bar dtype 相同，按 dtype 分组后整列赋值
+        groups = {}
+        for row, bar in enumerate(bars):
+            if bar is None:
+                continue
+            if isinstance(bar, np.void):
+                groups.setdefault(bar.dtype, []).append(row)
+            else:
+                for f in SNAPSHOT_FIELDS:
+                    if f in bar:
+                        snapshot[f][row] = bar[f]
+        for dtype, rows in six.iteritems(groups):
+            data = np.array([bars[r] for r in rows], dtype=dtype)
+            for f in SNAPSHOT_FIELDS:
+                if f in dtype.names:
+                    snapshot[f][rows] = data[f]
+
+        for f in ('limit_up', 'limit_down'):
+            snapshot[f][snapshot[f] == 0] = np.nan
+        return snapshot
+
+    def __getattr__(self, item):
+        if item in SNAPSHOT_FIELDS:
+            return self.snapshot[item]
+        raise AttributeError(item)
+
     @property
     def dt(self):
         return self._dt
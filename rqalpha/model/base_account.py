@@ -15,8 +15,11 @@
 # limitations under the License.
 
 import six
+import numpy as np
 
 from rqalpha.interface import AbstractAccount
+from rqalpha.environment import Environment
+from rqalpha.events import EVENT
 from rqalpha.utils.repr import property_repr
 from rqalpha.utils.i18n import gettext as _
 from rqalpha.utils.logger import user_system_log
@@ -34,6 +37,15 @@ class BaseAccount(AbstractAccount):
 
     AGGRESSIVE_UPDATE_LAST_PRICE = False
 
+    # 子类在所有修改账户及持仓的地方调用 _mark_dirty/_mark_all_dirty 后，才能只持久化发生变化的部分
+    DIRTY_TRACKING = False
+
+    # 子类在所有修改持仓的地方调用 _mark_dirty/_mark_all_dirty 后，才能缓存持仓估值
+    VALUATION_CACHE = False
+
+    # 估值中与价格无关的各列，与 _valuation_columns 的返回值一一对应
+    VALUATION_COLUMNS = ()
+
     __repr__ = property_repr
 
     def __init__(self, total_cash, positions, backward_trade_set=None, register_event=True):
@@ -42,8 +54,23 @@ class BaseAccount(AbstractAccount):
         self._total_cash = total_cash
         self._backward_trade_set = backward_trade_set if backward_trade_set is not None else set()
         self._transaction_cost = 0
+        # 自上次持久化以来是否有变化，以及发生变化的持仓
+        self._dirty = True
+        self._dirty_positions = set()
+        # 持仓估值缓存：与价格无关的部分按行保存在 _value_columns 中，价格保存在 _value_prices 中，
+        # 汇总结果保存在 _valuation 中。价格只在同一 calendar_dt 内有效
+        self._valuation_cached = False
+        self._valuation = None
+        self._value_prices_dt = None
+        self._value_rows = None
+        self._value_positions = None
+        self._value_columns = None
+        self._value_prices = None
+        self._stale_value_rows = set()
         if register_event:
             self.register_event()
+            if self.VALUATION_CACHE:
+                self._register_valuation_event()
 
     def register_event(self):
         """
@@ -74,11 +101,147 @@ class BaseAccount(AbstractAccount):
         raise NotImplementedError
 
     def get_state(self):
-        raise NotImplementedError
+        state = self._get_account_state()
+        state['positions'] = {
+            order_book_id: position.get_state() for order_book_id, position in six.iteritems(self._positions)
+        }
+        return state
 
     def set_state(self, state):
         raise NotImplementedError
 
+    def _get_account_state(self):
+        """
+        账户自身（不含持仓）的状态
+        """
+        raise NotImplementedError
+
+    def _mark_dirty(self, order_book_id=None):
+        self._dirty = True
+        self._valuation = None
+        if order_book_id is not None:
+            self._dirty_positions.add(order_book_id)
+            self._stale_value_rows.add(order_book_id)
+
+    def _mark_all_dirty(self):
+        self._dirty = True
+        self._dirty_positions.update(six.iterkeys(self._positions))
+        self._reset_valuation()
+
+    def _register_valuation_event(self):
+        # 价格变化后需要在其他监听函数读取估值之前使缓存失效
+        event_bus = Environment.get_instance().event_bus
+        for event_type in (EVENT.PRE_BAR, EVENT.BAR, EVENT.PRE_TICK, EVENT.TICK, EVENT.SETTLEMENT):
+            event_bus.prepend_listener(event_type, self._on_price_update)
+        self._valuation_cached = True
+
+    def _on_price_update(self, event):
+        self._value_prices = None
+        self._valuation = None
+
+    def _update_last_price(self, event):
+        for position in six.itervalues(self._positions):
+            position.update_last_price()
+        self._on_price_update(event)
+
+    def _reset_valuation(self):
+        self._value_rows = None
+        self._valuation = None
+
+    def _valuation_columns(self, position):
+        """
+        持仓估值中与价格无关的部分，返回 tuple，与 VALUATION_COLUMNS 一一对应
+        """
+        raise NotImplementedError
+
+    def _aggregate_valuation(self, columns, prices):
+        """
+        由所有持仓的 _valuation_columns 及最新价计算账户估值，返回 dict
+        """
+        raise NotImplementedError
+
+    def _build_value_rows(self):
+        positions = list(six.itervalues(self._positions))
+        columns = [self._valuation_columns(position) for position in positions]
+        self._value_rows = {position.order_book_id: row for row, position in enumerate(positions)}
+        self._value_positions = positions
+        self._value_columns = np.array(columns, dtype=np.float64).reshape(len(positions), len(self.VALUATION_COLUMNS))
+        self._value_prices = None
+        self._stale_value_rows.clear()
+
+    def _update_value_rows(self):
+        for order_book_id in self._stale_value_rows:
+            position = self._positions.get(order_book_id)
+            row = self._value_rows.get(order_book_id)
+            if row is None and position is None:
+                continue
+            if row is None or self._value_positions[row] is not position:
+                # 持仓有增删，重新构建
+                self._build_value_rows()
+                return
+            self._value_columns[row] = self._valuation_columns(position)
+        self._stale_value_rows.clear()
+
+    def _get_valuation(self):
+        """
+        账户估值，在成交、价格更新及结算之间保持不变；价格更新后只需重新获取一次最新价。
+        缓存的最新价只在同一 calendar_dt 内有效。未注册事件的账户无法得知价格变化，每次都重新计算
+        """
+        if not self._valuation_cached:
+            self._reset_valuation()
+        else:
+            dt = Environment.get_instance().calendar_dt
+            if dt != self._value_prices_dt:
+                self._value_prices_dt = dt
+                self._on_price_update(None)
+        if self._valuation is None:
+            if self._value_rows is None:
+                self._build_value_rows()
+            elif self._stale_value_rows:
+                self._update_value_rows()
+            if self._value_prices is None:
+                self._value_prices = np.array(
+                    [position.last_price for position in self._value_positions], dtype=np.float64)
+            self._valuation = self._aggregate_valuation(self._value_columns, self._value_prices)
+        return self._valuation
+
+    def get_delta_state(self):
+        """
+        导出自上次调用 :meth:`reset_delta_state` 以来的变化：账户自身的状态及发生变化的持仓，已删除的持仓记录在 removed_positions 中。
+        没有变化时返回 None；未跟踪变化（DIRTY_TRACKING 为 False）的账户总是返回完整状态。
+        """
+        if not self.DIRTY_TRACKING:
+            return self.get_state()
+        if not self._dirty:
+            return None
+        state = self._get_account_state()
+        state['positions'] = {
+            order_book_id: self._positions[order_book_id].get_state()
+            for order_book_id in self._dirty_positions if order_book_id in self._positions
+        }
+        state['removed_positions'] = [o for o in self._dirty_positions if o not in self._positions]
+        return state
+
+    def reset_delta_state(self):
+        self._dirty = False
+        self._dirty_positions.clear()
+
+    @staticmethod
+    def merge_delta_state(state, delta_state):
+        """
+        将 :meth:`get_delta_state` 导出的变化合并到 :meth:`get_state` 导出的完整状态中
+        """
+        if 'removed_positions' not in delta_state:
+            return delta_state
+        positions = dict(state.get('positions', {}))
+        positions.update(delta_state['positions'])
+        for order_book_id in delta_state['removed_positions']:
+            positions.pop(order_book_id, None)
+        state = dict(state)
+        state.update((k, v) for k, v in six.iteritems(delta_state) if k != 'removed_positions')
+        state['positions'] = positions
+        return state
+
     @property
     def positions(self):
         """
@@ -105,6 +268,8 @@ class BaseAccount(AbstractAccount):
         """
         [float] 市值
         """
+        if self._valuation_cached:
+            return self._get_valuation()['market_value']
         return sum(position.market_value for position in six.itervalues(self._positions))
 
     @property
@@ -14,6 +14,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from bisect import bisect_left, insort
+
 from rqalpha.interface import AbstractPosition
 from rqalpha.environment import Environment
 from rqalpha.utils.i18n import gettext as _
@@ -25,17 +27,47 @@ class Positions(dict):
         super(Positions, self).__init__()
         self._position_cls = position_cls
         self._cached_positions = {}
+        # 随持仓的增删维护有序的 order_book_id 列表
+        self._sorted_keys = []
 
     def __missing__(self, key):
         if key not in self._cached_positions:
             self._cached_positions[key] = self._position_cls(key)
         return self._cached_positions[key]
 
+    def __setitem__(self, key, value):
+        if key not in self:
+            insort(self._sorted_keys, key)
+        super(Positions, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        super(Positions, self).__delitem__(key)
+        del self._sorted_keys[bisect_left(self._sorted_keys, key)]
+
+    def pop(self, key, *args):
+        if key in self:
+            del self._sorted_keys[bisect_left(self._sorted_keys, key)]
+        return super(Positions, self).pop(key, *args)
+
+    def clear(self):
+        super(Positions, self).clear()
+        self._sorted_keys = []
+
+    def __reduce__(self):
+        # 反序列化时先恢复 _sorted_keys 再逐个放入持仓
+        return self.__class__, (self._position_cls, ), None, None, iter(list(self.items()))
+
     def get_or_create(self, key):
         if key not in self:
             self[key] = self._position_cls(key)
         return self[key]
 
+    def sorted_keys(self):
+        """
+        按 order_book_id 排序的持仓列表，调用方不应修改返回的列表
+        """
+        return self._sorted_keys
+
 
 class BasePosition(AbstractPosition):
     __abandon_properties__ = ["total_orders", "total_trades"]
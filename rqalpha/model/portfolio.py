@@ -15,13 +15,15 @@
 # limitations under the License.
 
 import six
+import heapq
 import jsonpickle
 import numpy as np
 
 from rqalpha.environment import Environment
 from rqalpha.const import DAYS_CNT, DEFAULT_ACCOUNT_TYPE
-from rqalpha.utils import get_account_type, merge_dicts
+from rqalpha.utils import get_account_type
 from rqalpha.utils.repr import property_repr
+from rqalpha.utils import persist_codec
 from rqalpha.events import EVENT
 
 
@@ -35,6 +37,7 @@ class Portfolio(object):
         self._units = units
         self._accounts = accounts
         self._mixed_positions = None
+        self._last_persisted_state = None
         if register_event:
             self.register_event()
 
@@ -50,20 +53,57 @@ class Portfolio(object):
         account_type = get_account_type(order_book_id)
         return self.accounts[account_type].order(order_book_id, quantity, style, target)
 
-    def get_state(self):
-        return jsonpickle.encode({
+    def _get_portfolio_state(self):
+        return {
             'start_date': self._start_date,
             'static_unit_net_value': self._static_unit_net_value,
             'last_unit_net_value': self._last_unit_net_value,
             'units': self._units,
-            'accounts': {
-                name: account.get_state() for name, account in six.iteritems(self._accounts)
-            }
-        }).encode('utf-8')
+        }
+
+    def get_state(self):
+        state = self._get_portfolio_state()
+        state['accounts'] = {
+            name: account.get_state() for name, account in six.iteritems(self._accounts)
+        }
+        return persist_codec.dumps(state)
+
+    def get_delta_state(self):
+        accounts = {}
+        for name, account in six.iteritems(self._accounts):
+            account_state = account.get_delta_state()
+            if account_state is not None:
+                accounts[name] = account_state
+        state = self._get_portfolio_state()
+        if not accounts and state == self._last_persisted_state:
+            return None
+        state['accounts'] = accounts
+        return persist_codec.dumps(state)
+
+    def reset_delta_state(self):
+        self._last_persisted_state = self._get_portfolio_state()
+        for account in six.itervalues(self._accounts):
+            account.reset_delta_state()
+
+    def merge_delta_states(self, state, delta_states):
+        value = self._decode_state(state)
+        for delta_state in delta_states:
+            delta = persist_codec.loads(delta_state)
+            accounts = value['accounts']
+            for name, account_state in six.iteritems(delta.pop('accounts')):
+                accounts[name] = self._accounts[name].merge_delta_state(accounts.get(name, {}), account_state)
+            value.update(delta)
+        return persist_codec.dumps(value)
+
+    @staticmethod
+    def _decode_state(state):
+        if persist_codec.is_json(state):
+            # 兼容旧版本使用 jsonpickle 持久化的数据
+            return jsonpickle.decode(state.decode('utf-8'))
+        return persist_codec.loads(state)
 
     def set_state(self, state):
-        state = state.decode('utf-8')
-        value = jsonpickle.decode(state)
+        value = self._decode_state(state)
         self._start_date = value['start_date']
         self._static_unit_net_value = value['static_unit_net_value']
         self._last_unit_net_value = value.get('last_unit_net_value', self._static_unit_net_value)
@@ -218,44 +258,57 @@ class Portfolio(object):
 
 
 class MixedPositions(dict):
+    """
+    各账户持仓的实时视图，按 order_book_id 对应的账户类型分派，不复制持仓
+    """
 
     def __init__(self, accounts):
         super(MixedPositions, self).__init__()
         self._accounts = accounts
 
     def __missing__(self, key):
-        account_type = get_account_type(key)
-        for a_type in self._accounts:
-            if a_type == account_type:
-                return self._accounts[a_type].positions[key]
-        return None
+        account = self._accounts.get(get_account_type(key))
+        if account is None:
+            return None
+        return account.positions[key]
 
     def __contains__(self, item):
-        return item in self.keys()
+        for account in six.itervalues(self._accounts):
+            if item in account.positions:
+                return True
+        return False
 
     def __repr__(self):
-        keys = []
-        for account in six.itervalues(self._accounts):
-            keys += account.positions.keys()
-        return str(sorted(keys))
+        return str(self.keys())
 
     def __len__(self):
         return sum(len(account.positions) for account in six.itervalues(self._accounts))
 
     def __iter__(self):
-        keys = []
-        for account in six.itervalues(self._accounts):
-            keys += account.positions.keys()
-        for key in sorted(keys):
-            yield key
+        return iter(self.keys())
+
+    @staticmethod
+    def _sorted_keys_of(positions):
+        try:
+            return positions.sorted_keys()
+        except AttributeError:
+            return sorted(positions)
 
     def items(self):
-        items = merge_dicts(*[account.positions.items() for account in six.itervalues(self._accounts)])
-        for k in sorted(items.keys()):
-            yield k, items[k]
+        # 各账户的持仓已经有序，归并即可
+        positions = [account.positions for account in six.itervalues(self._accounts)]
+        merged = heapq.merge(*[
+            [(key, i) for key in self._sorted_keys_of(p)] for i, p in enumerate(positions)
+        ])
+        for key, i in list(merged):
+            yield key, positions[i][key]
+
+    def values(self):
+        for _, position in self.items():
+            yield position
 
     def keys(self):
-        keys = []
-        for account in six.itervalues(self._accounts):
-            keys += list(account.positions.keys())
-        return sorted(keys)
+        sorted_keys = [self._sorted_keys_of(account.positions) for account in six.itervalues(self._accounts)]
+        if len(sorted_keys) == 1:
+            return list(sorted_keys[0])
+        return list(heapq.merge(*sorted_keys))
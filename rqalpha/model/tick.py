@@ -16,12 +16,20 @@
 
 
 import numpy as np
+import six
+
+from rqalpha.utils.datetime_func import convert_ms_int_to_datetime
 
 
 class Tick(object):
+    """
+    tick 可以是 dict，也可以是 TickStore 中结构化数组的一行（datetime 为 YYYYMMDDHHMMSSmmm 整数），
+    后者直接引用共享的数据而不复制。
+    """
     def __init__(self, order_book_id, tick):
         self._order_book_id = order_book_id
         self._tick = tick
+        self._dt = None
 
     @property
     def order_book_id(self):
@@ -29,7 +37,12 @@ class Tick(object):
 
     @property
     def datetime(self):
-        return self._tick['datetime']
+        if self._dt is None:
+            dt = self._tick['datetime']
+            if isinstance(dt, (six.integer_types, np.integer)):
+                dt = convert_ms_int_to_datetime(int(dt))
+            self._dt = dt
+        return self._dt
 
     @property
     def open(self):
@@ -110,11 +123,17 @@ class Tick(object):
 
     @property
     def limit_up(self):
-        return self._tick.get('limit_up', np.nan)
+        try:
+            return self._tick['limit_up']
+        except (KeyError, ValueError):
+            return np.nan
 
     @property
     def limit_down(self):
-        return self._tick.get('limit_down', np.nan)
+        try:
+            return self._tick['limit_down']
+        except (KeyError, ValueError):
+            return np.nan
 
     def __repr__(self):
         items = []
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import copy
+import itertools
+import multiprocessing
+import time
+
+import pandas as pd
+import simplejson as json
+import six
+
+from rqalpha.utils.i18n import gettext as _
+from rqalpha.utils.py2 import to_utf8
+
+
+# 在父进程中加载，fork 出的 worker 通过 copy-on-write 共享合约、交易日历等数据及已打开的 memmap；
+# bar cache 在各 worker 中按需填充，不在进程间共享
+_data_source = None
+
+
+def expand_param_grid(param_grid):
+    """
+    将 {name: [v1, v2, ...]} 展开为参数组合列表；如果传入的已经是参数字典列表则原样返回。
+    """
+    if isinstance(param_grid, dict):
+        names = sorted(param_grid)
+        return [dict(zip(names, values)) for values in itertools.product(*[param_grid[n] for n in names])]
+    return [dict(p) for p in param_grid]
+
+
+def _sweep_config(config, params):
+    config = copy.deepcopy(config)
+    extra = config.setdefault('extra', {})
+    context_vars = extra.get('context_vars') or {}
+    if isinstance(context_vars, six.string_types):
+        # 与 parse_config 相同，命令行传入的 context_vars 为 json 字符串
+        context_vars = json.loads(to_utf8(context_vars))
+    context_vars = dict(context_vars)
+    context_vars.update(params)
+    extra['context_vars'] = context_vars
+    # 多进程同时输出进度条没有意义，除非用户显式开启
+    config.setdefault('mod', {}).setdefault('sys_progress', {}).setdefault('enabled', False)
+    return config
+
+
+def _load_data_source(config, source_code=None):
+    from rqalpha.utils.config import parse_config
+    from rqalpha.data.base_data_source import BaseDataSource
+
+    parsed = parse_config(copy.deepcopy(config), source_code=source_code)
+    return BaseDataSource(parsed.base.data_bundle_path, parsed.base.data_cache_mb)
+
+
+def _run_one(args):
+    from rqalpha.utils.config import parse_config
+    from rqalpha.utils.py2 import clear_all_cached_functions
+    from rqalpha import main
+
+    global _data_source
+    index, config, params, source_code = args
+    start = time.time()
+    try:
+        if _data_source is None:
+            # spawn 方式启动的 worker 无法共享父进程的数据
+            _data_source = _load_data_source(config, source_code)
+        parsed = parse_config(_sweep_config(config, params), source_code=source_code)
+        clear_all_cached_functions()
+        result = main.run(parsed, source_code=source_code, data_source=_data_source)
+        if result is None:
+            raise RuntimeError(_(u"strategy run failed, see log for details"))
+        summary = dict(result['sys_analyser']['summary'])
+        error = None
+    except Exception as e:
+        summary = {}
+        error = repr(e)
+    return index, params, summary, error, time.time() - start
+
+
+def run_sweep(config, param_grid, workers=None, source_code=None, verbose=True):
+    """
+    使用进程池并行运行参数扫描。
+
+    数据源在 fork worker 之前加载，worker 共享其中的合约、交易日历及 memmap 数据，bar cache 则由各 worker 分别填充。
+    各参数组合通过 ``extra.context_vars`` 注入策略的 context，
+    每次运行 sys_analyser 的 summary 汇总为一个 DataFrame 返回。
+
+    :param dict config: 与 :func:`rqalpha.run` 相同的配置字典
+    :param param_grid: {参数名: 取值列表} 或参数字典的列表
+    :param int workers: 进程数，默认为 CPU 核数
+    :param str source_code: 策略源码，为空时使用 config 中的 strategy_file
+    :param bool verbose: 是否输出进度、失败信息及每次运行的耗时
+
+    :return: `pandas.DataFrame`，每行对应一组参数，包含参数、summary、wall_time 以及 error 列
+    """
+    global _data_source
+
+    params_list = expand_param_grid(param_grid)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    workers = max(1, min(workers, len(params_list)))
+
+    tasks = [(i, config, params, source_code) for i, params in enumerate(params_list)]
+    rows = [None] * len(tasks)
+    _data_source = _load_data_source(config, source_code)
+    try:
+        _run_pool(tasks, rows, workers, verbose)
+    finally:
+        # 不在父进程中继续持有数据源
+        _data_source = None
+
+    param_names = sorted(set(itertools.chain.from_iterable(params_list)))
+    df = pd.DataFrame(rows)
+    columns = param_names + [c for c in df.columns if c not in param_names]
+    return df[columns]
+
+
+def _run_pool(tasks, rows, workers, verbose):
+    try:
+        # 显式使用 fork，保证 worker 与父进程共享已加载的数据
+        pool = multiprocessing.get_context('fork').Pool(workers)
+    except (AttributeError, ValueError):
+        pool = multiprocessing.Pool(workers)
+    try:
+        for done, (index, params, summary, error, wall_time) in enumerate(
+                pool.imap_unordered(_run_one, tasks), 1):
+            row = dict(summary)
+            row.update(params)
+            row['wall_time'] = wall_time
+            row['error'] = error
+            rows[index] = row
+            if verbose:
+                if error is None:
+                    six.print_(_(u"[{done}/{total}] {params} finished in {wall_time:.1f}s").format(
+                        done=done, total=len(tasks), params=params, wall_time=wall_time))
+                else:
+                    six.print_(_(u"[{done}/{total}] {params} failed in {wall_time:.1f}s: {error}").format(
+                        done=done, total=len(tasks), params=params, wall_time=wall_time, error=error))
+    finally:
+        pool.close()
+        pool.join()
@@ -15,11 +15,19 @@
 # limitations under the License.
 
 import os
+import struct
 
-from rqalpha.interface import AbstractPersistProvider
+from rqalpha.interface import AbstractJournalPersistProvider
 
 
-class DiskPersistProvider(AbstractPersistProvider):
+class DiskPersistProvider(AbstractJournalPersistProvider):
+    """
+    每个 key 对应一个文件：文件头之后依次是完整状态及此后追加的增量数据，每条记录以 4 字节长度作为前缀。
+    store 时写入临时文件再替换原文件，完成日志的压缩；没有文件头的文件视为旧版本直接写入的完整状态。
+    """
+    MAGIC = b'RQJOURNAL1'
+    RECORD_HEADER = struct.Struct('<I')
+
     def __init__(self, path="./persist"):
         self._path = path
         try:
@@ -29,12 +37,50 @@ class DiskPersistProvider(AbstractPersistProvider):
 
     def store(self, key, value):
         assert isinstance(value, bytes), "value must be bytes"
-        with open(os.path.join(self._path, key), "wb") as f:
+        path = os.path.join(self._path, key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.MAGIC)
+            f.write(self.RECORD_HEADER.pack(len(value)))
             f.write(value)
+        if os.name == "nt" and os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp_path, path)
 
-    def load(self, key, large_file=False):
+    def append(self, key, value):
+        assert isinstance(value, bytes), "value must be bytes"
+        path = os.path.join(self._path, key)
+        if not os.path.exists(path):
+            raise RuntimeError("can not append to {} before it has been stored".format(key))
+        with open(path, "ab") as f:
+            f.write(self.RECORD_HEADER.pack(len(value)) + value)
+
+    def _read_records(self, key):
         try:
             with open(os.path.join(self._path, key), "rb") as f:
-                return f.read()
-        except IOError as e:
-            return None
+                data = f.read()
+        except IOError:
+            return []
+
+        if not data.startswith(self.MAGIC):
+            return [data]
+
+        records = []
+        offset = len(self.MAGIC)
+        header_size = self.RECORD_HEADER.size
+        while offset + header_size <= len(data):
+            size, = self.RECORD_HEADER.unpack_from(data, offset)
+            offset += header_size
+            if offset + size > len(data):
+                # 写入过程中被中断的最后一条记录
+                break
+            records.append(data[offset:offset + size])
+            offset += size
+        return records
+
+    def load(self, key, large_file=False):
+        records = self._read_records(key)
+        return records[0] if records else None
+
+    def load_journal(self, key):
+        return self._read_records(key)[1:]
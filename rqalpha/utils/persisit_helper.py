@@ -21,6 +21,7 @@ from collections import OrderedDict
 import jsonpickle
 
 from rqalpha.events import EVENT
+from rqalpha.interface import AbstractJournalPersistProvider, IncrementalPersistable
 from rqalpha.const import PERSIST_MODE
 from rqalpha.utils.logger import system_log
 
@@ -52,6 +53,10 @@ class PersistHelper(object):
         self._objects = OrderedDict()
         self._last_state = {}
         self._persist_provider = persist_provider
+        self._journaling = isinstance(persist_provider, AbstractJournalPersistProvider)
+        # 各 key 最近一次完整状态的大小及此后追加的增量数据大小，增量超过完整状态时重新写入完整状态以压缩日志
+        self._state_size = {}
+        self._journal_size = {}
         if persist_mode == PERSIST_MODE.REAL_TIME:
             event_bus.add_listener(EVENT.POST_BEFORE_TRADING, self.persist)
             event_bus.add_listener(EVENT.POST_AFTER_TRADING, self.persist)
@@ -62,17 +67,44 @@ class PersistHelper(object):
     def persist(self, *args):
         for key, obj in six.iteritems(self._objects):
             try:
-                state = obj.get_state()
-                if not state:
-                    continue
-                md5 = hashlib.md5(state).hexdigest()
-                if self._last_state.get(key) == md5:
-                    continue
-                self._persist_provider.store(key, state)
+                if self._journaling and isinstance(obj, IncrementalPersistable):
+                    self._persist_incremental(key, obj)
+                else:
+                    self._persist_state(key, obj)
             except Exception as e:
                 system_log.exception("PersistHelper.persist fail")
-            else:
-                self._last_state[key] = md5
+
+    def _persist_state(self, key, obj):
+        state = obj.get_state()
+        if not state:
+            return
+        md5 = hashlib.md5(state).hexdigest()
+        if self._last_state.get(key) == md5:
+            return
+        self._persist_provider.store(key, state)
+        self._last_state[key] = md5
+
+    def _persist_incremental(self, key, obj):
+        # 只有写入成功后才重置变化记录；写入失败时丢弃完整状态的记录，下次持久化时重新写入完整状态
+        try:
+            if key in self._state_size and self._journal_size[key] <= self._state_size[key]:
+                delta_state = obj.get_delta_state()
+                if delta_state:
+                    self._persist_provider.append(key, delta_state)
+                    self._journal_size[key] += len(delta_state)
+                obj.reset_delta_state()
+                return
+
+            state = obj.get_state()
+            if not state:
+                return
+            self._persist_provider.store(key, state)
+            obj.reset_delta_state()
+            self._state_size[key] = len(state)
+            self._journal_size[key] = 0
+        except Exception:
+            self._state_size.pop(key, None)
+            raise
 
     def register(self, key, obj):
         if key in self._objects:
@@ -91,4 +123,8 @@ class PersistHelper(object):
             system_log.debug('restore {} with state = {}', key, state)
             if not state:
                 continue
+            if self._journaling and isinstance(obj, IncrementalPersistable):
+                delta_states = self._persist_provider.load_journal(key)
+                if delta_states:
+                    state = obj.merge_delta_states(state, delta_states)
             obj.set_state(state)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+
+import msgpack
+import numpy as np
+import six
+
+
+EXT_DATE = 1
+EXT_DATETIME = 2
+
+DATE_FORMAT = "%Y-%m-%d"
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def _default(obj):
+    if isinstance(obj, datetime.datetime):
+        return msgpack.ExtType(EXT_DATETIME, obj.strftime(DATETIME_FORMAT).encode('ascii'))
+    if isinstance(obj, datetime.date):
+        return msgpack.ExtType(EXT_DATE, obj.strftime(DATE_FORMAT).encode('ascii'))
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError("can not serialize {!r}".format(obj))
+
+
+def _ext_hook(code, data):
+    if code == EXT_DATETIME:
+        return datetime.datetime.strptime(data.decode('ascii'), DATETIME_FORMAT)
+    if code == EXT_DATE:
+        return datetime.datetime.strptime(data.decode('ascii'), DATE_FORMAT).date()
+    return msgpack.ExtType(code, data)
+
+
+def dumps(obj):
+    """
+    将由 dict/list/数值/字符串/日期组成的状态编码为 msgpack 二进制
+    """
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+def loads(data):
+    return msgpack.unpackb(data, ext_hook=_ext_hook, raw=False)
+
+
+def is_json(data):
+    """
+    旧版本使用 jsonpickle 持久化，其内容总是以 ``{`` 开头，而 msgpack 编码的 dict 不会以该字节开头
+    """
+    return data[:1] == six.b('{')
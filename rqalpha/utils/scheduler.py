@@ -14,9 +14,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import bisect
 import datetime
 import json
+from collections import defaultdict
 
+import numpy as np
 from dateutil.parser import parse
 
 from rqalpha.execution_context import ExecutionContext
@@ -73,11 +76,18 @@ class Scheduler(object):
 
     @classmethod
     def set_trading_dates_(cls, trading_dates):
-        cls._TRADING_DATES = trading_dates
+        # 以 YYYYMMDD 整数保存交易日历
+        cls._TRADING_DATES = np.asarray(trading_dates.year * 10000 + trading_dates.month * 100 + trading_dates.day,
+                                        dtype=np.int64)
 
     def __init__(self, frequency):
         self._registry = []
+        # 当天需要触发的函数，在 next_day_ 中编译：分钟 -> [(注册顺序, func)]
+        self._minute_table = {}
+        self._minutes = []
+        self._before_trading_funcs = []
         self._today = None
+        self._today_int = None
         self._this_week = None
         self._this_month = None
         self._last_minute = 0
@@ -103,41 +113,58 @@ class Scheduler(object):
 
     def _is_nth_trading_day_in_week(self, n):
         try:
-            return self._this_week[n] == self._today
+            return self._this_week[n] == self._today_int
         except IndexError:
             return False
 
     def _is_nth_trading_day_in_month(self, n):
         try:
-            return self._this_month[n] == self._today
+            return self._this_month[n] == self._today_int
         except IndexError:
             return False
 
-    def _should_trigger(self, n):
-        # 非股票交易时间段不触发
-        if self._current_minute < 9*60+31 or self._current_minute > 15*60:
-            return False
-
-        return self._last_minute < n <= self._current_minute
-
-    def _is_before_trading(self):
-        return self._stage == 'before_trading'
-
     def _time_rule_for(self, time_rule):
+        # 返回 'before_trading' 或触发的分钟数（自零点起）
         if time_rule == 'before_trading':
-            return lambda: self._is_before_trading()
+            return time_rule
 
         if time_rule is not None and not isinstance(time_rule, int):
             raise patch_user_exc(ValueError('invalid time_rule, "before_trading" or int expected, got {}'.format(repr(time_rule))))
 
-        time_rule = time_rule if time_rule else self._minutes_since_midnight(9, 31)
-        return lambda: self._should_trigger(time_rule)
+        return time_rule if time_rule else self._minutes_since_midnight(9, 31)
+
+    def _compile(self):
+        # 每个交易日只判断一次日期规则，生成当天的触发表
+        table = defaultdict(list)
+        self._before_trading_funcs = []
+        for i, (day_rule, time_rule, func) in enumerate(self._registry):
+            if not day_rule():
+                continue
+            if time_rule == 'before_trading':
+                self._before_trading_funcs.append(func)
+            else:
+                table[time_rule].append((i, func))
+        self._minute_table = dict(table)
+        self._minutes = sorted(self._minute_table)
+
+    def _triggered_funcs(self):
+        # 非股票交易时间段不触发；触发 (last_minute, current_minute] 之间的函数，按注册顺序执行
+        current, last = self._current_minute, self._last_minute
+        if current < 9 * 60 + 31 or current > 15 * 60 or not self._minutes:
+            return []
+
+        if last == current - 1:
+            return [func for _, func in self._minute_table.get(current, [])]
+
+        left = bisect.bisect_right(self._minutes, last)
+        right = bisect.bisect_right(self._minutes, current)
+        if right - left == 1:
+            return [func for _, func in self._minute_table[self._minutes[left]]]
+        return [func for _, func in sorted(e for n in self._minutes[left:right] for e in self._minute_table[n])]
 
     def run_daily(self, func, time_rule=None):
         _verify_function('run_daily', func)
-        self._registry.append((self._always_true,
-                               self._time_rule_for(time_rule),
-                               func))
+        self._registry.append((self._always_true, self._time_rule_for(time_rule), func))
 
     def run_weekly(self, func, weekday=None, tradingday=None, time_rule=None):
         _verify_function('run_weekly', func)
@@ -155,9 +182,7 @@ class Scheduler(object):
                 tradingday -= 1
             day_checker = lambda: self._is_nth_trading_day_in_week(tradingday)
 
-        time_checker = self._time_rule_for(time_rule)
-
-        self._registry.append((day_checker, time_checker, func))
+        self._registry.append((day_checker, self._time_rule_for(time_rule), func))
 
     def run_monthly(self, func, tradingday=None, time_rule=None, **kwargs):
         _verify_function('run_monthly', func)
@@ -178,22 +203,25 @@ class Scheduler(object):
         if tradingday > 0:
             tradingday -= 1
 
-        time_checker = self._time_rule_for(time_rule)
-
         self._registry.append((lambda: self._is_nth_trading_day_in_month(tradingday),
-                               time_checker, func))
+                               self._time_rule_for(time_rule), func))
 
     def next_day_(self, event):
         if len(self._registry) == 0:
             return
 
-        self._today = Environment.get_instance().trading_dt.date()
+        self._set_today(Environment.get_instance().trading_dt.date())
         self._last_minute = 0
         self._current_minute = 0
-        if not self._this_week or self._today > self._this_week[-1]:
+        if not self._this_week or self._today_int > self._this_week[-1]:
             self._fill_week()
-        if not self._this_month or self._today > self._this_month[-1]:
+        if not self._this_month or self._today_int > self._this_month[-1]:
             self._fill_month()
+        self._compile()
+
+    def _set_today(self, today):
+        self._today = today
+        self._today_int = today.year * 10000 + today.month * 100 + today.day
 
     @staticmethod
     def _minutes_since_midnight(hour, minute):
@@ -203,46 +231,46 @@ class Scheduler(object):
         bars = event.bar_dict
         with ExecutionContext(EXECUTION_PHASE.SCHEDULED):
             self._current_minute = self._minutes_since_midnight(self._ucontext.now.hour, self._ucontext.now.minute)
-            for day_rule, time_rule, func in self._registry:
-                if day_rule() and time_rule():
-                    with ModifyExceptionFromType(EXC_TYPE.USER_EXC):
-                        func(self._ucontext, bars)
+            for func in self._triggered_funcs():
+                with ModifyExceptionFromType(EXC_TYPE.USER_EXC):
+                    func(self._ucontext, bars)
             self._last_minute = self._current_minute
 
     def before_trading_(self, event):
         with ExecutionContext(EXECUTION_PHASE.BEFORE_TRADING):
             self._stage = 'before_trading'
-            for day_rule, time_rule, func in self._registry:
-                if day_rule() and time_rule():
-                    with ModifyExceptionFromType(EXC_TYPE.USER_EXC):
-                        func(self._ucontext, None)
+            for func in self._before_trading_funcs:
+                with ModifyExceptionFromType(EXC_TYPE.USER_EXC):
+                    func(self._ucontext, None)
             self._stage = None
 
+    @staticmethod
+    def _date_int(d):
+        return d.year * 10000 + d.month * 100 + d.day
+
     def _fill_week(self):
         weekday = self._today.isoweekday()
         weekend = self._today + datetime.timedelta(days=7 - weekday)
         week_start = weekend - datetime.timedelta(days=6)
 
-        left = self._TRADING_DATES.searchsorted(week_start)
-        right = self._TRADING_DATES.searchsorted(weekend, side='right')
-        self._this_week = [d.date() for d in self._TRADING_DATES[left:right]]
+        left = self._TRADING_DATES.searchsorted(self._date_int(week_start))
+        right = self._TRADING_DATES.searchsorted(self._date_int(weekend), side='right')
+        self._this_week = self._TRADING_DATES[left:right].tolist()
 
     def _fill_month(self):
-        try:
-            month_end = self._today.replace(month=self._today.month + 1, day=1)
-        except ValueError:
-            month_end = self._today.replace(year=self._today.year + 1, month=1, day=1)
-
-        month_begin = self._today.replace(day=1)
-        left, right = self._TRADING_DATES.searchsorted(month_begin), self._TRADING_DATES.searchsorted(month_end)
-        self._this_month = [d.date() for d in self._TRADING_DATES[left:right]]
+        # 同月的 YYYYMMDD 落在 [YYYYMM00, YYYYMM99] 之间
+        month_begin = self._today_int // 100 * 100
+        left = self._TRADING_DATES.searchsorted(month_begin)
+        right = self._TRADING_DATES.searchsorted(month_begin + 100)
+        self._this_month = self._TRADING_DATES[left:right].tolist()
 
     def set_state(self, state):
         r = json.loads(state.decode('utf-8'))
-        self._today = parse(r['today']).date()
+        self._set_today(parse(r['today']).date())
         self._last_minute = r['last_minute']
         self._fill_month()
         self._fill_week()
+        self._compile()
 
     def get_state(self):
         if self._today is None:
@@ -28,6 +28,7 @@ import numpy as np
 import coverage
 
 from rqalpha import run, run_func
+from rqalpha.utils.config import code_config
 from rqalpha.utils.logger import system_log
 
 TEST_DIR = os.path.abspath("./tests/")
@@ -36,7 +37,7 @@ TEST_OUT = os.path.abspath("./tests/outs/")
 pd.set_option("display.width", 160)
 
 
-def run_tests(file_path=None):
+def run_tests(file_path=None, mod_config=None):
     if file_path is not None:
         files = [file_path]
     else:
@@ -44,7 +45,7 @@ def run_tests(file_path=None):
     error_map = {}
     for filename in files:
         try:
-            r, result_data = run_test(filename)
+            r, result_data = run_test(filename, mod_config)
             if r is not None:
                 error_map[filename.replace(".py", "")] = result_data
         except Exception as e:
@@ -66,12 +67,14 @@ def run_tests(file_path=None):
     return len(error_map)
 
 
-def run_test(filename):
+def run_test(filename, mod_config=None):
     config = {
         "base": {
             "strategy_file": os.path.join(TEST_DIR, filename)
         }
     }
+    if mod_config is not None:
+        config["mod"] = mod_config
     print(u"Start test: " + str(config["base"]["strategy_file"]))
     result_dict = run(config)['sys_analyser']
     df = result_dict["portfolio"]
@@ -80,10 +83,11 @@ def run_test(filename):
     old_pickle_file = os.path.join(TEST_OUT, filename.replace(".py", ".pkl"))
 
     if not os.path.exists(old_pickle_file):
+        # 没有参考结果时写入本次结果，但不算通过，需确认结果正确后提交 pkl 并重新运行
         if not os.path.exists(TEST_OUT):
             os.makedirs(TEST_OUT)
         pickle.dump(result_dict, open(old_pickle_file, "wb"), protocol=2)
-        return None, None
+        return False, RuntimeError(u"reference output {} did not exist and has been written".format(old_pickle_file))
     else:
         old_result_dict = pd.read_pickle(old_pickle_file)
 
@@ -158,6 +162,64 @@ def test_strategy():
     run_tests()
 
 
+def _compare_matching_engines(filename):
+    strategy_file = os.path.join(TEST_DIR, filename)
+    results = {}
+    for engine in ("scalar", "vectorized"):
+        print(u"Start test: {} [{}]".format(strategy_file, engine))
+        config = {
+            "base": {"strategy_file": strategy_file},
+            "mod": {"sys_simulation": {"matching_engine": engine}},
+        }
+        results[engine] = run(config)["sys_analyser"]
+
+    scalar, vectorized = results["scalar"], results["vectorized"]
+    if set(scalar) != set(vectorized):
+        return [u"result keys: {} != {}".format(sorted(scalar), sorted(vectorized))]
+
+    mismatches = []
+    for key in sorted(scalar):
+        expected, actual = scalar[key], vectorized[key]
+        if key == "summary":
+            expected, actual = pd.Series(expected).sort_index(), pd.Series(actual).sort_index()
+        elif key == "trades":
+            # order_id 与 exec_id 以运行时的时间戳为起点，比较时以各自的第一个 id 为基准
+            expected, actual = expected.copy(), actual.copy()
+            for df in (expected, actual):
+                for column in ("order_id", "exec_id"):
+                    if column in df.columns:
+                        df[column] -= df[column].min()
+        if not expected.equals(actual):
+            mismatches.append(key)
+    return mismatches
+
+
+def run_matching_engine_tests():
+    # 批量撮合引擎的结果必须与逐笔撮合完全一致：同一策略在进程内分别以两种撮合引擎运行，逐项比较成交、组合及账户数据
+    print(u"Testing vectorized matching engine......")
+    files = sorted(f for f in os.listdir(TEST_DIR) if f.find("test") == 0 and f.endswith(".py"))
+    error_map = {}
+    for filename in files:
+        strategy_config = code_config({"base": {"strategy_file": os.path.join(TEST_DIR, filename)}})
+        if strategy_config.get("base", {}).get("frequency", "1d") not in ("1d", "1m"):
+            continue
+        try:
+            mismatches = _compare_matching_engines(filename)
+        except Exception as e:
+            system_log.exception()
+            mismatches = [e]
+        if mismatches:
+            error_map[filename.replace(".py", "")] = mismatches
+    for filename, mismatches in iteritems(error_map):
+        print(u"*" * 20, u"[{}]did not pass!".format(filename), u"*" * 20)
+        print(u"scalar and vectorized results differ in: {}".format(mismatches))
+    return len(error_map)
+
+
+def test_matching_engine():
+    assert run_matching_engine_tests() == 0
+
+
 def write_csv(path, fields):
     old_test_times = []
     if not os.path.exists(path):
@@ -217,6 +279,10 @@ if __name__ == '__main__':
             test_strategy()
             end_time = datetime.now()
 
+        elif sys.argv[1] == 'matching_engine':
+            run_matching_engine_tests()
+            end_time = datetime.now()
+
         elif sys.argv[1] == 'performance':
             test_api()
             test_strategy()
@@ -234,6 +300,8 @@ if __name__ == '__main__':
         test_api()
         error_count = run_tests()
         end_time = datetime.now()
+        # 撮合引擎一致性检查会把策略再运行两遍，不计入用例耗时
+        error_count += run_matching_engine_tests()
         if error_count == 0:
             time_csv_file_path = os.path.join(TEST_OUT, "time.csv")
             time_spend = (end_time - start_time).total_seconds()
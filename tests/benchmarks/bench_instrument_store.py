@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+合约加载的启动基准：instruments.pk（逐个构造 Instrument）与 convert_bundle 生成的 instruments.npy（按需构造）对比
+
+    $ python tests/benchmarks/bench_instrument_store.py [bundle_path]
+
+未指定 bundle_path 时使用随机生成的合约数据。
+"""
+
+import datetime
+import os
+import pickle
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+
+from rqalpha.data.instrument_mixin import InstrumentMixin
+from rqalpha.data.instrument_store import InstrumentStore, ColumnarInstrumentStore, convert_instruments
+
+
+def make_instruments(n):
+    result = []
+    for k in range(n):
+        listed = datetime.date(1995, 1, 1) + datetime.timedelta(days=random.randint(0, 8000))
+        if k % 3:
+            result.append({
+                'order_book_id': '{:06d}.XSHE'.format(k), 'symbol': u'股票{}'.format(k), 'abbrev_symbol': 'GP',
+                'type': 'CS', 'exchange': 'XSHE', 'round_lot': 100.0, 'board_type': 'MainBoard',
+                'sector_code': random.choice(['Energy', 'Materials', 'Financials']), 'sector_code_name': u'能源',
+                'industry_code': random.choice(['C39', 'J66', 'K70']), 'industry_name': u'计算机', 'status': 'Active',
+                'listed_date': listed.isoformat(), 'de_listed_date': '0000-00-00', 'special_type': 'Normal',
+                'concept_names': u'null',
+            })
+        else:
+            result.append({
+                'order_book_id': 'IF{:04d}'.format(k), 'symbol': u'股指{}'.format(k), 'abbrev_symbol': 'IF',
+                'type': 'Future', 'exchange': 'CCFX', 'round_lot': 1.0, 'margin_rate': 0.1,
+                'contract_multiplier': 300.0, 'underlying_symbol': 'IF', 'underlying_order_book_id': 'null',
+                'settlement_method': 'CashSettlementRequired', 'product': 'Index',
+                'listed_date': listed.isoformat(),
+                'de_listed_date': (listed + datetime.timedelta(days=60)).isoformat(),
+                'maturity_date': (listed + datetime.timedelta(days=60)).isoformat(),
+            })
+    return result
+
+
+def main(path=None, n=30000):
+    tmp = tempfile.mkdtemp()
+    try:
+        if path is None:
+            path = tmp
+            with open(os.path.join(path, 'instruments.pk'), 'wb') as f:
+                pickle.dump(make_instruments(n), f, protocol=2)
+        source = os.path.join(path, 'instruments.pk')
+        target = os.path.join(tmp, 'instruments.npy')
+        convert_instruments(source, target)
+
+        pickled = InstrumentMixin(InstrumentStore(source).get_all_instruments())
+        columnar = InstrumentMixin(ColumnarInstrumentStore(target).get_all_instruments())
+        for i in pickled.all_instruments(None):
+            assert columnar.instruments(i.order_book_id).__dict__ == i.__dict__
+
+        implementations = [
+            ("instruments.pk", lambda: InstrumentMixin(InstrumentStore(source).get_all_instruments())),
+            ("instruments.npy", lambda: InstrumentMixin(ColumnarInstrumentStore(target).get_all_instruments())),
+        ]
+        costs = [min(timeit.repeat(f, number=1, repeat=3)) * 1000 for _, f in implementations]
+        for (name, _), cost in zip(implementations, costs):
+            print("{:<20}{:>10.1f}ms".format(name, cost))
+        print("{:<20}{:>11.1f}x".format("speedup", costs[0] / costs[1]))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
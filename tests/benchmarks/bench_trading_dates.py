@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+TradingDatesMixin 的微基准：与基于 DatetimeIndex.searchsorted 的旧实现对比
+
+    $ python tests/benchmarks/bench_trading_dates.py
+"""
+
+import datetime
+import timeit
+
+import pandas as pd
+
+from rqalpha.data.trading_dates_mixin import TradingDatesMixin, _to_timestamp
+
+
+class SearchsortedTradingDates(object):
+    def __init__(self, dates):
+        self._dates = dates
+
+    def get_previous_trading_date(self, date, n=1):
+        pos = self._dates.searchsorted(_to_timestamp(date))
+        return self._dates[pos - n] if pos >= n else self._dates[0]
+
+    def get_next_trading_date(self, date, n=1):
+        pos = self._dates.searchsorted(_to_timestamp(date), side='right')
+        return self._dates[-1] if pos + n > len(self._dates) else self._dates[pos + n - 1]
+
+    def is_trading_date(self, date):
+        date = _to_timestamp(date)
+        pos = self._dates.searchsorted(date)
+        return pos < len(self._dates) and self._dates[pos] == date
+
+    def get_n_trading_dates_until(self, dt, n):
+        pos = self._dates.searchsorted(_to_timestamp(dt), side='right')
+        return self._dates[pos - n:pos] if pos >= n else self._dates[:pos]
+
+
+def main(number=20000):
+    dates = pd.bdate_range("2005-01-04", "2018-12-28")
+    queries = [d.to_pydatetime() + datetime.timedelta(hours=15) for d in pd.date_range("2005-01-01", "2018-12-31")]
+    implementations = [
+        ("searchsorted", SearchsortedTradingDates(dates)),
+        ("ordinal", TradingDatesMixin(dates)),
+    ]
+    calls = [
+        ("get_previous_trading_date", lambda o, d: o.get_previous_trading_date(d)),
+        ("get_next_trading_date", lambda o, d: o.get_next_trading_date(d, 5)),
+        ("is_trading_date", lambda o, d: o.is_trading_date(d)),
+        ("get_n_trading_dates_until", lambda o, d: o.get_n_trading_dates_until(d, 20)),
+    ]
+
+    print("{:<28}{:>16}{:>16}{:>10}".format("method", *([name for name, _ in implementations] + ["speedup"])))
+    for method, call in calls:
+        costs = []
+        for name, obj in implementations:
+            def run():
+                for d in queries[:number]:
+                    call(obj, d)
+            costs.append(min(timeit.repeat(run, number=1, repeat=3)) / min(number, len(queries)) * 1e6)
+        print("{:<28}{:>14.2f}us{:>14.2f}us{:>9.1f}x".format(method, costs[0], costs[1], costs[0] / costs[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+def init(context):
+    context.stocks = [
+        "000001.XSHE", "000002.XSHE", "000063.XSHE", "000333.XSHE", "000651.XSHE",
+        "000858.XSHE", "002415.XSHE", "600000.XSHG", "600016.XSHG", "600028.XSHG",
+        "600030.XSHG", "600036.XSHG", "600048.XSHG", "600104.XSHG", "600519.XSHG",
+        "600585.XSHG", "600887.XSHG", "601166.XSHG", "601318.XSHG", "601398.XSHG",
+    ]
+    context.counter = 0
+
+
+def handle_bar(context, bar_dict):
+    context.counter += 1
+    if context.counter % 5 != 1:
+        return
+
+    weight = 0.9 / len(context.stocks)
+    for i, stock in enumerate(context.stocks):
+        if not bar_dict[stock].is_trading:
+            continue
+        if i % 2 == 0:
+            order_target_percent(stock, weight)
+        else:
+            # 以略低于/高于收盘价的价格挂限价单，部分订单不会成交
+            price = bar_dict[stock].close * (0.99 if context.counter % 10 == 1 else 1.01)
+            order_target_percent(stock, weight, style=LimitOrder(price))
+
+
+__config__ = {
+    "base": {
+        "start_date": "2016-01-04",
+        "end_date": "2016-12-30",
+        "frequency": "1d",
+        "matching_type": "current_bar",
+        "benchmark": "000300.XSHG",
+        "accounts": {
+            "stock": 10000000
+        }
+    },
+    "extra": {
+        "log_level": "error",
+    },
+    "mod": {
+        "sys_progress": {
+            "enabled": True,
+            "show": True,
+        },
+    },
+}
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+单元测试共用的测试替身：只实现被测代码用到的 data_proxy / price_board 接口，合约参数取自少量真实合约，
+不依赖数据包。
+
+    $ python -m pytest tests/unittest
+"""
+
+import datetime
+
+import numpy as np
+import pytest
+
+from rqalpha.const import COMMISSION_TYPE
+from rqalpha.data.daybar_store import save_line_map
+from rqalpha.environment import Environment
+
+
+class Object(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+# order_book_id: (合约乘数, 保证金率, 手续费类型, 开仓, 平仓, 平今)
+FUTURES = {
+    'IF1801': (300, 0.15, COMMISSION_TYPE.BY_MONEY, 0.000023, 0.000023, 0.0023),
+    'RB1805': (10, 0.09, COMMISSION_TYPE.BY_MONEY, 0.0001, 0.0001, 0.0001),
+    'CU1802': (5, 0.07, COMMISSION_TYPE.BY_MONEY, 0.00005, 0.00005, 0),
+    'M1805': (10, 0.07, COMMISSION_TYPE.BY_VOLUME, 1.5, 1.5, 0),
+    'A1805': (10, 0.07, COMMISSION_TYPE.BY_VOLUME, 2, 2, 0),
+    'AU1806': (1000, 0.07, COMMISSION_TYPE.BY_VOLUME, 10, 10, 0),
+}
+
+STOCKS = ['000001.XSHE', '000002.XSHE', '600000.XSHG', '600036.XSHG', '601318.XSHG']
+
+# order_book_id: (申购费率, 赎回费率)
+PUBLIC_FUNDS = {
+    '000311': (0.012, 0.005),
+    '110022': (0.015, 0.005),
+}
+
+BAR_DTYPE = np.dtype([('datetime', np.uint64), ('close', np.float64), ('volume', np.float64)])
+
+
+def write_bar_table(path, bars_by_id, dtype=BAR_DTYPE):
+    """
+    按 (order_book_id, datetime) 连续存放写入 .npy 及 line map，与 convert_bundle 的输出格式一致
+    """
+    rows, line_map = [], {}
+    for o in sorted(bars_by_id):
+        line_map[o] = (len(rows), len(rows) + len(bars_by_id[o]))
+        rows.extend(bars_by_id[o])
+    np.save(path, np.array(rows, dtype=dtype))
+    save_line_map(path[:-len('.npy')] + '_line_map.npy', line_map)
+
+
+class FakeDataProxy(object):
+    def __init__(self):
+        self.settle_prices = {}
+
+    @staticmethod
+    def instruments(order_book_id):
+        if order_book_id in FUTURES:
+            return Object(order_book_id=order_book_id, type='Future', round_lot=1, de_listed_date=None,
+                          contract_multiplier=FUTURES[order_book_id][0])
+        if order_book_id in PUBLIC_FUNDS:
+            return Object(order_book_id=order_book_id, type='PublicFund', round_lot=1, de_listed_date=None,
+                          contract_multiplier=1)
+        return Object(order_book_id=order_book_id, type='CS', round_lot=100, de_listed_date=None,
+                      contract_multiplier=1)
+
+    @staticmethod
+    def get_margin_info(order_book_id):
+        margin_rate = FUTURES[order_book_id][1]
+        return {'long_margin_ratio': margin_rate, 'short_margin_ratio': margin_rate}
+
+    @staticmethod
+    def get_commission_info(order_book_id):
+        commission_type, open_ratio, close_ratio, close_today_ratio = FUTURES[order_book_id][2:]
+        return {
+            'commission_type': commission_type,
+            'open_commission_ratio': open_ratio,
+            'close_commission_ratio': close_ratio,
+            'close_commission_today_ratio': close_today_ratio,
+        }
+
+    @staticmethod
+    def public_fund_commission(order_book_id, is_buy):
+        subscription, redemption = PUBLIC_FUNDS[order_book_id]
+        return subscription if is_buy else redemption
+
+    def get_settle_price(self, order_book_id, date):
+        return self.settle_prices[order_book_id]
+
+    def get_settle_prices(self, order_book_ids, date):
+        return np.array([self.settle_prices[o] for o in order_book_ids], dtype=np.float64)
+
+
+class FakePriceBoard(object):
+    def __init__(self):
+        self.prices = {}
+
+    def get_last_price(self, order_book_id):
+        return self.prices.get(order_book_id, np.nan)
+
+
+@pytest.fixture
+def env():
+    env = Environment(Object(base=Object(margin_multiplier=1.0),
+                             validator=Object(cash_return_by_stock_delisted=False)))
+    env.data_proxy = FakeDataProxy()
+    env.price_board = FakePriceBoard()
+    env.get_instrument = env.data_proxy.instruments
+    env.calendar_dt = env.trading_dt = datetime.datetime(2018, 1, 2, 15)
+    env.broker = Object(get_open_orders=lambda order_book_id=None: [])
+    yield env
+    Environment._env = None
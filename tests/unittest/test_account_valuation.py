@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+缓存的账户估值必须与每次从持仓重新计算的结果一致，包括 PRE_BAR 中、BAR 之前价格已经变化的情况
+
+    $ python -m pytest tests/unittest/test_account_valuation.py
+"""
+
+import datetime
+import random
+
+import numpy as np
+
+from rqalpha.const import SIDE, POSITION_EFFECT
+from rqalpha.events import EVENT, Event
+from rqalpha.model.base_position import Positions
+from rqalpha.model.trade import Trade
+from rqalpha.mod.rqalpha_mod_sys_accounts.account_model.stock_account import StockAccount
+from rqalpha.mod.rqalpha_mod_sys_accounts.account_model.future_account import FutureAccount
+from rqalpha.mod.rqalpha_mod_sys_accounts.position_model.stock_position import StockPosition
+from rqalpha.mod.rqalpha_mod_sys_accounts.position_model.future_position import FuturePosition
+
+from .conftest import FUTURES, STOCKS
+
+
+class UncachedStockAccount(StockAccount):
+    VALUATION_CACHE = False
+
+
+class UncachedFutureAccount(FutureAccount):
+    VALUATION_CACHE = False
+
+
+STOCK_FIELDS = ('total_value', 'market_value')
+FUTURE_FIELDS = ('total_value', 'market_value', 'margin', 'holding_pnl', 'realized_pnl', 'buy_margin', 'sell_margin')
+
+
+def _assert_same_valuation(pairs, step):
+    for cached, uncached, fields in pairs:
+        for field in fields:
+            expected = getattr(uncached, field)
+            assert np.isclose(getattr(cached, field), expected, rtol=1e-12, atol=1e-6), (step, field)
+
+
+def _random_trade(rnd, account, order_book_id, price, trade_id):
+    side = rnd.choice([SIDE.BUY, SIDE.SELL])
+    position = account.positions.get(order_book_id)
+    if order_book_id in FUTURES:
+        position_effect, quantity = POSITION_EFFECT.OPEN, rnd.randint(1, 5)
+        if position is not None and rnd.random() < 0.4:
+            closable = position.sell_quantity if side == SIDE.BUY else position.buy_quantity
+            if closable > 0:
+                position_effect, quantity = POSITION_EFFECT.CLOSE, rnd.randint(1, closable)
+    else:
+        position_effect, quantity = None, rnd.randint(1, 10) * 100
+        # 全部卖出时 StockPosition 的均价计算会除零，只卖出部分持仓
+        if side == SIDE.SELL and (position is None or position.quantity <= quantity):
+            side = SIDE.BUY
+    return Trade.__from_create__(0, price, quantity, side, position_effect, order_book_id, trade_id=trade_id)
+
+
+def test_cached_valuation(env):
+    prices = env.price_board.prices
+    env.data_proxy.settle_prices = prices
+    accounts = {
+        'stock': (StockAccount(1e9, Positions(StockPosition)), UncachedStockAccount(1e9, Positions(StockPosition))),
+        'future': (FutureAccount(1e9, Positions(FuturePosition)), UncachedFutureAccount(1e9, Positions(FuturePosition))),
+    }
+    pairs = [accounts['stock'] + (STOCK_FIELDS, ), accounts['future'] + (FUTURE_FIELDS, )]
+
+    checked = []
+
+    def on_pre_bar(event):
+        _assert_same_valuation(pairs, 'pre_bar')
+        checked.append(event.event_type)
+
+    env.event_bus.add_listener(EVENT.PRE_BAR, on_pre_bar)
+
+    rnd = random.Random(21)
+    trade_id = 0
+    dt = datetime.datetime(2018, 1, 2, 9, 31)
+    for day in range(10):
+        for minute in range(5):
+            dt += datetime.timedelta(minutes=1)
+            env.calendar_dt = env.trading_dt = dt
+            for order_book_id in STOCKS:
+                prices[order_book_id] = round(rnd.uniform(5, 50), 2)
+            for order_book_id in FUTURES:
+                prices[order_book_id] = round(rnd.uniform(3000, 4000))
+            # 价格已经随 dt 变化，但还没有任何事件
+            _assert_same_valuation(pairs, (day, minute, 'new dt'))
+            env.event_bus.publish_event(Event(EVENT.PRE_BAR))
+            env.event_bus.publish_event(Event(EVENT.BAR))
+            _assert_same_valuation(pairs, (day, minute, 'bar'))
+
+            for _ in range(10):
+                order_book_id = rnd.choice(STOCKS + sorted(FUTURES))
+                cached, uncached = accounts['future' if order_book_id in FUTURES else 'stock']
+                trade_id += 1
+                for account in (cached, uncached):
+                    trade = _random_trade(random.Random(trade_id), uncached, order_book_id, prices[order_book_id],
+                                          trade_id)
+                    env.event_bus.publish_event(Event(EVENT.TRADE, account=account, trade=trade))
+                _assert_same_valuation(pairs, (day, minute, 'trade', trade_id))
+
+        env.event_bus.publish_event(Event(EVENT.SETTLEMENT))
+        _assert_same_valuation(pairs, (day, 'settlement'))
+        dt = datetime.datetime.combine(dt.date() + datetime.timedelta(days=1), datetime.time(9, 31))
+
+    assert len(checked) == 50
+    assert accounts['stock'][0].positions and accounts['future'][0].positions
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+批量读取当前 bar（get_bars / get_bars_at）必须与逐个调用 get_bar 的结果一致
+
+    $ python -m pytest tests/unittest/test_bar_batch.py
+"""
+
+import random
+import datetime
+
+import numpy as np
+import pytest
+
+from rqalpha.data.base_data_source import BaseDataSource
+from rqalpha.data.bar_cache import BarCache
+from rqalpha.data.daybar_store import MemmapDayBarStore, DayBarStore
+from rqalpha.data.minute_bar_store import MinuteBarStore
+from rqalpha.interface import AbstractDataSource
+from rqalpha.model.bar import BarMap
+from rqalpha.utils.exception import is_user_exc
+
+from .conftest import Object, STOCKS, FUTURES, BAR_DTYPE, write_bar_table
+
+
+def _random_bars(rng, order_book_ids, all_dts):
+    result = {}
+    for o in order_book_ids:
+        dts = sorted(rng.sample(all_dts, rng.randint(0, len(all_dts))))
+        result[o] = [(dt, rng.uniform(1, 100), rng.randint(0, 1000)) for dt in dts]
+    return result
+
+
+def _int_dt(dt):
+    return dt.year * 10000000000 + dt.month * 100000000 + dt.day * 1000000 + \
+        dt.hour * 10000 + dt.minute * 100 + dt.second
+
+
+def _same(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    return a.tolist() == b.tolist()
+
+
+def _instrument(order_book_id, type_):
+    return Object(order_book_id=order_book_id, type=type_)
+
+
+def _data_source(tmpdir, rng):
+    days = [datetime.datetime(2018, 1, d) for d in range(2, 20)]
+    minutes = [datetime.datetime(2018, 1, 2, 9, 31) + datetime.timedelta(minutes=m) for m in range(30)]
+
+    stocks = str(tmpdir.join('stocks.npy'))
+    futures = str(tmpdir.join('futures.npy'))
+    minute_bars = str(tmpdir.join('minute_bars.npy'))
+    write_bar_table(stocks, _random_bars(rng, STOCKS, [_int_dt(d) for d in days]))
+    write_bar_table(futures, _random_bars(rng, list(FUTURES), [_int_dt(d) for d in days]))
+    write_bar_table(minute_bars, _random_bars(rng, STOCKS + list(FUTURES), [_int_dt(m) for m in minutes]))
+
+    # 只构造 get_bar / get_bars 用到的部分，不需要完整的数据包
+    ds = BaseDataSource.__new__(BaseDataSource)
+    ds._day_bars = [MemmapDayBarStore(stocks), None, MemmapDayBarStore(futures), None]
+    ds._minute_bars = MinuteBarStore(minute_bars)
+    ds._bar_cache = BarCache()
+    return ds, days, minutes
+
+
+def test_get_bars_matches_get_bar(tmpdir):
+    rng = random.Random(5)
+    ds, days, minutes = _data_source(tmpdir, rng)
+    instruments = [_instrument(o, 'CS') for o in STOCKS] + [_instrument(o, 'Future') for o in FUTURES]
+    instruments.append(_instrument('999999.XSHG', 'CS'))
+
+    for _ in range(50):
+        batch = rng.sample(instruments, rng.randint(0, len(instruments)))
+        for frequency, dts in (('1d', days), ('1m', minutes)):
+            dt = rng.choice(dts + [datetime.datetime(2017, 12, 29), datetime.datetime(2018, 2, 1, 9, 31)])
+            expected = [ds.get_bar(i, dt, frequency) for i in batch]
+            actual = ds.get_bars(batch, dt, frequency)
+            assert len(actual) == len(batch)
+            assert all(_same(a, e) for a, e in zip(actual, expected))
+
+
+def test_get_bars_falls_back_to_get_bar(tmpdir):
+    # bcolz 格式的日线没有 get_bars_at，逐个调用 get_bar
+    rng = random.Random(6)
+    ds, days, _ = _data_source(tmpdir, rng)
+    store = ds._day_bars[0]
+    fallback = DayBarStore.__new__(DayBarStore)
+    fallback.get_bars = store.get_bars
+    ds._day_bars[0] = fallback
+
+    instruments = [_instrument(o, 'CS') for o in STOCKS] + [_instrument(o, 'Future') for o in FUTURES]
+    for dt in days:
+        expected = [ds.get_bar(i, dt, '1d') for i in instruments]
+        assert all(_same(a, e) for a, e in zip(ds.get_bars(instruments, dt, '1d'), expected))
+
+
+def test_abstract_data_source_get_bars():
+    class DataSource(AbstractDataSource):
+        def get_bar(self, instrument, dt, frequency):
+            return None if instrument.order_book_id == 'missing' else (instrument.order_book_id, dt, frequency)
+
+    dt = datetime.datetime(2018, 1, 2)
+    instruments = [_instrument('a', 'CS'), _instrument('missing', 'CS'), _instrument('b', 'CS')]
+    assert DataSource().get_bars(instruments, dt, '1d') == [('a', dt, '1d'), None, ('b', dt, '1d')]
+
+
+class FakeBarDataProxy(object):
+    def __init__(self, bars):
+        self.bars = bars
+        self.calls = []
+
+    def instruments(self, order_book_id):
+        if order_book_id in self.bars:
+            return _instrument(order_book_id, 'CS')
+
+    def get_raw_bars(self, instruments, dt, frequency):
+        self.calls.append([i.order_book_id for i in instruments])
+        return [self.bars[i.order_book_id] for i in instruments]
+
+
+def test_get_snapshot_reads_batch_once():
+    bars = {
+        '000001.XSHE': np.array((20180102000000, 10.0, 100), dtype=BAR_DTYPE)[()],
+        '600000.XSHG': None,
+    }
+    proxy = FakeBarDataProxy(bars)
+    bar_map = BarMap(proxy, '1d')
+    bar_map.update_dt(datetime.datetime(2018, 1, 2))
+
+    snapshot = bar_map.get_snapshot(['600000.XSHG', '000001.XSHE'])
+    assert proxy.calls == [['600000.XSHG', '000001.XSHE']]
+    assert np.isnan(snapshot['close'][0])
+    assert snapshot['close'][1] == 10.0
+    assert snapshot['volume'][1] == 100
+
+    bar_map.get_snapshot(['000001.XSHE'])
+    assert len(proxy.calls) == 1
+
+
+def test_get_snapshot_unknown_order_book_id():
+    proxy = FakeBarDataProxy({'000001.XSHE': None})
+    bar_map = BarMap(proxy, '1d')
+    bar_map.update_dt(datetime.datetime(2018, 1, 2))
+
+    with pytest.raises(ValueError) as getitem_error:
+        bar_map['UNKNOWN']
+    with pytest.raises(ValueError) as snapshot_error:
+        bar_map.get_snapshot(['000001.XSHE', 'UNKNOWN'])
+    assert str(snapshot_error.value) == str(getitem_error.value)
+    assert is_user_exc(snapshot_error.value)
+    assert proxy.calls == []
+
+    with pytest.raises(ValueError) as snapshot_error:
+        bar_map.get_snapshot([1])
+    assert is_user_exc(snapshot_error.value)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+批量计算手续费（get_commissions）必须与逐笔调用 get_commission 的结果一致
+
+    $ python -m pytest tests/unittest/test_commission.py
+"""
+
+import random
+
+import numpy as np
+
+from rqalpha.const import SIDE, POSITION_EFFECT
+from rqalpha.mod.rqalpha_mod_sys_simulation.decider import CommissionDecider
+
+from .conftest import Object, FUTURES, STOCKS, PUBLIC_FUNDS
+
+
+def _random_trades(order_book_ids, count, order_count, seed):
+    rnd = random.Random(seed)
+    trades = []
+    for _ in range(count):
+        order_book_id = rnd.choice(order_book_ids)
+        position_effect = rnd.choice([POSITION_EFFECT.OPEN, POSITION_EFFECT.CLOSE])
+        if order_book_id in FUTURES:
+            quantity = rnd.randint(1, 10)
+        else:
+            quantity = rnd.randint(1, 20) * 100
+        close_today_amount = rnd.randint(0, quantity) if position_effect == POSITION_EFFECT.CLOSE else 0
+        trades.append(Object(
+            order_id=rnd.randrange(order_count), order_book_id=order_book_id,
+            side=rnd.choice([SIDE.BUY, SIDE.SELL]), position_effect=position_effect,
+            last_price=round(rnd.uniform(1, 50), 2), last_quantity=quantity, close_today_amount=close_today_amount
+        ))
+    return trades
+
+
+def _batch_commissions(decider, account_type, trades):
+    return decider.get_commissions(
+        account_type,
+        [t.order_id for t in trades], [t.order_book_id for t in trades], [t.side for t in trades],
+        [t.position_effect for t in trades], [t.last_price for t in trades], [t.last_quantity for t in trades],
+        [t.close_today_amount for t in trades]
+    )
+
+
+def _assert_batch_equals_scalar(account_type, trades, batch_size, min_commission):
+    batch = CommissionDecider(1.5, min_commission)
+    scalar = CommissionDecider(1.5, min_commission)
+    for i in range(0, len(trades), batch_size):
+        chunk = trades[i:i + batch_size]
+        got = _batch_commissions(batch, account_type, chunk)
+        expected = [scalar.get_commission(account_type, t) for t in chunk]
+        # 批量撮合直接使用批量结果，必须与逐笔计算逐位相同
+        np.testing.assert_array_equal(got, np.array(expected, dtype=np.float64))
+    return batch.deciders[account_type], scalar.deciders[account_type]
+
+
+def test_stock_commissions(env):
+    # 订单数远小于成交数，同一批中经常出现同一订单的多笔成交
+    for order_count, min_commission in [(2000, 5), (50, 5), (50, 0)]:
+        trades = _random_trades(STOCKS + list(PUBLIC_FUNDS), 3000, order_count, seed=order_count)
+        batch, scalar = _assert_batch_equals_scalar('STOCK', trades, 37, min_commission)
+        assert dict(batch.commission_map) == dict(scalar.commission_map)
+
+
+def test_stock_commissions_of_one_order(env):
+    # 同一订单在一批中的多笔成交：第一笔收取最小手续费，之后只收超出部分
+    trades = [
+        Object(order_id=1, order_book_id='000001.XSHE', side=SIDE.BUY, position_effect=None, last_price=10.,
+                last_quantity=quantity, close_today_amount=0)
+        for quantity in (100, 200, 300, 1000)
+    ]
+    batch, scalar = _assert_batch_equals_scalar('STOCK', trades, len(trades), 5)
+    assert dict(batch.commission_map) == dict(scalar.commission_map)
+
+
+def test_future_commissions(env):
+    trades = _random_trades(sorted(FUTURES), 3000, 500, seed=1)
+    _assert_batch_equals_scalar('FUTURE', trades, 53, 5)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+DateSet 位图的单合约/多合约查询，以及 DataProxy 按日期缓存的批量停牌查询
+
+    $ python -m pytest tests/unittest/test_date_set.py
+"""
+
+import datetime
+import random
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.data import date_set
+from rqalpha.data.date_set import DateSet
+from rqalpha.data.data_proxy import DataProxy
+
+from .conftest import Object, STOCKS
+
+DATES = pd.bdate_range('2018-01-01', '2018-03-31')
+
+
+class FakeCarray(object):
+    # 与 bcolz 中 suspended_days.bcolz 的格式相同：所有合约的日期连续存放，line_map 记录各合约的起止位置
+    def __init__(self, days):
+        values, line_map = [], {}
+        for order_book_id in sorted(days):
+            line_map[order_book_id] = (len(values), len(values) + len(days[order_book_id]))
+            values.extend(sorted(days[order_book_id]))
+        self._values = np.array(values, dtype=np.uint32)
+        self.attrs = {'line_map': line_map}
+
+    def __getitem__(self, item):
+        return self._values[item]
+
+
+def _date_set(monkeypatch, days):
+    monkeypatch.setattr(date_set, 'bcolz', Object(open=lambda f, mode: FakeCarray(days)))
+    return DateSet('suspended_days.bcolz')
+
+
+def _random_days(rng):
+    ints = [d.year * 10000 + d.month * 100 + d.day for d in DATES]
+    return {o: set(rng.sample(ints, rng.randint(0, 20))) for o in STOCKS}
+
+
+def test_contains(monkeypatch):
+    rng = random.Random(11)
+    days = _random_days(rng)
+    ds = _date_set(monkeypatch, days)
+
+    for order_book_id in STOCKS + ['UNKNOWN']:
+        expected_days = days.get(order_book_id, set())
+        assert ds.get_days(order_book_id) == (expected_days if order_book_id in days else [])
+        query = DATES[rng.randint(0, 10):rng.randint(20, len(DATES))]
+        expected = [d.year * 10000 + d.month * 100 + d.day in expected_days for d in query]
+        assert ds.contains(order_book_id, query) == expected
+        assert ds.contains(order_book_id, list(query.to_pydatetime())) == expected
+        assert ds.contains(order_book_id, [d.date() for d in query]) == expected
+        assert ds.contains(order_book_id, [d.year * 10000 + d.month * 100 + d.day for d in query]) == expected
+        assert ds.contains(order_book_id, [int(d.strftime('%Y%m%d%H%M%S')) for d in query]) == expected
+        assert ds.contains(order_book_id, []) == []
+        assert ds.contains(order_book_id, pd.DatetimeIndex([])) == []
+
+
+def test_contains_many(monkeypatch):
+    rng = random.Random(12)
+    days = _random_days(rng)
+    ds = _date_set(monkeypatch, days)
+
+    order_book_ids = STOCKS + ['UNKNOWN', STOCKS[0]]
+    for d in list(DATES) + [pd.Timestamp('2017-12-29'), pd.Timestamp('2018-05-02')]:
+        expected = [d.year * 10000 + d.month * 100 + d.day in days.get(o, set()) for o in order_book_ids]
+        for date in (d, d.to_pydatetime(), d.date(), d.year * 10000 + d.month * 100 + d.day):
+            result = ds.contains_many(order_book_ids, date)
+            assert result.dtype == bool
+            assert result.tolist() == expected
+        assert ds.contains_many([], d).tolist() == []
+        assert ds.contains_many(['UNKNOWN'], d).tolist() == [False]
+
+
+def test_empty_date_set(monkeypatch):
+    ds = _date_set(monkeypatch, {})
+    assert ds.contains('000001.XSHE', DATES[:3]) == [False] * 3
+    assert ds.contains_many(['000001.XSHE'], DATES[0]).tolist() == [False]
+
+
+class FakeDataSource(object):
+    def __init__(self, suspended):
+        self.suspended = suspended
+        self.calls = []
+
+    def get_all_instruments(self):
+        return []
+
+    def get_trading_calendar(self):
+        return DATES
+
+    def is_suspended(self, order_book_id, dates):
+        self.calls.append(('is_suspended', order_book_id))
+        return [(order_book_id, d) in self.suspended for d in dates]
+
+
+class FakeBatchDataSource(FakeDataSource):
+    def is_suspended_many(self, order_book_ids, dt):
+        self.calls.append(('is_suspended_many', tuple(order_book_ids)))
+        return np.array([(o, dt) in self.suspended for o in order_book_ids], dtype=bool)
+
+
+def test_is_suspended_at(env):
+    day1, day2 = datetime.datetime(2018, 1, 2), datetime.datetime(2018, 1, 3)
+    suspended = {('000001.XSHE', day1), ('600000.XSHG', day2), ('601318.XSHG', day1)}
+    env.get_universe = lambda: {'000001.XSHE', '000002.XSHE', '600000.XSHG'}
+
+    for data_source_type in (FakeBatchDataSource, FakeDataSource):
+        data_source = data_source_type(suspended)
+        data_proxy = DataProxy(data_source)
+        for dt in (day1, day2):
+            for order_book_id in ['000001.XSHE', '600000.XSHG', '000002.XSHE', '601318.XSHG', '601318.XSHG']:
+                assert data_proxy.is_suspended_at(order_book_id, dt) == ((order_book_id, dt) in suspended)
+
+        if data_source_type is FakeBatchDataSource:
+            # 每个日期批量查询一次 universe，universe 之外的合约单独查询一次
+            universe = ('000001.XSHE', '000002.XSHE', '600000.XSHG')
+            assert data_source.calls == [
+                ('is_suspended_many', universe), ('is_suspended_many', ('601318.XSHG', )),
+            ] * 2
+        else:
+            # 数据源没有批量接口时逐个合约查询
+            assert len(data_source.calls) == 8
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+期货账户批量结算（_settle_positions）必须与逐个持仓结算（_settle_positions_scalar）的结果一致
+
+    $ python -m pytest tests/unittest/test_future_settlement.py
+"""
+
+import random
+
+import numpy as np
+
+from rqalpha.const import SIDE, POSITION_EFFECT
+from rqalpha.events import EVENT, Event
+from rqalpha.model.base_position import Positions
+from rqalpha.model.trade import Trade
+from rqalpha.mod.rqalpha_mod_sys_accounts.account_model.future_account import FutureAccount
+from rqalpha.mod.rqalpha_mod_sys_accounts.position_model.future_position import FuturePosition
+
+from .conftest import FUTURES
+
+
+def _holding_lists(position):
+    state = position.get_state()
+    return {
+        key: [tuple(float(v) for v in lot) for lot in lots]
+        for key, lots in state.items() if key.endswith('holding_list')
+    }
+
+
+def test_settle_positions(env):
+    last_prices, settle_prices = env.price_board.prices, env.data_proxy.settle_prices
+
+    vectorized = FutureAccount(1e9, Positions(FuturePosition))
+    scalar = FutureAccount(1e9, Positions(FuturePosition))
+    scalar._settle_positions = scalar._settle_positions_scalar
+
+    rnd = random.Random(5)
+    order_book_ids = sorted(FUTURES)
+    trade_id = 0
+    for day in range(20):
+        for order_book_id in order_book_ids:
+            last_prices[order_book_id] = round(rnd.uniform(3000, 4000))
+            settle_prices[order_book_id] = round(last_prices[order_book_id] + rnd.uniform(-20, 20))
+        env.event_bus.publish_event(Event(EVENT.BAR))
+
+        for _ in range(60):
+            order_book_id = rnd.choice(order_book_ids)
+            side = rnd.choice([SIDE.BUY, SIDE.SELL])
+            position_effect, quantity = POSITION_EFFECT.OPEN, rnd.randint(1, 5)
+            position = scalar.positions.get(order_book_id)
+            if position is not None and rnd.random() < 0.4:
+                closable = position.sell_quantity if side == SIDE.BUY else position.buy_quantity
+                if closable > 0:
+                    position_effect, quantity = POSITION_EFFECT.CLOSE, rnd.randint(1, closable)
+            trade_id += 1
+            for account in (vectorized, scalar):
+                trade = Trade.__from_create__(
+                    0, last_prices[order_book_id], quantity, side, position_effect, order_book_id, trade_id=trade_id)
+                env.event_bus.publish_event(Event(EVENT.TRADE, account=account, trade=trade))
+
+        env.event_bus.publish_event(Event(EVENT.SETTLEMENT))
+
+        assert scalar.positions, day
+        assert np.isclose(vectorized.cash, scalar.cash, rtol=1e-12), day
+        assert np.isclose(vectorized.margin, scalar.margin, rtol=1e-12), day
+        assert np.isclose(vectorized.holding_pnl, scalar.holding_pnl, rtol=1e-12, atol=1e-6), day
+        assert sorted(vectorized.positions.keys()) == sorted(scalar.positions.keys()), day
+        for order_book_id, position in scalar.positions.items():
+            other = vectorized.positions[order_book_id]
+            assert np.isclose(other.margin, position.margin, rtol=1e-12), (day, order_book_id)
+            assert np.isclose(other.holding_pnl, position.holding_pnl, atol=1e-6), (day, order_book_id)
+            assert _holding_lists(other) == _holding_lists(position), (day, order_book_id)
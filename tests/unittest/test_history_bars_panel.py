@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+history_bars_panel 按交易日历对齐：停牌日与 history_bars(skip_suspended=False) 相同，未上市的日期为 NaN
+
+    $ python -m pytest tests/unittest/test_history_bars_panel.py
+"""
+
+import datetime
+
+import numpy as np
+
+from rqalpha.data.base_data_source import BaseDataSource
+from rqalpha.data.bar_cache import BarCache
+from rqalpha.data.daybar_store import MemmapDayBarStore
+from rqalpha.interface import AbstractDataSource
+
+from .conftest import Object, write_bar_table
+
+DATES = [datetime.datetime(2018, 1, d) for d in (2, 3, 4, 5, 8, 9, 10)]
+
+
+def _int_date(d):
+    return d.year * 10000000000 + d.month * 100000000 + d.day * 1000000
+
+
+def _data_source(tmpdir):
+    bars = {
+        # 1 月 4 日、5 日停牌：数据包中保留该日的 bar，价格为停牌前的收盘价，成交量为 0
+        '000001.XSHE': [(_int_date(d), c, v) for d, c, v in zip(
+            DATES, [10, 11, 11, 11, 12, 13, 14], [100, 200, 0, 0, 300, 400, 500])],
+        '000002.XSHE': [(_int_date(d), 20 + n, 1000) for n, d in enumerate(DATES)],
+        # 1 月 8 日上市
+        '600000.XSHG': [(_int_date(d), 30 + n, 10) for n, d in enumerate(DATES[4:])],
+    }
+    path = str(tmpdir.join('stocks.npy'))
+    write_bar_table(path, bars)
+
+    ds = BaseDataSource.__new__(BaseDataSource)
+    ds._day_bars = [MemmapDayBarStore(path)]
+    ds._bar_cache = BarCache()
+    ds._trading_calendar_dt = np.array([_int_date(d) for d in DATES], dtype=np.uint64)
+    return ds
+
+
+def test_suspended_rows(tmpdir):
+    ds = _data_source(tmpdir)
+    instruments = [Object(order_book_id=o, type='CS') for o in ('000001.XSHE', '000002.XSHE', '600000.XSHG')]
+    dt = datetime.datetime(2018, 1, 9)
+
+    panel = ds.history_bars_panel(instruments, 5, '1d', ['close', 'volume'], dt, adjust_type='none')
+    assert panel.shape == (3, 5, 2)
+    np.testing.assert_array_equal(panel[0, :, 0], [11, 11, 11, 12, 13])
+    np.testing.assert_array_equal(panel[0, :, 1], [200, 0, 0, 300, 400])
+    np.testing.assert_array_equal(panel[2, :, 0], [np.nan, np.nan, np.nan, 30, 31])
+    np.testing.assert_array_equal(panel[2, :, 1], [np.nan, np.nan, np.nan, 10, 10])
+
+    # 与逐个合约调用 history_bars(skip_suspended=False) 的结果一致
+    for n, instrument in enumerate(instruments):
+        bars = ds.history_bars(instrument, 5, '1d', ['datetime', 'close', 'volume'], dt,
+                               skip_suspended=False, adjust_type='none')
+        np.testing.assert_array_equal(panel[n, 5 - len(bars):, 0], bars['close'])
+        np.testing.assert_array_equal(panel[n, 5 - len(bars):, 1], bars['volume'])
+
+    # 默认实现（以各合约 bar 时间的并集为时间轴）对停牌日的处理相同
+    generic = AbstractDataSource.history_bars_panel(ds, instruments, 5, '1d', ['close', 'volume'], dt,
+                                                    adjust_type='none')
+    np.testing.assert_array_equal(generic, panel)
+
+    close = ds.history_bars_panel(instruments, 5, '1d', 'close', dt, adjust_type='none')
+    np.testing.assert_array_equal(close, panel[:, :, 0])
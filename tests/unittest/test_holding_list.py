@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+以 HoldingList 保存持仓明细的 FuturePosition，随机开仓、平仓、平今及结算后，必须与原先以 list 保存持仓明细、
+每次求和的实现结果一致
+
+    $ python -m pytest tests/unittest/test_holding_list.py
+"""
+
+import random
+
+import numpy as np
+
+from rqalpha.const import SIDE, POSITION_EFFECT
+from rqalpha.model.trade import Trade
+from rqalpha.mod.rqalpha_mod_sys_accounts.position_model.future_position import FuturePosition, HoldingList
+
+from .conftest import FUTURES
+
+
+class LegacyFuturePosition(FuturePosition):
+    """
+    原先的实现：持仓明细为 list，左端为最新开仓，开仓 insert(0, ...)，数量及持仓成本每次重新求和
+    """
+
+    def __init__(self, order_book_id):
+        super(LegacyFuturePosition, self).__init__(order_book_id)
+        self._buy_old_holding_list = []
+        self._sell_old_holding_list = []
+        self._buy_today_holding_list = []
+        self._sell_today_holding_list = []
+
+    def get_state(self):
+        return {
+            'order_book_id': self._order_book_id,
+            'buy_old_holding_list': self._buy_old_holding_list,
+            'sell_old_holding_list': self._sell_old_holding_list,
+            'buy_today_holding_list': self._buy_today_holding_list,
+            'sell_today_holding_list': self._sell_today_holding_list,
+            'buy_transaction_cost': self._buy_transaction_cost,
+            'sell_transaction_cost': self._sell_transaction_cost,
+            'buy_realized_pnl': self._buy_realized_pnl,
+            'sell_realized_pnl': self._sell_realized_pnl,
+            'buy_avg_open_price': self._buy_avg_open_price,
+            'sell_avg_open_price': self._sell_avg_open_price,
+            'margin_rate': self.margin_rate,
+        }
+
+    @property
+    def buy_old_quantity(self):
+        return sum(amount for price, amount in self._buy_old_holding_list)
+
+    @property
+    def sell_old_quantity(self):
+        return sum(amount for price, amount in self._sell_old_holding_list)
+
+    @property
+    def buy_today_quantity(self):
+        return sum(amount for price, amount in self._buy_today_holding_list)
+
+    @property
+    def sell_today_quantity(self):
+        return sum(amount for price, amount in self._sell_today_holding_list)
+
+    @property
+    def _buy_holding_cost(self):
+        return sum(p * a * self.contract_multiplier for p, a in self.buy_holding_list)
+
+    @property
+    def _sell_holding_cost(self):
+        return sum(p * a * self.contract_multiplier for p, a in self.sell_holding_list)
+
+    @property
+    def buy_holding_list(self):
+        return self._buy_old_holding_list + self._buy_today_holding_list
+
+    @property
+    def sell_holding_list(self):
+        return self._sell_old_holding_list + self._sell_today_holding_list
+
+    def settle_(self, settle_price):
+        self._buy_old_holding_list = [(settle_price, self.buy_quantity)]
+        self._sell_old_holding_list = [(settle_price, self.sell_quantity)]
+        self._buy_today_holding_list = []
+        self._sell_today_holding_list = []
+
+        self._buy_transaction_cost = 0.
+        self._sell_transaction_cost = 0.
+        self._buy_realized_pnl = 0.
+        self._sell_realized_pnl = 0.
+
+    def apply_trade(self, trade):
+        trade_quantity = trade.last_quantity
+        if trade.side == SIDE.BUY:
+            if trade.position_effect == POSITION_EFFECT.OPEN:
+                self._buy_avg_open_price = (self._buy_avg_open_price * self.buy_quantity +
+                                            trade_quantity * trade.last_price) / (self.buy_quantity + trade_quantity)
+                self._buy_transaction_cost += trade.transaction_cost
+                self._buy_today_holding_list.insert(0, (trade.last_price, trade_quantity))
+                return -1 * self._margin_of(trade_quantity, trade.last_price)
+            else:
+                old_margin = self.margin
+                self._sell_transaction_cost += trade.transaction_cost
+                delta_realized_pnl = self._close_holding(trade)
+                self._sell_realized_pnl += delta_realized_pnl
+                return old_margin - self.margin + delta_realized_pnl
+        else:
+            if trade.position_effect == POSITION_EFFECT.OPEN:
+                self._sell_avg_open_price = (self._sell_avg_open_price * self.sell_quantity +
+                                             trade_quantity * trade.last_price) / (self.sell_quantity + trade_quantity)
+                self._sell_transaction_cost += trade.transaction_cost
+                self._sell_today_holding_list.insert(0, (trade.last_price, trade_quantity))
+                return -1 * self._margin_of(trade_quantity, trade.last_price)
+            else:
+                old_margin = self.margin
+                self._buy_transaction_cost += trade.transaction_cost
+                delta_realized_pnl = self._close_holding(trade)
+                self._buy_realized_pnl += delta_realized_pnl
+                return old_margin - self.margin + delta_realized_pnl
+
+    def _close_holding(self, trade):
+        left_quantity = trade.last_quantity
+        delta = 0
+        if trade.side == SIDE.BUY:
+            if trade.position_effect == POSITION_EFFECT.CLOSE and len(self._sell_old_holding_list) != 0:
+                old_price, old_quantity = self._sell_old_holding_list.pop()
+                if old_quantity > left_quantity:
+                    consumed_quantity = left_quantity
+                    self._sell_old_holding_list = [(old_price, old_quantity - left_quantity)]
+                else:
+                    consumed_quantity = old_quantity
+                left_quantity -= consumed_quantity
+                delta += self._cal_realized_pnl(old_price, trade.last_price, trade.side, consumed_quantity)
+            while True:
+                if left_quantity <= 0:
+                    break
+                oldest_price, oldest_quantity = self._sell_today_holding_list.pop()
+                if oldest_quantity > left_quantity:
+                    consumed_quantity = left_quantity
+                    self._sell_today_holding_list.append((oldest_price, oldest_quantity - left_quantity))
+                else:
+                    consumed_quantity = oldest_quantity
+                left_quantity -= consumed_quantity
+                delta += self._cal_realized_pnl(oldest_price, trade.last_price, trade.side, consumed_quantity)
+        else:
+            if trade.position_effect == POSITION_EFFECT.CLOSE and len(self._buy_old_holding_list) != 0:
+                old_price, old_quantity = self._buy_old_holding_list.pop()
+                if old_quantity > left_quantity:
+                    consumed_quantity = left_quantity
+                    self._buy_old_holding_list = [(old_price, old_quantity - left_quantity)]
+                else:
+                    consumed_quantity = old_quantity
+                left_quantity -= consumed_quantity
+                delta += self._cal_realized_pnl(old_price, trade.last_price, trade.side, consumed_quantity)
+            while True:
+                if left_quantity <= 0:
+                    break
+                oldest_price, oldest_quantity = self._buy_today_holding_list.pop()
+                if oldest_quantity > left_quantity:
+                    consumed_quantity = left_quantity
+                    self._buy_today_holding_list.append((oldest_price, oldest_quantity - left_quantity))
+                    left_quantity = 0
+                else:
+                    consumed_quantity = oldest_quantity
+                left_quantity -= consumed_quantity
+                delta += self._cal_realized_pnl(oldest_price, trade.last_price, trade.side, consumed_quantity)
+        return delta
+
+
+def _trade(rnd, trade_id, position, order_book_id, price):
+    side = rnd.choice([SIDE.BUY, SIDE.SELL])
+    position_effect, quantity = POSITION_EFFECT.OPEN, rnd.randint(1, 20)
+    if rnd.random() < 0.5:
+        if side == SIDE.BUY:
+            closable, closable_today = position.sell_quantity, position.sell_today_quantity
+        else:
+            closable, closable_today = position.buy_quantity, position.buy_today_quantity
+        if closable_today > 0 and rnd.random() < 0.3:
+            position_effect, quantity = POSITION_EFFECT.CLOSE_TODAY, rnd.randint(1, closable_today)
+        elif closable > 0:
+            position_effect, quantity = POSITION_EFFECT.CLOSE, rnd.randint(1, closable)
+    return Trade.__from_create__(0, price, quantity, side, position_effect, order_book_id, trade_id=trade_id)
+
+
+def _assert_same(position, legacy, msg):
+    for name in ('buy_old_quantity', 'sell_old_quantity', 'buy_today_quantity', 'sell_today_quantity'):
+        assert getattr(position, name) == getattr(legacy, name), (msg, name)
+    for name in ('buy_avg_holding_price', 'sell_avg_holding_price', 'buy_margin', 'sell_margin',
+                 'buy_holding_pnl', 'sell_holding_pnl', 'buy_realized_pnl', 'sell_realized_pnl'):
+        assert np.isclose(getattr(position, name), getattr(legacy, name), rtol=1e-12, atol=1e-6), (msg, name)
+    assert position.buy_holding_list == legacy.buy_holding_list, msg
+    assert position.sell_holding_list == legacy.sell_holding_list, msg
+    state, legacy_state = position.get_state(), legacy.get_state()
+    for key in state:
+        if key.endswith('holding_list'):
+            assert state[key] == legacy_state[key], (msg, key)
+
+
+def test_future_position_matches_legacy(env):
+    rnd = random.Random(23)
+    trade_id = 0
+    for order_book_id in sorted(FUTURES):
+        position, legacy = FuturePosition(order_book_id), LegacyFuturePosition(order_book_id)
+        price = rnd.uniform(3000, 4000)
+        for day in range(10):
+            for i in range(80):
+                price = round(price + rnd.uniform(-10, 10), 1)
+                env.price_board.prices[order_book_id] = price
+                trade_id += 1
+                trade = _trade(rnd, trade_id, legacy, order_book_id, price)
+                delta = position.apply_trade(trade)
+                legacy_delta = legacy.apply_trade(trade)
+                assert np.isclose(delta, legacy_delta, rtol=1e-12, atol=1e-6), (order_book_id, day, i)
+                _assert_same(position, legacy, (order_book_id, day, i))
+
+            settle_price = round(price + rnd.uniform(-20, 20), 1)
+            position.settle_(settle_price)
+            legacy.settle_(settle_price)
+            _assert_same(position, legacy, (order_book_id, day))
+
+            restored = FuturePosition(order_book_id)
+            restored.set_state(position.get_state())
+            _assert_same(restored, legacy, (order_book_id, day))
+
+
+def test_holding_list_matches_list():
+    rnd = random.Random(7)
+    holding, lots = HoldingList(), []
+    for i in range(5000):
+        if lots and rnd.random() < 0.45:
+            assert holding.pop() == lots.pop(), i
+        elif lots and rnd.random() < 0.1:
+            price, amount = lots.pop()
+            holding.pop()
+            lots.append((price, amount - 1 if amount > 1 else amount))
+            holding.append(*lots[-1])
+        else:
+            lot = (round(rnd.uniform(1, 5000), 2), rnd.randint(1, 100))
+            lots.insert(0, lot)
+            holding.appendleft(*lot)
+        assert holding.to_list() == lots, i
+        assert len(holding) == len(lots), i
+        assert holding.quantity == sum(a for p, a in lots), i
+        assert np.isclose(holding.value, sum(p * a for p, a in lots), rtol=1e-9, atol=1e-6), i
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+convert_minute_bars 生成的分钟线及 BaseDataSource 的分钟线读取，包括期货夜盘的交易日归属
+
+    $ python -m pytest tests/unittest/test_minute_bar_store.py
+"""
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+
+from rqalpha.__main__ import convert_minute_bars as convert_minute_bars_command
+from rqalpha.data.base_data_source import BaseDataSource
+from rqalpha.data.minute_bar_store import MinuteBarStore, convert_minute_bars
+
+from .conftest import Object
+
+# 期货的夜盘归属于下一个交易日；000001.XSHE 在 1 月 4 日停牌，没有分钟线
+ROWS = [
+    ('RB1805', '2018-01-02 21:01:00', '2018-01-03', 3800, 10),
+    ('RB1805', '2018-01-02 21:02:00', '2018-01-03', 3801, 11),
+    ('RB1805', '2018-01-03 09:01:00', '2018-01-03', 3802, 12),
+    ('RB1805', '2018-01-03 09:02:00', '2018-01-03', 3803, 13),
+    ('RB1805', '2018-01-03 21:01:00', '2018-01-04', 3804, 14),
+    ('RB1805', '2018-01-04 09:01:00', '2018-01-04', 3805, 15),
+    ('000001.XSHE', '2018-01-03 09:31:00', '2018-01-03', 13.1, 100),
+    ('000001.XSHE', '2018-01-03 09:32:00', '2018-01-03', 13.2, 200),
+    ('000001.XSHE', '2018-01-05 09:31:00', '2018-01-05', 13.3, 300),
+]
+
+
+def _frame(rows=ROWS):
+    frame = pd.DataFrame(rows, columns=['order_book_id', 'datetime', 'trading_date', 'close', 'volume'])
+    # 打乱顺序，转换时按 (order_book_id, datetime) 排序
+    return frame.iloc[::-1].reset_index(drop=True)
+
+
+def _data_source(path):
+    ds = BaseDataSource.__new__(BaseDataSource)
+    ds._minute_bars = MinuteBarStore(path)
+    return ds
+
+
+def test_convert_minute_bars(tmpdir):
+    path = str(tmpdir.join('minute_bars.npy'))
+    convert_minute_bars(_frame(), path)
+    store = MinuteBarStore(path)
+
+    bars = store.get_bars('RB1805')
+    assert bars.dtype.names == ('datetime', 'trading_date', 'close', 'volume')
+    assert bars['datetime'].tolist() == [20180102210100, 20180102210200, 20180103090100, 20180103090200,
+                                         20180103210100, 20180104090100]
+    assert bars['trading_date'].tolist() == [20180103] * 4 + [20180104] * 2
+    assert bars['close'].tolist() == [3800, 3801, 3802, 3803, 3804, 3805]
+    assert store.get_bars('000001.XSHE')['volume'].tolist() == [100, 200, 300]
+
+    # 没有 trading_date 列时以 datetime 的日期作为交易日，datetime 也可以是 YYYYMMDDHHMMSS 整数
+    frame = _frame().drop('trading_date', axis=1)
+    frame['datetime'] = [int(d.replace('-', '').replace(' ', '').replace(':', '')) for d in frame['datetime']]
+    convert_minute_bars(frame, path)
+    bars = MinuteBarStore(path).get_bars('RB1805')
+    assert bars['trading_date'].tolist() == [20180102, 20180102, 20180103, 20180103, 20180103, 20180104]
+
+
+def test_lookup(tmpdir):
+    path = str(tmpdir.join('minute_bars.npy'))
+    convert_minute_bars(_frame(), path)
+    store = MinuteBarStore(path)
+
+    assert store.get_bar('RB1805', 20180102210200)['close'] == 3801
+    assert store.get_bar('RB1805', 20180102210300) is None
+    assert store.get_bar('RB1805', 20180104090200) is None
+    assert store.get_bar('UNKNOWN', 20180102210200) is None
+    bars = store.get_bars_at(['000001.XSHE', 'RB1805', 'UNKNOWN'], 20180103090100)
+    assert bars[0] is None and bars[1]['close'] == 3802 and bars[2] is None
+
+    assert store.get_trading_minutes('RB1805', 20180103).tolist() == [
+        20180102210100, 20180102210200, 20180103090100, 20180103090200]
+    assert store.get_trading_minutes('000001.XSHE', 20180104).tolist() == []
+    assert store.get_trading_minutes('UNKNOWN', 20180103) is None
+    assert store.get_date_range() == (20180103, 20180105)
+
+    ds = _data_source(path)
+    assert ds.available_data_range('1m') == (datetime.date(2018, 1, 3), datetime.date(2018, 1, 5))
+    assert ds.get_trading_minutes_for(Object(order_book_id='RB1805'), datetime.date(2018, 1, 4)) == [
+        20180103210100, 20180104090100]
+
+
+def test_empty_store(tmpdir):
+    path = str(tmpdir.join('minute_bars.npy'))
+    convert_minute_bars(_frame([]), path)
+    with pytest.raises(RuntimeError) as exc_info:
+        _data_source(path).available_data_range('1m')
+    assert path in str(exc_info.value)
+
+
+def test_history_bars(tmpdir):
+    path = str(tmpdir.join('minute_bars.npy'))
+    convert_minute_bars(_frame(), path)
+    ds = _data_source(path)
+    future = Object(order_book_id='RB1805', type='Future')
+    stock = Object(order_book_id='000001.XSHE', type='CS')
+
+    # 跨越夜盘的窗口
+    bars = ds.history_bars(future, 3, '1m', ['datetime', 'close'], datetime.datetime(2018, 1, 3, 21, 1))
+    assert bars['datetime'].tolist() == [20180103090100, 20180103090200, 20180103210100]
+    bars = ds.history_bars(future, 10, '1m', 'close', datetime.datetime(2018, 1, 3, 21, 0, 30))
+    assert bars.tolist() == [3800, 3801, 3802, 3803]
+
+    # 停牌日没有分钟线，skip_suspended 不影响结果
+    dt = datetime.datetime(2018, 1, 5, 9, 31)
+    for skip_suspended in (True, False):
+        bars = ds.history_bars(stock, 2, '1m', 'datetime', dt, skip_suspended=skip_suspended)
+        assert bars.tolist() == [20180103093200, 20180105093100]
+
+    # dt 正好是 bar 的时间时该 bar 已经完成，include_now 不影响结果；落在一分钟内部时不支持 include_now
+    assert ds.history_bars(future, 1, '1m', 'close', datetime.datetime(2018, 1, 4, 9, 1), include_now=True).tolist() \
+        == [3805]
+    with pytest.raises(NotImplementedError):
+        ds.history_bars(future, 1, '1m', 'close', datetime.datetime(2018, 1, 4, 9, 1, 30), include_now=True)
+
+    assert ds.history_bars(future, 1, '1m', 'open', dt) is None
+    assert ds.history_bars(Object(order_book_id='UNKNOWN', type='CS'), 1, '1m', 'close', dt) is None
+
+
+def test_cli(tmpdir):
+    frame = _frame()
+    csv_files = []
+    for order_book_id, group in frame.groupby('order_book_id'):
+        csv_files.append(str(tmpdir.join(order_book_id + '.csv')))
+        group.to_csv(csv_files[-1], index=False)
+    tmpdir.mkdir('bundle')
+
+    result = CliRunner().invoke(convert_minute_bars_command, ['-d', str(tmpdir)] + csv_files)
+    assert result.exit_code == 0, result.output
+
+    expected = str(tmpdir.join('expected.npy'))
+    convert_minute_bars(frame, expected)
+    store = MinuteBarStore(str(tmpdir.join('bundle', 'minute_bars.npy')))
+    for order_book_id in ('RB1805', '000001.XSHE'):
+        np.testing.assert_array_equal(store.get_bars(order_book_id), MinuteBarStore(expected).get_bars(order_book_id))
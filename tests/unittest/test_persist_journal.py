@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+完整状态加上追加的增量日志恢复出的组合，必须与持久化时 get_state() 导出的完整状态一致
+
+    $ python -m pytest tests/unittest/test_persist_journal.py
+"""
+
+import datetime
+import os
+import random
+
+from rqalpha.const import SIDE, POSITION_EFFECT, PERSIST_MODE
+from rqalpha.events import EVENT, Event
+from rqalpha.model.base_position import Positions
+from rqalpha.model.portfolio import Portfolio
+from rqalpha.model.trade import Trade
+from rqalpha.mod.rqalpha_mod_sys_accounts.account_model.stock_account import StockAccount
+from rqalpha.mod.rqalpha_mod_sys_accounts.account_model.future_account import FutureAccount
+from rqalpha.mod.rqalpha_mod_sys_accounts.position_model.stock_position import StockPosition
+from rqalpha.mod.rqalpha_mod_sys_accounts.position_model.future_position import FuturePosition
+from rqalpha.utils import persist_codec
+from rqalpha.utils.disk_persist_provider import DiskPersistProvider
+from rqalpha.utils.persisit_helper import PersistHelper
+
+from .conftest import FUTURES, STOCKS
+
+KEY = 'portfolio'
+
+
+class RecordingPersistProvider(DiskPersistProvider):
+    def __init__(self, path):
+        super(RecordingPersistProvider, self).__init__(path)
+        self.calls = []
+
+    def store(self, key, value):
+        self.calls.append('store')
+        super(RecordingPersistProvider, self).store(key, value)
+
+    def append(self, key, value):
+        self.calls.append('append')
+        super(RecordingPersistProvider, self).append(key, value)
+
+
+def _portfolio(register_event=True):
+    return Portfolio(datetime.date(2018, 1, 2), 1, 2e9, {
+        'STOCK': StockAccount(1e9, Positions(StockPosition), register_event=register_event),
+        'FUTURE': FutureAccount(1e9, Positions(FuturePosition), register_event=register_event),
+    }, register_event=register_event)
+
+
+def _normalize(state):
+    state = persist_codec.loads(state)
+    for account in state['accounts'].values():
+        account['backward_trade_set'] = sorted(account['backward_trade_set'])
+    return state
+
+
+def _merged_state(provider):
+    # 完整状态与日志合并后的结果，即 restore 时传给 set_state 的状态
+    portfolio = _portfolio(register_event=False)
+    return _normalize(portfolio.merge_delta_states(provider.load(KEY), provider.load_journal(KEY)))
+
+
+def _restored_state(provider):
+    portfolio = _portfolio(register_event=False)
+    helper = PersistHelper(provider, None, PERSIST_MODE.ON_CRASH)
+    helper.register(KEY, portfolio)
+    helper.restore()
+    return _normalize(portfolio.get_state())
+
+
+def _reference_state(tmpdir, state):
+    # 只写入一份完整状态后恢复的结果；set_state 本身不恢复当日的 realized_pnl 等字段，以此作为对照
+    provider = DiskPersistProvider(str(tmpdir.join('reference')))
+    provider.store(KEY, state)
+    return _restored_state(provider)
+
+
+def _random_trade(rnd, portfolio, prices, trade_id):
+    order_book_id = rnd.choice(STOCKS + sorted(FUTURES))
+    side = rnd.choice([SIDE.BUY, SIDE.SELL])
+    if order_book_id in FUTURES:
+        account = portfolio.accounts['FUTURE']
+        position = account.positions.get(order_book_id)
+        position_effect, quantity = POSITION_EFFECT.OPEN, rnd.randint(1, 5)
+        if position is not None:
+            closable = position.sell_quantity if side == SIDE.BUY else position.buy_quantity
+            if closable > 0 and rnd.random() < 0.6:
+                # 经常全部平仓，结算时删除该持仓
+                position_effect, quantity = POSITION_EFFECT.CLOSE, closable
+    else:
+        account = portfolio.accounts['STOCK']
+        position = account.positions.get(order_book_id)
+        position_effect, quantity = None, rnd.randint(1, 10) * 100
+        if side == SIDE.SELL and (position is None or position.quantity <= quantity):
+            side = SIDE.BUY
+    return account, Trade.__from_create__(0, prices[order_book_id], quantity, side, position_effect, order_book_id, trade_id=trade_id)
+
+
+def _run(env, rnd, portfolio, on_step, days=8):
+    prices = env.price_board.prices
+    env.data_proxy.settle_prices = prices
+    trade_id = 0
+    dt = datetime.datetime(2018, 1, 2, 9, 31)
+    for day in range(days):
+        for order_book_id in STOCKS:
+            prices[order_book_id] = round(rnd.uniform(5, 50), 2)
+        for order_book_id in FUTURES:
+            prices[order_book_id] = round(rnd.uniform(3000, 4000))
+        for _ in range(rnd.randint(0, 6)):
+            env.calendar_dt = env.trading_dt = dt
+            for _ in range(rnd.randint(0, 4)):
+                trade_id += 1
+                account, trade = _random_trade(rnd, portfolio, prices, trade_id)
+                env.event_bus.publish_event(Event(EVENT.TRADE, account=account, trade=trade))
+            on_step((day, trade_id))
+            dt += datetime.timedelta(minutes=1)
+        env.event_bus.publish_event(Event(EVENT.SETTLEMENT))
+        on_step((day, 'settlement'))
+        dt = datetime.datetime.combine(dt.date() + datetime.timedelta(days=1), datetime.time(9, 31))
+
+
+def test_restore_matches_state(env, tmpdir):
+    provider = RecordingPersistProvider(str(tmpdir))
+    portfolio = _portfolio()
+    helper = PersistHelper(provider, env.event_bus, PERSIST_MODE.ON_CRASH)
+    helper.register(KEY, portfolio)
+    removed = []
+
+    def on_step(step):
+        helper.persist()
+        for delta in provider.load_journal(KEY):
+            for account in persist_codec.loads(delta)['accounts'].values():
+                removed.extend(account.get('removed_positions', []))
+        state = portfolio.get_state()
+        assert _merged_state(provider) == _normalize(state), step
+        assert _restored_state(provider) == _reference_state(tmpdir, state), step
+
+    _run(env, random.Random(10), portfolio, on_step)
+    assert 'append' in provider.calls
+    assert removed
+
+
+def test_compaction(env, tmpdir):
+    provider = RecordingPersistProvider(str(tmpdir))
+    portfolio = _portfolio()
+    helper = PersistHelper(provider, env.event_bus, PERSIST_MODE.ON_CRASH)
+    helper.register(KEY, portfolio)
+
+    def on_step(step):
+        state_size = len(provider.load(KEY))
+        journal_size = sum(len(d) for d in provider.load_journal(KEY))
+        calls = len(provider.calls)
+        helper.persist()
+        if journal_size > state_size:
+            # 日志超过完整状态后重新写入完整状态，日志被清空
+            assert provider.calls[calls:] == ['store'], step
+            assert provider.load_journal(KEY) == []
+        else:
+            assert 'store' not in provider.calls[calls:], step
+
+    helper.persist()
+    assert provider.calls == ['store']
+    _run(env, random.Random(11), portfolio, on_step, days=20)
+    assert provider.calls.count('store') > 1
+
+
+def test_torn_record(env, tmpdir):
+    provider = RecordingPersistProvider(str(tmpdir))
+    portfolio = _portfolio()
+    helper = PersistHelper(provider, env.event_bus, PERSIST_MODE.ON_CRASH)
+    helper.register(KEY, portfolio)
+
+    rnd = random.Random(12)
+    prices = env.price_board.prices
+    prices.update((o, 10.) for o in STOCKS)
+    prices.update((o, 3000.) for o in FUTURES)
+    # 先在所有合约上建仓，使完整状态足够大，随后的几条增量不会触发压缩
+    for trade_id, order_book_id in enumerate(STOCKS + sorted(FUTURES)):
+        account = portfolio.accounts['FUTURE' if order_book_id in FUTURES else 'STOCK']
+        trade = Trade.__from_create__(0, prices[order_book_id], 1 if order_book_id in FUTURES else 100, SIDE.BUY,
+                                      POSITION_EFFECT.OPEN if order_book_id in FUTURES else None, order_book_id,
+                                      trade_id=trade_id)
+        env.event_bus.publish_event(Event(EVENT.TRADE, account=account, trade=trade))
+    helper.persist()
+    for trade_id in range(100, 103):
+        account, trade = _random_trade(rnd, portfolio, prices, trade_id)
+        env.event_bus.publish_event(Event(EVENT.TRADE, account=account, trade=trade))
+        helper.persist()
+    assert provider.calls == ['store', 'append', 'append', 'append']
+    journal = provider.load_journal(KEY)
+    state = _normalize(portfolio.get_state())
+
+    # 模拟写入最后一条记录时进程退出：长度前缀完整但数据不完整
+    path = os.path.join(str(tmpdir), KEY)
+    with open(path, 'ab') as f:
+        f.write(provider.RECORD_HEADER.pack(100) + b'\x81\xa1')
+    assert provider.load_journal(KEY) == journal
+    assert _merged_state(provider) == state
+
+    # 只写了一半长度前缀
+    with open(path, 'ab') as f:
+        f.write(b'\x01\x00')
+    assert provider.load_journal(KEY) == journal
+    assert _merged_state(provider) == state
+
+    # 重启后的第一次持久化写入完整状态，覆盖残缺的记录
+    restored = _portfolio(register_event=False)
+    restarted = PersistHelper(provider, None, PERSIST_MODE.ON_CRASH)
+    restarted.register(KEY, restored)
+    restarted.restore()
+    restarted.persist()
+    assert provider.calls[-1] == 'store'
+    assert provider.load_journal(KEY) == []
+    with open(path, 'rb') as f:
+        data = f.read()
+    state = provider.load(KEY)
+    assert data == provider.MAGIC + provider.RECORD_HEADER.pack(len(state)) + state
+    assert _normalize(state) == _normalize(restored.get_state())
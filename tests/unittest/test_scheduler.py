@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+按天编译触发表的 Scheduler 必须与逐分钟判断 _is_before_trading/_should_trigger 的旧实现在相同的时间触发相同的函数，
+包括期货夜盘、跳过部分分钟的行情以及日线回测
+
+    $ python -m pytest tests/unittest/test_scheduler.py
+"""
+
+import datetime
+import random
+
+import pandas as pd
+
+from rqalpha.events import EVENT, Event
+from rqalpha.utils.scheduler import Scheduler, market_open, market_close
+
+from .conftest import Object
+
+
+class LegacyScheduler(object):
+    """
+    逐分钟对每个注册项判断日期规则及时间规则的旧实现，只保留与触发时间相关的部分
+    """
+    _TRADING_DATES = None
+
+    def __init__(self, env, ucontext):
+        self._registry = []
+        self._today = None
+        self._this_week = None
+        self._this_month = None
+        self._last_minute = 0
+        self._current_minute = 0
+        self._stage = None
+        self._ucontext = ucontext
+        self._env = env
+        env.event_bus.add_listener(EVENT.PRE_BEFORE_TRADING, self.next_day_)
+        env.event_bus.add_listener(EVENT.BEFORE_TRADING, self.before_trading_)
+        env.event_bus.add_listener(EVENT.BAR, self.next_bar_)
+
+    def _is_weekday(self, wd):
+        return self._today.weekday() == wd
+
+    def _is_nth_trading_day_in_week(self, n):
+        try:
+            return self._this_week[n] == self._today
+        except IndexError:
+            return False
+
+    def _is_nth_trading_day_in_month(self, n):
+        try:
+            return self._this_month[n] == self._today
+        except IndexError:
+            return False
+
+    def _should_trigger(self, n):
+        if self._current_minute < 9 * 60 + 31 or self._current_minute > 15 * 60:
+            return False
+        return self._last_minute < n <= self._current_minute
+
+    def _is_before_trading(self):
+        return self._stage == 'before_trading'
+
+    def _time_rule_for(self, time_rule):
+        if time_rule == 'before_trading':
+            return lambda: self._is_before_trading()
+        time_rule = time_rule if time_rule else 9 * 60 + 31
+        return lambda: self._should_trigger(time_rule)
+
+    def run_daily(self, func, time_rule=None):
+        self._registry.append((lambda: True, self._time_rule_for(time_rule), func))
+
+    def run_weekly(self, func, weekday=None, tradingday=None, time_rule=None):
+        if weekday is not None:
+            day_checker = lambda: self._is_weekday(weekday - 1)
+        else:
+            if tradingday > 0:
+                tradingday -= 1
+            day_checker = lambda: self._is_nth_trading_day_in_week(tradingday)
+        self._registry.append((day_checker, self._time_rule_for(time_rule), func))
+
+    def run_monthly(self, func, tradingday=None, time_rule=None):
+        if tradingday > 0:
+            tradingday -= 1
+        self._registry.append((lambda: self._is_nth_trading_day_in_month(tradingday),
+                               self._time_rule_for(time_rule), func))
+
+    def next_day_(self, event):
+        self._today = self._env.trading_dt.date()
+        self._last_minute = 0
+        self._current_minute = 0
+        if not self._this_week or self._today > self._this_week[-1]:
+            self._fill_week()
+        if not self._this_month or self._today > self._this_month[-1]:
+            self._fill_month()
+
+    def next_bar_(self, event):
+        self._current_minute = self._ucontext.now.hour * 60 + self._ucontext.now.minute
+        for day_rule, time_rule, func in self._registry:
+            if day_rule() and time_rule():
+                func(self._ucontext, None)
+        self._last_minute = self._current_minute
+
+    def before_trading_(self, event):
+        self._stage = 'before_trading'
+        for day_rule, time_rule, func in self._registry:
+            if day_rule() and time_rule():
+                func(self._ucontext, None)
+        self._stage = None
+
+    # 新版本的 pandas 不再接受 date 作为 DatetimeIndex.searchsorted 的参数，这里转换为 Timestamp
+    def _fill_week(self):
+        weekday = self._today.isoweekday()
+        weekend = self._today + datetime.timedelta(days=7 - weekday)
+        week_start = weekend - datetime.timedelta(days=6)
+        left = self._TRADING_DATES.searchsorted(pd.Timestamp(week_start))
+        right = self._TRADING_DATES.searchsorted(pd.Timestamp(weekend), side='right')
+        self._this_week = [d.date() for d in self._TRADING_DATES[left:right]]
+
+    def _fill_month(self):
+        try:
+            month_end = self._today.replace(month=self._today.month + 1, day=1)
+        except ValueError:
+            month_end = self._today.replace(year=self._today.year + 1, month=1, day=1)
+        month_begin = self._today.replace(day=1)
+        left = self._TRADING_DATES.searchsorted(pd.Timestamp(month_begin))
+        right = self._TRADING_DATES.searchsorted(pd.Timestamp(month_end))
+        self._this_month = [d.date() for d in self._TRADING_DATES[left:right]]
+
+
+# 春节、清明及元旦休市
+HOLIDAYS = pd.to_datetime(['2018-01-01', '2018-02-15', '2018-02-16', '2018-02-19', '2018-02-20', '2018-02-21',
+                           '2018-04-05', '2018-04-06', '2018-12-31', '2019-01-01'])
+TRADING_DATES = pd.bdate_range('2017-12-20', '2019-01-10').difference(HOLIDAYS)
+
+TIME_RULES = [None, 'before_trading', market_open(0, 0), market_open(0, 1), market_open(0, 30), market_open(2, 0),
+              market_open(2, 10), market_close(0, 0), market_close(0, 1), market_close(1, 0), 10 * 60,
+              21 * 60 + 5, 9 * 60]
+
+
+def _register(scheduler, log):
+    def make(name):
+        return lambda context, bar_dict: log.append((name, context.now))
+
+    n = 0
+    for time_rule in TIME_RULES:
+        scheduler.run_daily(make(n), time_rule=time_rule)
+        n += 1
+    for weekday in range(1, 8):
+        scheduler.run_weekly(make(n), weekday=weekday, time_rule=TIME_RULES[weekday])
+        n += 1
+    for tradingday in (1, 2, 5, -1, -2, -5):
+        scheduler.run_weekly(make(n), tradingday=tradingday, time_rule=TIME_RULES[abs(tradingday) + 1])
+        n += 1
+    for tradingday in (1, 2, 3, 20, 23, -1, -3, -23):
+        scheduler.run_monthly(make(n), tradingday=tradingday, time_rule=TIME_RULES[abs(tradingday) % len(TIME_RULES)])
+        n += 1
+
+
+def _session_minutes(day, rng, mode):
+    def minutes(start, end):
+        t = start
+        while t <= end:
+            yield t
+            t += datetime.timedelta(minutes=1)
+
+    at = lambda h, m: datetime.datetime.combine(day, datetime.time(h, m))
+    if mode == 'daily':
+        return [at(15, 0)]
+
+    result = []
+    if mode == 'night':
+        # 夜盘属于下一个交易日，日历上是前一个交易日的晚上
+        night = datetime.datetime.combine(TRADING_DATES[TRADING_DATES.searchsorted(pd.Timestamp(day)) - 1].date(),
+                                          datetime.time(21, 1))
+        result.extend(minutes(night, night.replace(hour=23, minute=0)))
+        result.extend(minutes(at(9, 1), at(10, 15)))
+        result.extend(minutes(at(10, 31), at(11, 30)))
+        result.extend(minutes(at(13, 31), at(15, 0)))
+    else:
+        result.extend(minutes(at(9, 31), at(11, 30)))
+        result.extend(minutes(at(13, 1), at(15, 0)))
+    if mode == 'sparse':
+        # 成交稀疏的合约只有部分分钟有 bar
+        result = [t for t in result if rng.random() < 0.1]
+    return result
+
+
+def _replay(env, mode):
+    Scheduler.set_trading_dates_(TRADING_DATES)
+    LegacyScheduler._TRADING_DATES = TRADING_DATES
+    ucontext = Object(now=None)
+    new_log, old_log = [], []
+    scheduler = Scheduler('1m')
+    scheduler.set_user_context(ucontext)
+    _register(scheduler, new_log)
+    _register(LegacyScheduler(env, ucontext), old_log)
+
+    rng = random.Random(20)
+    for day in TRADING_DATES[TRADING_DATES.searchsorted(pd.Timestamp('2018-01-02')):]:
+        day = day.date()
+        env.trading_dt = env.calendar_dt = ucontext.now = datetime.datetime.combine(day, datetime.time(8, 30))
+        env.event_bus.publish_event(Event(EVENT.PRE_BEFORE_TRADING))
+        env.event_bus.publish_event(Event(EVENT.BEFORE_TRADING))
+        for dt in _session_minutes(day, rng, mode):
+            env.calendar_dt = ucontext.now = dt
+            env.trading_dt = datetime.datetime.combine(day, dt.time())
+            env.event_bus.publish_event(Event(EVENT.BAR, bar_dict=None))
+        assert new_log == old_log, (mode, day)
+    return new_log
+
+
+def test_replay_minute(env):
+    log = _replay(env, 'minute')
+    assert len(set(name for name, _ in log)) > 25
+
+
+def test_replay_night_session(env):
+    log = _replay(env, 'night')
+    # 夜盘时间不触发
+    assert all(not (15 * 60 < t.hour * 60 + t.minute) for _, t in log)
+
+
+def test_replay_sparse(env):
+    _replay(env, 'sparse')
+
+
+def test_replay_daily(env):
+    log = _replay(env, 'daily')
+    assert log
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+参数扫描的参数展开、配置生成，以及进程池结束（包括失败）后释放父进程中的数据源
+
+    $ python -m pytest tests/unittest/test_sweep.py
+"""
+
+import time
+
+import pytest
+
+from rqalpha import sweep
+
+
+def test_expand_param_grid():
+    assert sweep.expand_param_grid({'b': [1, 2], 'a': ['x']}) == [{'a': 'x', 'b': 1}, {'a': 'x', 'b': 2}]
+    assert sweep.expand_param_grid([{'a': 1}, {'a': 2, 'b': 3}]) == [{'a': 1}, {'a': 2, 'b': 3}]
+    assert sweep.expand_param_grid({}) == [{}]
+
+
+def test_sweep_config():
+    params = {'fast': 5, 'slow': 20}
+    for context_vars in (None, {}, {'fast': 1, 'other': 'x'}, '{"fast": 1, "other": "x"}', u'{"other": "x"}'):
+        config = {'base': {'frequency': '1d'}}
+        if context_vars is not None:
+            config['extra'] = {'context_vars': context_vars}
+        result = sweep._sweep_config(config, params)
+
+        expected = {'fast': 5, 'slow': 20}
+        if context_vars:
+            expected['other'] = 'x'
+        assert result['extra']['context_vars'] == expected
+        assert result['mod']['sys_progress']['enabled'] is False
+        # 不修改传入的配置
+        assert config.get('extra', {}).get('context_vars') == context_vars
+        assert 'mod' not in config
+
+    config = {'mod': {'sys_progress': {'enabled': True}}}
+    assert sweep._sweep_config(config, params)['mod']['sys_progress']['enabled'] is True
+
+
+DATA_SOURCE = object()
+
+
+def _fake_load_data_source(config, source_code=None):
+    return DATA_SOURCE
+
+
+def _fake_run_one(args):
+    index, config, params, source_code = args
+    if params['x'] < 0:
+        return index, params, {}, 'ValueError()', 0.
+    # fork 出的 worker 中可以看到父进程加载的数据源
+    return index, params, {'x2': params['x'] * 2, 'shared': sweep._data_source is DATA_SOURCE}, None, 0.
+
+
+def _raising_run_one(args):
+    time.sleep(0.01)
+    raise RuntimeError('worker crashed')
+
+
+def test_run_sweep(monkeypatch):
+    monkeypatch.setattr(sweep, '_load_data_source', _fake_load_data_source)
+    monkeypatch.setattr(sweep, '_run_one', _fake_run_one)
+
+    df = sweep.run_sweep({}, {'x': [3, -1, 1, 2]}, workers=2, verbose=False)
+    assert list(df.columns[:1]) == ['x']
+    assert df['x'].tolist() == [3, -1, 1, 2]
+    assert df['x2'].fillna(0).tolist() == [6, 0, 2, 4]
+    assert df['error'].notnull().tolist() == [False, True, False, False]
+    assert df['shared'].dropna().tolist() == [True, True, True]
+    assert sweep._data_source is None
+
+
+def test_run_sweep_releases_data_source_on_failure(monkeypatch):
+    monkeypatch.setattr(sweep, '_load_data_source', _fake_load_data_source)
+    monkeypatch.setattr(sweep, '_run_one', _raising_run_one)
+
+    with pytest.raises(RuntimeError):
+        sweep.run_sweep({}, {'x': [1, 2]}, workers=2, verbose=False)
+    assert sweep._data_source is None
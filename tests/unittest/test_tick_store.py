@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2017 Ricequant, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+convert_ticks 生成的 TickStore、跨夜盘的 history_ticks，以及 TickMerger 的归并顺序（包括迭代中途改变 universe）
+
+    $ python -m pytest tests/unittest/test_tick_store.py
+"""
+
+import datetime
+import itertools
+import os
+import random
+
+import numpy as np
+import pandas as pd
+
+from rqalpha.data.tick_store import TickStore, TickMerger, convert_ticks, convert_dt_to_ms_int
+
+# 1 月 5 日为周五，其夜盘属于 1 月 8 日（周一），且持续到周六凌晨
+TRADING_DATES = [datetime.date(2018, 1, d) for d in (3, 4, 5, 8)]
+FUTURES = ['RB1805', 'AU1806']
+STOCKS = ['000001.XSHE']
+
+
+def _previous_trading_date(date):
+    return TRADING_DATES[TRADING_DATES.index(date) - 1]
+
+
+def _sessions(order_book_id, trading_date):
+    at = lambda d, h, m: datetime.datetime.combine(d, datetime.time(h, m))
+    if order_book_id in STOCKS:
+        return [(at(trading_date, 9, 30), at(trading_date, 11, 30)), (at(trading_date, 13, 0), at(trading_date, 15, 0))]
+    night = _previous_trading_date(trading_date)
+    return [(at(night, 21, 0), at(night, 23, 59) + datetime.timedelta(hours=2, minutes=30)),
+            (at(trading_date, 9, 0), at(trading_date, 15, 0))]
+
+
+def _frame(rng):
+    rows = []
+    for order_book_id in FUTURES + STOCKS:
+        for trading_date in TRADING_DATES[1:]:
+            for start, end in _sessions(order_book_id, trading_date):
+                slots = int((end - start).total_seconds()) // 30
+                # 在 30 秒的时间栅格上随机取点，不同期货合约之间会出现相同的时间；股票的 tick 带有毫秒
+                for offset in sorted(rng.sample(range(slots), 40)):
+                    dt = start + datetime.timedelta(seconds=offset * 30, milliseconds=500 if order_book_id in STOCKS else 0)
+                    rows.append({
+                        'order_book_id': order_book_id,
+                        'datetime': dt,
+                        'trading_date': trading_date.strftime('%Y%m%d'),
+                        'last': rng.uniform(10, 20),
+                        'volume': rng.randint(0, 1000),
+                        'ask1': rng.uniform(10, 20),
+                        'bid1': rng.uniform(10, 20),
+                        'bid_vol2': rng.randint(1, 10),
+                    })
+    frame = pd.DataFrame(rows)
+    return frame.sample(frac=1, random_state=rng.randint(0, 1000)).reset_index(drop=True)
+
+
+def _store(tmpdir, rng):
+    frame = _frame(rng)
+    path = str(tmpdir.join('ticks'))
+    convert_ticks(frame, path)
+    return frame, TickStore(path)
+
+
+def _ms(dt):
+    return convert_dt_to_ms_int(pd.Timestamp(dt).to_pydatetime())
+
+
+def test_convert_ticks(tmpdir):
+    rng = random.Random(18)
+    frame, store = _store(tmpdir, rng)
+
+    expected_days = [int(d.strftime('%Y%m%d')) for d in TRADING_DATES[1:]]
+    for order_book_id in FUTURES + STOCKS:
+        assert sorted(os.listdir(str(tmpdir.join('ticks', order_book_id)))) == [
+            '{}.npy'.format(d) for d in expected_days]
+        assert store.days_of(order_book_id) == expected_days
+        for trading_date in expected_days:
+            rows = frame[(frame['order_book_id'] == order_book_id) &
+                         (frame['trading_date'] == str(trading_date))].sort_values('datetime')
+            ticks = store.get_ticks(order_book_id, trading_date)
+            assert ticks['datetime'].tolist() == [_ms(d) for d in rows['datetime']]
+            np.testing.assert_array_equal(ticks['last'], rows['last'])
+            np.testing.assert_array_equal(ticks['volume'], rows['volume'])
+            np.testing.assert_array_equal(ticks['ask'][:, 0], rows['ask1'])
+            np.testing.assert_array_equal(ticks['bid_vol'][:, 1], rows['bid_vol2'])
+            assert np.isnan(ticks['open']).all() and np.isnan(ticks['ask'][:, 1:]).all()
+
+    assert store.get_ticks('RB1805', 20180103) is None
+    assert store.get_ticks('UNKNOWN', 20180104) is None
+    assert store.days_of('UNKNOWN') == []
+
+    # 没有 trading_date 列时以自然日作为交易日
+    convert_ticks(frame[frame['order_book_id'] == 'RB1805'].drop('trading_date', axis=1), str(tmpdir.join('t2')))
+    assert TickStore(str(tmpdir.join('t2'))).days_of('RB1805') == [20180103, 20180104, 20180105, 20180106,
+                                                                   20180108]
+
+
+def test_history_ticks(tmpdir):
+    rng = random.Random(19)
+    frame, store = _store(tmpdir, rng)
+
+    query_times = [
+        datetime.datetime(2018, 1, 4, 10, 0),
+        # 夜盘中：属于下一个交易日
+        datetime.datetime(2018, 1, 4, 22, 0),
+        datetime.datetime(2018, 1, 5, 1, 30),
+        # 日盘开盘前：只有当日夜盘及之前的数据
+        datetime.datetime(2018, 1, 5, 8, 59),
+        # 周五夜盘跨过自然日进入周六，属于周一
+        datetime.datetime(2018, 1, 5, 23, 0),
+        datetime.datetime(2018, 1, 6, 2, 0),
+        datetime.datetime(2018, 1, 7, 12, 0),
+        datetime.datetime(2018, 1, 8, 14, 0),
+        datetime.datetime(2018, 1, 9, 9, 0),
+        datetime.datetime(2018, 1, 3, 9, 0),
+    ]
+    for order_book_id in FUTURES + STOCKS:
+        all_ticks = sorted(_ms(d) for d in frame[frame['order_book_id'] == order_book_id]['datetime'])
+        for dt in query_times:
+            for count in (1, 5, 39, 40, 41, 100, 1000):
+                expected = [t for t in all_ticks if t <= convert_dt_to_ms_int(dt)][-count:]
+                ticks = store.history_ticks(order_book_id, count, dt)
+                assert [convert_dt_to_ms_int(t.datetime) for t in ticks] == expected, (order_book_id, dt, count)
+                assert all(t.order_book_id == order_book_id for t in ticks)
+
+        # 正好落在某个 tick 上时包含该 tick
+        for ms in rng.sample(all_ticks, 10):
+            dt = datetime.datetime.strptime(str(ms)[:14], '%Y%m%d%H%M%S') + datetime.timedelta(
+                milliseconds=ms % 1000)
+            ticks = store.history_ticks(order_book_id, 3, dt)
+            assert [convert_dt_to_ms_int(t.datetime) for t in ticks] == [t for t in all_ticks if t <= ms][-3:]
+
+
+def _reference_merge(ticks_of, order_book_ids, changes):
+    """
+    每次扫描所有合约的下一个 tick，按 (datetime, 加入顺序) 产出；changes 为 {已产出个数: 新的 universe}。
+    新加入（包括移除后重新加入）的合约从最近一次产出的时间之后开始
+    """
+    positions, seqs, produced = {}, {}, []
+    last_dt = 0
+    seq = itertools.count()
+    changes[0] = order_book_ids
+    while True:
+        if len(produced) in changes:
+            universe = changes.pop(len(produced))
+            for o in list(positions):
+                if o not in universe:
+                    del positions[o]
+            for o in universe:
+                if o not in positions:
+                    ticks = ticks_of.get(o, [])
+                    positions[o] = next((i for i, t in enumerate(ticks) if t > last_dt), len(ticks))
+                    seqs[o] = next(seq)
+        candidates = [(ticks_of[o][i], seqs[o], o) for o, i in positions.items() if i < len(ticks_of.get(o, []))]
+        if not candidates:
+            return produced
+        last_dt, _, o = min(candidates)
+        positions[o] += 1
+        produced.append((o, last_dt))
+
+
+def test_merge_order(tmpdir):
+    rng = random.Random(20)
+    frame, store = _store(tmpdir, rng)
+    trading_date = 20180105
+    ticks_of = {o: store.get_ticks(o, trading_date)['datetime'].tolist() for o in FUTURES + STOCKS}
+    loader = lambda o: store.get_ticks(o, trading_date)
+
+    order_book_ids = ['000001.XSHE', 'RB1805', 'AU1806', 'UNKNOWN']
+    merged = [(t.order_book_id, convert_dt_to_ms_int(t.datetime)) for t in TickMerger(loader, order_book_ids)]
+    expected = sorted(((o, t) for o in order_book_ids for t in ticks_of.get(o, [])),
+                      key=lambda x: (x[1], order_book_ids.index(x[0])))
+    assert merged == expected
+    # 不同合约的 tick 出现在相同时间时按合约加入顺序产出
+    assert len(set(t for _, t in merged)) < len(merged)
+
+    # 从 last_dt 之后继续
+    last_dt = datetime.datetime(2018, 1, 5, 10, 0)
+    merged = [(t.order_book_id, convert_dt_to_ms_int(t.datetime))
+              for t in TickMerger(loader, order_book_ids, last_dt=last_dt)]
+    assert merged == [e for e in expected if e[1] > convert_dt_to_ms_int(last_dt)]
+
+
+def test_merge_universe_change(tmpdir):
+    rng = random.Random(21)
+    frame, store = _store(tmpdir, rng)
+    trading_date = 20180105
+    loader = lambda o: store.get_ticks(o, trading_date)
+    ticks_of = {o: store.get_ticks(o, trading_date)['datetime'].tolist() for o in FUTURES + STOCKS}
+
+    for _ in range(20):
+        initial = rng.sample(FUTURES + STOCKS, rng.randint(1, 3))
+        changes = {}
+        for n in sorted(rng.sample(range(1, 100), 3)):
+            changes[n] = rng.sample(FUTURES + STOCKS, rng.randint(0, 3))
+
+        merger = TickMerger(loader, initial)
+        merged = []
+        it = iter(merger)
+        while True:
+            if len(merged) in changes:
+                merger.set_universe(changes[len(merged)])
+            try:
+                tick = next(it)
+            except StopIteration:
+                break
+            merged.append((tick.order_book_id, convert_dt_to_ms_int(tick.datetime)))
+
+        assert merged == _reference_merge(ticks_of, initial, dict(changes))
+        # 时间不倒退，同一个 tick 不会产出两次
+        assert [t for _, t in merged] == sorted(t for _, t in merged)
+        assert len(set(merged)) == len(merged)